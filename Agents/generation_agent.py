@@ -1,5 +1,8 @@
 from agents import Agent, Runner, ModelSettings
-from config.gemini_config import gemini_config, gemini_model
+from app.core.config import get_gemini_model
+
+# Shared pooled Gemini model (same client as AgentExecutor)
+gemini_model = get_gemini_model()
 
 # --- Model Settings ---
 
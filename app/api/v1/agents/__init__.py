@@ -2,12 +2,28 @@
 from .router import router as agents_router
 from .registry import (
     AGENT_REGISTRY,
+    AGENT_ATTRIBUTES,
+    AGENT_ALIASES,
+    AGENT_COST_CLASSES,
+    AGENT_POSTPROCESSORS,
     TOOL_REGISTRY,
+    TOOL_STREAMERS,
     UNIFIED_REGISTRY,
     get_agent,
+    canonical_slug,
+    get_agent_descriptor,
     get_tool,
+    get_tool_spec,
+    get_tool_streamer,
+    get_agent_postprocessor,
     get_agent_or_tool,
+    is_cacheable,
+    is_chunked,
+    is_incremental,
+    get_semantic_threshold,
+    get_agent_timeout,
     get_all_agent_slugs,
+    get_all_agent_descriptors,
     get_all_tool_slugs,
     get_all_slugs
 )
@@ -2,148 +2,264 @@
 Agent Registry Module
 Central registry for all AI agents and deterministic tools.
 """
-from typing import Optional, Union, Callable
+from collections.abc import Mapping
+from importlib import import_module
+from typing import Optional, Union, Callable, Iterator, Iterable, Dict, List, TypeVar
 from agents import Agent
 
-from Agents.generation_agent import (
-    story_generator_agent, poem_generator_agent, backstory_generator_agent,
-    slogan_generator_agent, caption_generator_agent, message_generator_agent,
-    reply_generator_agent, business_name_generator_agent, book_title_generator_agent,
-    cover_letter_generator_agent, email_writer_agent, essay_writer_agent,
-    article_rewriter_agent, review_generator_agent, paragraph_generator_agent,
-    paragraph_expander_agent, sentence_expander_agent, humanize_ai_agent,
-    conclusion_writer_agent, ai_prompt_generator_agent, outline_generator_agent,
-    answer_generator_agent, thesis_statement_generator_agent, faq_generator_agent,
-    acronym_generator_agent, meta_description_generator_agent, small_text_generator_agent,
-    spell_checker_agent, grammar_checker_agent, sentence_shortener_agent,
-    sentence_generator_agent
-)
-
-
-# ============= DETERMINISTIC TOOLS =============
-def hex_to_rgb_logic(input_data: str) -> str:
-    """Convert hex color to RGB format."""
-    hex_val = input_data.lstrip('#').strip()
-    try:
-        if len(hex_val) not in [3, 6]:
-            return "Invalid Hex Code: Must be 3 or 6 characters"
-        if len(hex_val) == 3:
-            hex_val = ''.join([c*2 for c in hex_val])
-        r = int(hex_val[0:2], 16)
-        g = int(hex_val[2:4], 16)
-        b = int(hex_val[4:6], 16)
-        return f"rgb({r}, {g}, {b})"
-    except ValueError:
-        return "Invalid Hex Code: Contains non-hex characters"
-
-
-def code_beautifier_logic(input_data: str) -> str:
-    """Beautify code with proper formatting."""
-    lines = input_data.strip().split('\n')
-    beautified = '\n'.join(line.rstrip() for line in lines)
-    return f"// Beautified Code\n{beautified}\n// End"
-
-
-def domain_checker_logic(input_data: str) -> str:
-    """Check domain availability (mock implementation)."""
-    domain = input_data.strip().lower().replace(' ', '')
-    if not domain:
-        return "Please provide a domain name"
-    return f"Domain '{domain}.com' is available! (Mock Response)"
-
-
-def plagiarism_checker_logic(input_data: str) -> str:
-    """Check for plagiarism (mock implementation)."""
-    text = input_data.strip()
-    if not text:
-        return "Please provide text to check"
-    word_count = len(text.split())
-    return f"Plagiarism Check Complete. Originality Score: 95%. Words Processed: {word_count}."
+from app.core.config import settings
+from app.services.tool_registry import tool_registry, ToolSpec
+from app.services.agent_identity import agent_identity, AgentDescriptor
+
+T = TypeVar("T")
 
 
 # ============= AGENT REGISTRY =============
-# Maps slug -> Agent instance (for AI-powered tools)
-AGENT_REGISTRY = {
+# Maps canonical slug -> Agent attribute in AGENTS_MODULE (for
+# AI-powered tools). The module is imported on first use, not when the
+# registry is imported.
+AGENTS_MODULE = "Agents.generation_agent"
+AGENT_ATTRIBUTES = {
     # Creative Agents
-    "story-generator": story_generator_agent,
-    "ai-story-generator": story_generator_agent,
-    "poem-generator": poem_generator_agent,
-    "backstory-generator": backstory_generator_agent,
-    "slogan-generator": slogan_generator_agent,
-    "caption-generator": caption_generator_agent,
-    "message-generator": message_generator_agent,
-    "reply-generator": reply_generator_agent,
-    "business-name-generator": business_name_generator_agent,
-    "book-title-generator": book_title_generator_agent,
+    "story-generator": "story_generator_agent",
+    "poem-generator": "poem_generator_agent",
+    "backstory-generator": "backstory_generator_agent",
+    "slogan-generator": "slogan_generator_agent",
+    "caption-generator": "caption_generator_agent",
+    "message-generator": "message_generator_agent",
+    "reply-generator": "reply_generator_agent",
+    "business-name-generator": "business_name_generator_agent",
+    "book-title-generator": "book_title_generator_agent",
     
     # Writing & Content Agents
-    "cover-letter-generator": cover_letter_generator_agent,
-    "email-writer": email_writer_agent,
-    "essay-writer": essay_writer_agent,
-    "article-rewriter": article_rewriter_agent,
-    "ai-content-improver": article_rewriter_agent,
-    "review-generator": review_generator_agent,
-    "paragraph-generator": paragraph_generator_agent,
-    "paragraph-expander": paragraph_expander_agent,
-    "sentence-expander": sentence_expander_agent,
-    "humanize-ai": humanize_ai_agent,
-    "conclusion-writer": conclusion_writer_agent,
-    "ai-prompt-generator": ai_prompt_generator_agent,
+    "cover-letter-generator": "cover_letter_generator_agent",
+    "email-writer": "email_writer_agent",
+    "essay-writer": "essay_writer_agent",
+    "article-rewriter": "article_rewriter_agent",
+    "review-generator": "review_generator_agent",
+    "paragraph-generator": "paragraph_generator_agent",
+    "paragraph-expander": "paragraph_expander_agent",
+    "sentence-expander": "sentence_expander_agent",
+    "humanize-ai": "humanize_ai_agent",
+    "conclusion-writer": "conclusion_writer_agent",
+    "ai-prompt-generator": "ai_prompt_generator_agent",
     
     # Precise & Structural Agents
-    "outline-generator": outline_generator_agent,
-    "answer-generator": answer_generator_agent,
-    "thesis-statement-generator": thesis_statement_generator_agent,
-    "faq-generator": faq_generator_agent,
-    "acronym-generator": acronym_generator_agent,
-    "meta-description-generator": meta_description_generator_agent,
-    "meta-tag-generator": meta_description_generator_agent,
-    "small-text-generator": small_text_generator_agent,
-    "spell-checker": spell_checker_agent,
-    "grammar-checker": grammar_checker_agent,
-    "sentence-shortener": sentence_shortener_agent,
-    "sentence-generator": sentence_generator_agent,
+    "outline-generator": "outline_generator_agent",
+    "answer-generator": "answer_generator_agent",
+    "thesis-statement-generator": "thesis_statement_generator_agent",
+    "faq-generator": "faq_generator_agent",
+    "acronym-generator": "acronym_generator_agent",
+    "meta-description-generator": "meta_description_generator_agent",
+    "small-text-generator": "small_text_generator_agent",
+    "spell-checker": "spell_checker_agent",
+    "grammar-checker": "grammar_checker_agent",
+    "sentence-shortener": "sentence_shortener_agent",
+    "sentence-generator": "sentence_generator_agent",
+}
+
+# Additional slugs serving a registered agent: alias -> canonical slug.
+# Caching, coalescing, metrics and quotas all use the canonical slug.
+AGENT_ALIASES = {
+    "ai-story-generator": "story-generator",
+    "ai-content-improver": "article-rewriter",
+    "meta-tag-generator": "meta-description-generator",
 }
+agent_identity.add_aliases(AGENT_ALIASES)
+
+# Expected completion size per agent (see COST_CLASSES); others are "standard"
+AGENT_COST_CLASSES = {
+    "story-generator": "long",
+    "cover-letter-generator": "long",
+    "essay-writer": "long",
+    "article-rewriter": "long",
+    "humanize-ai": "long",
+    "paragraph-expander": "long",
+    "slogan-generator": "short",
+    "business-name-generator": "short",
+    "book-title-generator": "short",
+    "thesis-statement-generator": "short",
+    "acronym-generator": "short",
+    "meta-description-generator": "short",
+    "small-text-generator": "short",
+    "sentence-shortener": "short",
+    "sentence-generator": "short",
+}
+
+# ============= AGENT POST-PROCESSORS =============
+def business_name_domains(content: str, user_context: dict) -> str:
+    """
+    Annotate generated business names with domain availability.
+    
+    Enabled by user_context {"check_domains": true}; optional "tlds" and
+    "available_only" (drop names without an available domain).
+    """
+    if not user_context.get("check_domains"):
+        return content
+    from app.services.domain_checker import annotate_names
+    return annotate_names(content, user_context.get("tlds"), bool(user_context.get("available_only")))
+
 
-# ============= TOOL REGISTRY =============
-# Maps slug -> callable function (for deterministic tools)
-TOOL_REGISTRY = {
-    "hex-to-rgb": hex_to_rgb_logic,
-    "code-beautifier": code_beautifier_logic,
-    "domain-checker": domain_checker_logic,
-    "plagiarism-checker": plagiarism_checker_logic,
+# Maps canonical slug -> fn(content, user_context) applied to the agent's final output
+AGENT_POSTPROCESSORS = {
+    "business-name-generator": business_name_domains,
 }
 
-# ============= UNIFIED REGISTRY =============
-# Combined registry for all tools (agents + deterministic)
-UNIFIED_REGISTRY = {**AGENT_REGISTRY, **TOOL_REGISTRY}
+
+# ============= LOOKUPS =============
+# Deterministic tools register themselves with `tool_registry` (see
+# app.services.builtin_tools) and are imported on the first lookup.
+_agents: Dict[str, Agent] = {}
+
+
+def canonical_slug(slug: str) -> str:
+    """Resolve an agent alias to its canonical slug; other slugs are returned unchanged."""
+    return agent_identity.canonical(slug)
 
 
 def get_agent(slug: str) -> Optional[Agent]:
-    """Get an AI agent by slug."""
-    return AGENT_REGISTRY.get(slug)
+    """Get an AI agent by slug or alias, importing the agents module on first use."""
+    canonical = canonical_slug(slug)
+    agent = _agents.get(canonical)
+    if agent is None and canonical in AGENT_ATTRIBUTES:
+        agent = getattr(import_module(AGENTS_MODULE), AGENT_ATTRIBUTES[canonical])
+        agent_identity.register(AgentDescriptor(
+            canonical,
+            agent,
+            aliases=agent_identity.aliases_of(canonical),
+            cost_class=AGENT_COST_CLASSES.get(canonical, "standard")
+        ))
+        _agents[canonical] = agent
+    return agent
+
+
+def get_agent_descriptor(slug: str) -> Optional[AgentDescriptor]:
+    """Get the identity descriptor of an agent by slug or alias."""
+    return agent_identity.get(slug) if get_agent(slug) is not None else None
 
 
 def get_tool(slug: str) -> Optional[Callable]:
     """Get a deterministic tool by slug."""
-    return TOOL_REGISTRY.get(slug)
+    spec = tool_registry.get(slug)
+    return spec.fn if spec else None
+
+
+def get_tool_spec(slug: str) -> Optional[ToolSpec]:
+    """Get a deterministic tool with its execution metadata."""
+    return tool_registry.get(slug)
+
+
+def get_tool_streamer(slug: str) -> Optional[Callable[[str], Iterator[str]]]:
+    """Get the chunked variant of a deterministic tool, if it has one."""
+    spec = tool_registry.get(slug)
+    return spec.streamer if spec else None
+
+
+def get_agent_postprocessor(slug: str) -> Optional[Callable[[str, dict], str]]:
+    """Get the output post-processor of an agent, if it has one."""
+    return AGENT_POSTPROCESSORS.get(canonical_slug(slug))
 
 
 def get_agent_or_tool(slug: str) -> Optional[Union[Agent, Callable]]:
     """Get any handler (agent or tool) by slug."""
-    return UNIFIED_REGISTRY.get(slug)
+    return get_tool(slug) or get_agent(slug)
+
+
+def _configured(slugs: Iterable[str], slug: str) -> bool:
+    """Whether a per-agent setting lists the agent under any of its slugs."""
+    canonical = canonical_slug(slug)
+    return canonical in AGENT_ATTRIBUTES and any(canonical_slug(listed) == canonical for listed in slugs)
+
+
+def _setting_for(values: Dict[str, T], slug: str, default: T) -> T:
+    """Per-agent setting value, keyed by any of the agent's slugs."""
+    canonical = canonical_slug(slug)
+    for listed, value in values.items():
+        if canonical_slug(listed) == canonical:
+            return value
+    return default
+
+
+def is_cacheable(slug: str) -> bool:
+    """Check whether an agent has opted in to response caching."""
+    return _configured(settings.RESPONSE_CACHE_AGENTS, slug)
+
+
+def is_chunked(slug: str) -> bool:
+    """Check whether an agent runs long inputs in chunked (map-reduce) mode."""
+    return _configured(settings.CHUNKING_AGENTS, slug)
+
+
+def is_incremental(slug: str) -> bool:
+    """Check whether an agent serves incremental (diff-based) re-checking."""
+    return settings.INCREMENTAL_ENABLED and _configured(settings.INCREMENTAL_AGENTS, slug)
+
+
+def get_semantic_threshold(slug: str) -> Optional[float]:
+    """Get the similarity threshold of an agent using the semantic cache, or None if it does not."""
+    if not settings.SEMANTIC_CACHE_ENABLED or not _configured(settings.SEMANTIC_CACHE_AGENTS, slug):
+        return None
+    return _setting_for(settings.SEMANTIC_CACHE_THRESHOLDS, slug, settings.SEMANTIC_CACHE_THRESHOLD)
+
+
+def get_agent_timeout(slug: str) -> float:
+    """Get the execution deadline (seconds) for an agent."""
+    return _setting_for(settings.AGENT_TIMEOUTS, slug, settings.AGENT_TIMEOUT_SECONDS)
 
 
 def get_all_agent_slugs() -> list:
-    """Get all AI agent slugs."""
-    return list(AGENT_REGISTRY.keys())
+    """Get all AI agent slugs, aliases included."""
+    return [*AGENT_ATTRIBUTES, *AGENT_ALIASES]
+
+
+def get_all_agent_descriptors() -> List[AgentDescriptor]:
+    """Get the descriptors of all agents (one per canonical agent)."""
+    return [get_agent_descriptor(slug) for slug in AGENT_ATTRIBUTES]
 
 
 def get_all_tool_slugs() -> list:
     """Get all deterministic tool slugs."""
-    return list(TOOL_REGISTRY.keys())
+    return tool_registry.slugs()
 
 
 def get_all_slugs() -> list:
     """Get all available slugs (agents + tools)."""
-    return list(UNIFIED_REGISTRY.keys())
\ No newline at end of file
+    agent_slugs = get_all_agent_slugs()
+    return agent_slugs + [slug for slug in get_all_tool_slugs() if slug not in agent_slugs]
+
+
+# ============= COMPATIBILITY MAPPINGS =============
+class _LazyRegistry(Mapping):
+    """Read-only slug -> handler view resolved through the lookups above on access."""
+    
+    def __init__(self, slugs: Callable[[], list], lookup: Callable[[str], Optional[Callable]]):
+        self._slugs = slugs
+        self._lookup = lookup
+    
+    def __getitem__(self, slug: str):
+        handler = self._lookup(slug) if slug in self._slugs() else None
+        if handler is None:
+            raise KeyError(slug)
+        return handler
+    
+    def __contains__(self, slug) -> bool:
+        return slug in self._slugs()
+    
+    def __iter__(self):
+        return iter(self._slugs())
+    
+    def __len__(self) -> int:
+        return len(self._slugs())
+
+
+def _streamer_slugs() -> list:
+    return [slug for slug in get_all_tool_slugs() if get_tool_streamer(slug) is not None]
+
+
+# Pre-plugin-registry mappings: slug -> Agent, slug -> tool function,
+# slug -> tool streamer and both kinds combined (agents are imported on
+# first access, not by iteration or membership tests).
+AGENT_REGISTRY = _LazyRegistry(get_all_agent_slugs, get_agent)
+TOOL_REGISTRY = _LazyRegistry(get_all_tool_slugs, get_tool)
+TOOL_STREAMERS = _LazyRegistry(_streamer_slugs, get_tool_streamer)
+UNIFIED_REGISTRY = _LazyRegistry(get_all_slugs, get_agent_or_tool)
@@ -2,12 +2,35 @@
 Agents Router Module
 Handles all agent and tool processing endpoints.
 """
-from fastapi import APIRouter, HTTPException
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Union, Callable, Type
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from pydantic import BaseModel
 from agents import Agent
 
-from app.schemas import AgentRequest, AgentResponse
-from app.services.agent_executor import AgentExecutor, AgentExecutionError
-from .registry import get_agent_or_tool, get_all_slugs, get_all_agent_slugs, get_all_tool_slugs
+from app.core.config import settings, get_http_pool_stats
+from app.schemas import (
+    AgentRequest, AgentResponse, AgentStreamChunk, ErrorResponse,
+    IncrementalRequest, IncrementalResponse, BatchItem, BatchRequest, BatchItemResult, BatchResponse, JobStatus
+)
+from app.services.agent_executor import AgentExecutor, AgentExecutionError, single_flight
+from app.services.batch_executor import BatchExecutor
+from app.services.chunking import ChunkedExecutor, chunked_executor
+from app.services.incremental import incremental_checker, StaleRevisionError
+from app.services.job_queue import job_queue, JobQueueFullError
+from app.services.response_cache import response_cache, build_tool_cache_key, CachedResponse
+from app.services.semantic_cache import semantic_cache
+from app.services.agent_variants import agent_variants
+from app.services.provider_pool import provider_pool
+from app.services.admission import admission_controller, estimate_tokens
+from app.services.resilience import retry_policy
+from app.services.usage_ledger import usage_ledger, QuotaExceededError
+from app.services.tool_executor import tool_executor, ToolExecutorBusyError
+from app.services.tool_registry import ToolSpec
+from app.services import metrics
+from .registry import get_agent_or_tool, get_agent_postprocessor, get_tool_spec, get_tool_streamer, get_all_slugs, get_all_agent_slugs, get_all_tool_slugs, get_all_agent_descriptors, get_agent_descriptor, canonical_slug, is_cacheable, is_chunked, is_incremental, get_semantic_threshold, get_agent_timeout
 
 router = APIRouter()
 
@@ -28,53 +51,512 @@ async def list_agents():
     return get_all_agent_slugs()
 
 
+@router.get("/agents/descriptors")
+async def list_agent_descriptors():
+    """List one descriptor per distinct agent: canonical slug, aliases, settings and cost class."""
+    return [descriptor.describe() for descriptor in get_all_agent_descriptors()]
+
+
 @router.get("/tools")
 async def list_tools():
     """List all deterministic tool slugs."""
     return get_all_tool_slugs()
 
 
-@router.post("/process/{slug}", response_model=AgentResponse)
-async def process_tool(slug: str, request: AgentRequest):
+@router.get("/stats")
+async def get_stats():
+    """Runtime counters for the agent pipeline."""
+    return {
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "chunking": chunked_executor.stats(),
+        "incremental": incremental_checker.stats(),
+        "single_flight": single_flight.stats(),
+        "jobs": job_queue.stats(),
+        "agent_variants": agent_variants.stats(),
+        "http_pool": get_http_pool_stats(),
+        "providers": provider_pool.stats(),
+        "admission": admission_controller.stats(),
+        "resilience": retry_policy.stats(),
+        "usage": usage_ledger.stats(),
+        "tools": tool_executor.stats()
+    }
+
+
+@router.get("/usage")
+async def get_usage(http_request: Request):
+    """Token usage and quota of the calling client over the rolling windows."""
+    return usage_ledger.usage(_client_id(http_request))
+
+
+@router.post(
+    "/process/{slug}",
+    response_model=AgentResponse,
+    responses={202: {"model": JobStatus, "description": "Job accepted (async mode)"}}
+)
+async def process_tool(
+    slug: str,
+    request: AgentRequest,
+    http_request: Request,
+    run_async: bool = Query(default=False, alias="async", description="Queue the request and return a job id")
+):
     """
     Process a request using the specified agent or tool.
     
     Args:
         slug: The tool/agent identifier
         request: The input request containing prompt and optional settings
+        run_async: If true, return 202 with a JobStatus immediately; poll /jobs/{job_id}
         
     Returns:
         AgentResponse with the result
     """
+    entered = time.perf_counter()
+    handler = _get_handler_or_404(slug)
+    kind = _handler_kind(handler)
+    # Aliases are accounted under the canonical slug
+    canonical = canonical_slug(slug)
+    metrics.observe_parse(entered, canonical, kind)
+    metrics.observe_stage("lookup", entered, kind, canonical)
+    client_id = _client_id(http_request)
+    
+    if run_async:
+        reserved = None
+        if isinstance(handler, Agent):
+            # Queued jobs hold their reservation, so a burst of jobs cannot outrun the quota
+            reserved = _reserve_quota(client_id, canonical, handler, request)
+        try:
+            job = await job_queue.submit(slug, lambda: _run_handler(slug, handler, request, client_id, reserved))
+        except JobQueueFullError as e:
+            usage_ledger.release(client_id, reserved or 0)
+            raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": "5"})
+        return JSONResponse(status_code=202, content=job.model_dump())
+    
+    try:
+        response = await _run_handler(slug, handler, request, client_id)
+    except HTTPException:
+        raise
+    except AgentExecutionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.http_headers())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
+    
+    started = time.perf_counter()
+    body = response.model_dump_json()
+    metrics.observe_stage("serialize", started, kind, canonical)
+    # Already serialized, so FastAPI does not validate and encode the model again
+    return Response(content=body, media_type="application/json")
+
+
+def _get_handler_or_404(slug: str) -> Union[Agent, Callable]:
+    """Look up an agent or tool, raising 404 if the slug is unknown."""
     handler = get_agent_or_tool(slug)
     
     if not handler:
+        # Unknown slugs are not used as labels to keep metric cardinality bounded
+        metrics.count_error("NotFound", kind="unknown", slug="unknown")
         raise HTTPException(
             status_code=404, 
             detail=f"Tool '{slug}' not found. Use /api/v1/agents/list to see available tools."
         )
+    return handler
+
+
+def _handler_kind(handler: Union[Agent, Callable]) -> str:
+    """Metrics label distinguishing AI agents from deterministic tools."""
+    return "agent" if isinstance(handler, Agent) else "tool"
+
+
+def _client_id(http_request: Request) -> str:
+    """
+    Identify the calling client for usage accounting: the client an API key
+    in USAGE_API_KEYS belongs to, else the peer address. Caller-chosen
+    names are never trusted, so quotas cannot be reset by renaming.
+    """
+    api_key = http_request.headers.get(settings.USAGE_API_KEY_HEADER)
+    if api_key:
+        client_id = settings.USAGE_API_KEYS.get(api_key)
+        if client_id:
+            return client_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+
+def _reserve_quota(client_id: str, slug: str, handler: Agent, request: AgentRequest) -> int:
+    """
+    Reserve the request's estimated tokens (prompt plus max_tokens or the
+    agent's cost class) against the client's quota; raise 429 if it is used up.
     
+    Returns:
+        Tokens reserved, settled by usage_ledger.record or usage_ledger.release
+    """
+    max_tokens = (request.settings.max_tokens if request.settings else None) or handler.model_settings.max_tokens
+    if max_tokens is None:
+        descriptor = get_agent_descriptor(slug)
+        max_tokens = descriptor.completion_tokens if descriptor else None
     try:
-        # AI Agent execution
-        if isinstance(handler, Agent):
-            return await AgentExecutor.execute(
+        return usage_ledger.check(client_id, estimate_tokens(request.prompt, max_tokens))
+    except QuotaExceededError as e:
+        metrics.count_error("QuotaExceeded", "agent", slug)
+        raise HTTPException(status_code=429, detail=e.message, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _run_handler(
+    slug: str,
+    handler: Union[Agent, Callable],
+    request: AgentRequest,
+    client_id: str,
+    reserved: Optional[int] = None
+) -> AgentResponse:
+    """
+    Execute an agent or deterministic tool and return its response.
+    `reserved` is a quota reservation already made for this request (queued jobs).
+    """
+    canonical = canonical_slug(slug)
+    metrics.current_slug.set(canonical)
+    
+    # AI Agent execution
+    if isinstance(handler, Agent):
+        # Quotas are enforced before any upstream call is made
+        if reserved is None:
+            reserved = _reserve_quota(client_id, canonical, handler, request)
+        executor = _executor_for(slug, request.prompt)
+        try:
+            response = await executor.execute(
                 agent=handler,
                 prompt=request.prompt,
                 settings=request.settings,
-                user_context=request.user_context
+                user_context=request.user_context,
+                cacheable=is_cacheable(slug),
+                timeout=get_agent_timeout(slug),
+                semantic_threshold=get_semantic_threshold(slug)
             )
+        except BaseException:
+            usage_ledger.release(client_id, reserved)
+            raise
+        usage_ledger.record(client_id, canonical, response.usage, reserved)
+        return _postprocess(slug, response, request.user_context)
+    
+    # Deterministic tool execution
+    elif callable(handler):
+        result = await _run_tool(slug, handler, request.prompt)
+        return AgentResponse(
+            status="success",
+            content=str(result)
+        )
+    
+    raise HTTPException(status_code=500, detail="Invalid tool configuration")
+
+
+def _executor_for(slug: str, prompt: str) -> Union[Type[AgentExecutor], ChunkedExecutor]:
+    """Long inputs to chunking agents run chunk by chunk; everything else in one call."""
+    if is_chunked(slug) and chunked_executor.applies(prompt):
+        return chunked_executor
+    return AgentExecutor
+
+
+def _postprocess(slug: str, response: AgentResponse, user_context: Optional[Dict[str, Any]]) -> AgentResponse:
+    """Apply the agent's output post-processor (e.g. domain checks for business names)."""
+    postprocessor = get_agent_postprocessor(slug)
+    if postprocessor is None or not user_context or not response.content:
+        return response
+    # Copy: the response may be shared with the cache or coalesced callers
+    return response.model_copy(update={"content": postprocessor(response.content, user_context)})
+
+
+def _check_tool_input(slug: str, spec: Optional[ToolSpec], input_data: str) -> None:
+    """Reject inputs over the tool's max_input_chars (422)."""
+    if spec is not None and len(input_data) > spec.max_input_chars:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Input too long for '{slug}': {len(input_data)} characters (max {spec.max_input_chars})"
+        )
+
+
+async def _run_tool(slug: str, handler: Callable, input_data: str) -> Any:
+    """
+    Run a deterministic tool inline or on a worker pool, depending on input
+    size and the tool's registry metadata. Cacheable tools are served from
+    the response cache.
+    """
+    spec = get_tool_spec(slug)
+    _check_tool_input(slug, spec, input_data)
+    cache_key = None
+    if spec is not None and spec.cacheable and response_cache.enabled:
+        cache_key = build_tool_cache_key(slug, input_data)
+        cached = await response_cache.get(cache_key)
+        metrics.count_cache_lookup("miss" if cached is None else "hit")
+        if cached is not None:
+            return cached.content
+    
+    started = time.perf_counter()
+    try:
+        result = await tool_executor.run(slug, handler, input_data, spec.policy() if spec else None)
+    except ToolExecutorBusyError as e:
+        metrics.count_error("ToolExecutorBusy", "tool", slug)
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": "1"})
+    except Exception as e:
+        metrics.count_error(type(e).__name__, "tool", slug)
+        raise
+    metrics.observe_stage("tool", started, "tool", slug)
+    if cache_key is not None:
+        await response_cache.set(cache_key, CachedResponse(str(result), None))
+    return result
+
+
+async def _stream_tool(slug: str, streamer: Callable[[str], Iterator[str]], input_data: str) -> AsyncIterator[str]:
+    """Drive a tool's chunk iterator through the tool executor, yielding chunks as they are ready."""
+    spec = get_tool_spec(slug)
+    _check_tool_input(slug, spec, input_data)
+    started = time.perf_counter()
+    try:
+        async with aclosing(tool_executor.stream(slug, streamer, input_data, spec.policy() if spec else None)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+    except ToolExecutorBusyError as e:
+        metrics.count_error("ToolExecutorBusy", "tool", slug)
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": "1"})
+    except Exception as e:
+        metrics.count_error(type(e).__name__, "tool", slug)
+        raise
+    metrics.observe_stage("tool", started, "tool", slug)
+
+
+def _sse_event(event: str, payload: BaseModel) -> str:
+    """Format a schema instance as a Server-Sent Events frame."""
+    return f"event: {event}\ndata: {payload.model_dump_json()}\n\n"
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, description="Long-poll up to this many seconds for completion")
+):
+    """
+    Get the status and result of an asynchronous job.
+    
+    Args:
+        job_id: Identifier returned by `/process/{slug}?async=true`
+        wait: Seconds to wait for the job to finish (capped by JOB_WAIT_MAX_SECONDS)
         
-        # Deterministic tool execution
-        elif callable(handler):
-            result = handler(request.prompt)
-            return AgentResponse(
-                status="success",
-                content=str(result)
-            )
+    Returns:
+        JobStatus with the result once the job has finished
+    """
+    if wait > 0:
+        job = await job_queue.wait(job_id, timeout=min(wait, settings.JOB_WAIT_MAX_SECONDS))
+    else:
+        job = await job_queue.get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired")
+    return job
+
+
+@router.post("/process/{slug}/incremental", response_model=IncrementalResponse)
+async def process_incremental(slug: str, request: IncrementalRequest, http_request: Request):
+    """
+    Check a new revision of a document, re-checking only what changed.
+    
+    The last processed revision of each document (per client and agent) is
+    kept server-side. Each request sends the full text; it is diffed by
+    sentence against the stored revision, only changed sentences go to the
+    agent, and the response carries the corrected full text.
+    
+    Args:
+        slug: An agent in INCREMENTAL_AGENTS (grammar-checker, spell-checker)
+        request: Full text of the revision with its document_id and revision number
         
+    Returns:
+        IncrementalResponse with the corrected text and how much was re-checked
+    """
+    entered = time.perf_counter()
+    handler = _get_handler_or_404(slug)
+    if not isinstance(handler, Agent) or not is_incremental(slug):
+        raise HTTPException(
+            status_code=400,
+            detail=f"'{slug}' does not support incremental checking (available: {', '.join(settings.INCREMENTAL_AGENTS)})"
+        )
+    canonical = canonical_slug(slug)
+    metrics.observe_parse(entered, canonical, "agent")
+    metrics.observe_stage("lookup", entered, "agent", canonical)
+    metrics.current_slug.set(canonical)
+    client_id = _client_id(http_request)
+    reserved = _reserve_quota(client_id, canonical, handler, request)
+    
+    try:
+        response = await incremental_checker.check(
+            client_id=client_id,
+            slug=canonical,
+            agent=handler,
+            document_id=request.document_id,
+            revision=request.revision,
+            text=request.prompt,
+            settings=request.settings,
+            user_context=request.user_context,
+            timeout=get_agent_timeout(slug)
+        )
+    except StaleRevisionError as e:
+        usage_ledger.release(client_id, reserved)
+        raise HTTPException(status_code=409, detail=e.message)
+    except AgentExecutionError as e:
+        usage_ledger.release(client_id, reserved)
+        raise HTTPException(status_code=e.status_code, detail=e.message, headers=e.http_headers())
+    except Exception as e:
+        usage_ledger.release(client_id, reserved)
+        raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
+    usage_ledger.record(client_id, canonical, response.usage, reserved)
+    
+    started = time.perf_counter()
+    body = response.model_dump_json()
+    metrics.observe_stage("serialize", started, "agent", canonical)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/process/{slug}/stream")
+async def process_tool_stream(slug: str, request: AgentRequest, http_request: Request):
+    """
+    Process a request and stream the result as Server-Sent Events.
+    
+    Emits `delta` events with each generated text fragment, then a single
+    `done` event carrying the full AgentResponse (agent_id, content, usage).
+    Failures after the stream has started are reported as an `error` event.
+    Deterministic tools emit only the `done` event, except tools with a
+    chunked mode (code-beautifier), which emit `delta` events as well.
+    
+    Args:
+        slug: The tool/agent identifier
+        request: The input request containing prompt and optional settings
+    """
+    entered = time.perf_counter()
+    handler = _get_handler_or_404(slug)
+    kind = _handler_kind(handler)
+    canonical = canonical_slug(slug)
+    metrics.observe_parse(entered, canonical, kind)
+    metrics.observe_stage("lookup", entered, kind, canonical)
+    
+    if not isinstance(handler, Agent) and not callable(handler):
         raise HTTPException(status_code=500, detail="Invalid tool configuration")
+    
+    client_id = _client_id(http_request)
+    reserved = _reserve_quota(client_id, canonical, handler, request) if isinstance(handler, Agent) else 0
+    
+    async def event_stream() -> AsyncIterator[str]:
+        nonlocal reserved
+        metrics.current_slug.set(canonical)
+        try:
+            if isinstance(handler, Agent):
+                # Close the executor stream (and its upstream run) as soon as the client disconnects
+                async with aclosing(_executor_for(slug, request.prompt).stream(
+                    agent=handler,
+                    prompt=request.prompt,
+                    settings=request.settings,
+                    user_context=request.user_context,
+                    cacheable=is_cacheable(slug),
+                    timeout=get_agent_timeout(slug),
+                    semantic_threshold=get_semantic_threshold(slug)
+                )) as items:
+                    async for item in items:
+                        if isinstance(item, AgentResponse):
+                            usage_ledger.record(client_id, canonical, item.usage, reserved)
+                            reserved = 0
+                            started = time.perf_counter()
+                            frame = _sse_event("done", _postprocess(slug, item, request.user_context))
+                            metrics.observe_stage("serialize", started, kind, canonical)
+                            yield frame
+                        else:
+                            yield _sse_event("delta", item)
+            elif get_tool_streamer(slug) is not None:
+                response = AgentResponse(status="success", content="")
+                parts = []
+                async for chunk in _stream_tool(slug, get_tool_streamer(slug), request.prompt):
+                    parts.append(chunk)
+                    yield _sse_event("delta", AgentStreamChunk(agent_id=response.agent_id, delta=chunk))
+                response.content = "".join(parts)
+                yield _sse_event("done", response)
+            else:
+                result = await _run_tool(slug, handler, request.prompt)
+                yield _sse_event("done", AgentResponse(status="success", content=str(result)))
         
+        except AgentExecutionError as e:
+            yield _sse_event("error", e.to_error_response())
+        except HTTPException as e:
+            yield _sse_event("error", ErrorResponse(message=str(e.detail)))
+        except Exception as e:
+            if kind == "agent":
+                metrics.count_error(type(e).__name__, kind, canonical)
+            yield _sse_event("error", ErrorResponse(message=f"Execution error: {str(e)}"))
+        finally:
+            # Failed runs and clients that disconnected mid-stream give the reservation back
+            usage_ledger.release(client_id, reserved)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+async def _run_batch_item(index: int, item: BatchItem, client_id: str) -> BatchItemResult:
+    """Run one batch item, capturing any failure as a per-item error."""
+    try:
+        handler = _get_handler_or_404(item.slug)
+        response = await _run_handler(item.slug, handler, item, client_id)
+        return BatchItemResult(index=index, slug=item.slug, response=response)
+    except HTTPException as e:
+        error = ErrorResponse(message=str(e.detail))
     except AgentExecutionError as e:
-        raise HTTPException(status_code=500, detail=e.message)
+        error = e.to_error_response()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Execution error: {str(e)}")
\ No newline at end of file
+        error = ErrorResponse(message=f"Execution error: {str(e)}")
+    return BatchItemResult(index=index, slug=item.slug, error=error)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def process_batch(
+    request: BatchRequest,
+    http_request: Request,
+    stream: bool = Query(default=False, description="Stream results as NDJSON in completion order")
+):
+    """
+    Process many prompts across agents and tools in a single call.
+    
+    Items are dispatched with bounded concurrency. A failing item does not
+    fail the batch; its result carries an `error` instead of a `response`.
+    
+    Args:
+        request: Items to process and optional concurrency
+        stream: If true, emit one BatchItemResult JSON line per item as it completes
+        
+    Returns:
+        BatchResponse with results in request order, or an NDJSON stream
+    """
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {settings.BATCH_MAX_ITEMS})"
+        )
+    total_chars = sum(len(item.prompt) for item in request.items)
+    if total_chars > settings.BATCH_MAX_TOTAL_CHARS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {total_chars} prompt characters (max {settings.BATCH_MAX_TOTAL_CHARS})"
+        )
+    
+    concurrency = min(request.concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    client_id = _client_id(http_request)
+    
+    async def run_item(index: int, item: BatchItem) -> BatchItemResult:
+        return await _run_batch_item(index, item, client_id)
+    
+    if stream:
+        async def result_stream() -> AsyncIterator[str]:
+            async for result in BatchExecutor.run_as_completed(request.items, run_item, concurrency):
+                yield result.model_dump_json() + "\n"
+        
+        return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+    
+    results = await BatchExecutor.run_ordered(request.items, run_item, concurrency)
+    status = "success" if all(r.error is None for r in results) else "partial"
+    return BatchResponse(status=status, results=results)
@@ -1,2 +1,12 @@
 # Core module - configuration and settings
-from .config import settings, get_gemini_client, get_gemini_model, get_run_config
+from .config import (
+    settings,
+    create_http_client,
+    create_gemini_client,
+    get_gemini_http_client,
+    get_gemini_client,
+    get_gemini_model,
+    get_run_config,
+    get_http_pool_stats,
+    resolve_workers
+)
@@ -4,10 +4,33 @@ Handles environment variables and API client initialization.
 """
 import os
 from functools import lru_cache
+from typing import Optional, Dict, Any
+import httpx
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from agents import AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
 
 
+class GeminiProviderSettings(BaseModel):
+    """One API key/endpoint in the provider pool. Empty fields fall back to GEMINI_*."""
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    weight: float = 1.0
+
+
+class UsageQuotaSettings(BaseModel):
+    """Token quotas for one API client. 0 disables a window."""
+    tokens_per_minute: int = 0
+    tokens_per_hour: int = 0
+    tokens_per_day: int = 0
+
+
+class ToolPolicySettings(BaseModel):
+    """Execution policy for one deterministic tool."""
+    pool: str = "thread"  # "thread" or "process", used above the inline threshold
+    inline_max_chars: Optional[int] = None  # Defaults to TOOL_INLINE_MAX_CHARS
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
@@ -16,10 +39,58 @@ class Settings(BaseSettings):
     GEMINI_BASE_URL: str = "https://generativelanguage.googleapis.com/v1beta/openai/"
     GEMINI_MODEL: str = "gemini-2.5-flash"
     
+    # Gemini HTTP Client Configuration
+    GEMINI_HTTP_MAX_CONNECTIONS: int = 200
+    GEMINI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    GEMINI_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    GEMINI_HTTP2: bool = False  # Requires the optional `h2` package
+    GEMINI_CONNECT_TIMEOUT: float = 5.0
+    GEMINI_READ_TIMEOUT: float = 120.0
+    GEMINI_WRITE_TIMEOUT: float = 30.0
+    GEMINI_POOL_TIMEOUT: float = 10.0
+    GEMINI_MAX_RETRIES: int = 0  # Retries are handled by RETRY_* below
+    
+    # Provider Pool Configuration
+    # JSON list, e.g. [{"api_key": "key-1"}, {"api_key": "key-2", "weight": 2}]
+    GEMINI_PROVIDERS: list[GeminiProviderSettings] = []
+    PROVIDER_COOLDOWN_SECONDS: float = 30.0
+    
+    # Admission Control Configuration (budget shared by all providers)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_REQUESTS_PER_MINUTE: float = 1000.0
+    ADMISSION_TOKENS_PER_MINUTE: float = 1000000.0
+    ADMISSION_BURST_SECONDS: float = 1.0
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    ADMISSION_MAX_QUEUE: int = 500
+    ADMISSION_DEFAULT_COMPLETION_TOKENS: int = 1024
+    ADMISSION_PRIORITY_MAX_TEMPERATURE: float = 0.2
+    
+    # Retry / Timeout Configuration
+    AGENT_TIMEOUT_SECONDS: float = 60.0
+    # Per-agent deadlines overriding AGENT_TIMEOUT_SECONDS, e.g. {"essay-writer": 120}
+    AGENT_TIMEOUTS: dict[str, float] = {
+        "essay-writer": 120.0,
+    }
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY_SECONDS: float = 0.5
+    RETRY_MAX_DELAY_SECONDS: float = 8.0
+    # Hedging sends a backup request once a call exceeds the agent's p95 latency
+    HEDGE_ENABLED: bool = False
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    HEDGE_LATENCY_WINDOW: int = 200
+    
     # Server Configuration
     HOST: str = "127.0.0.1"
     PORT: int = 8000
     DEBUG: bool = True
+    # Production server (python -m app.server)
+    SERVER_WORKERS: int = 1  # 0 = one worker per CPU core
+    SERVER_PRELOAD_APP: bool = True  # Import the app once before forking workers
+    SERVER_DRAIN_SECONDS: float = 30.0  # On SIGTERM, in-flight and streaming requests get this long
+    SERVER_KEEPALIVE_SECONDS: float = 5.0
+    SERVER_BACKLOG: int = 2048
+    SERVER_RESTART_WORKERS: bool = True  # Replace workers that exit unexpectedly
     
     # CORS Configuration
     CORS_ORIGINS: list[str] = [
@@ -27,6 +98,161 @@ class Settings(BaseSettings):
         "http://127.0.0.1:3000",
     ]
     
+    # Input size limits: agent prompts vs. deterministic tool inputs (e.g. color palettes)
+    AGENT_PROMPT_MAX_CHARS: int = 50000
+    TOOL_INPUT_MAX_CHARS: int = 2000000
+    
+    # Agent clones kept for per-request model settings overrides
+    AGENT_VARIANT_POOL_SIZE: int = 256
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    # Only deterministic (low-temperature) agents should be listed here
+    RESPONSE_CACHE_AGENTS: list[str] = [
+        "spell-checker",
+        "grammar-checker",
+        "meta-description-generator",
+        "meta-tag-generator",
+        "acronym-generator",
+    ]
+    
+    # Coalesce identical concurrent requests to cacheable agents
+    SINGLE_FLIGHT_ENABLED: bool = True
+    
+    # Semantic cache: near-duplicate prompts to the agents below reuse a response
+    # (hashed n-gram embeddings, one bounded index per agent and settings scope)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_AGENTS: list[str] = [
+        "spell-checker",
+        "grammar-checker",
+        "meta-description-generator",
+    ]
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Cosine similarity needed to reuse a response
+    SEMANTIC_CACHE_THRESHOLDS: dict[str, float] = {}  # Per-agent overrides by slug
+    SEMANTIC_CACHE_DIM: int = 512
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT: int = 1000
+    SEMANTIC_CACHE_MAX_INDEXES: int = 32
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600.0
+    # Longer prompts skip the tier: small edits to long texts barely change similarity
+    SEMANTIC_CACHE_MAX_PROMPT_CHARS: int = 2000
+    
+    # Long-input chunking: prompts to the agents below longer than CHUNKING_MIN_CHARS
+    # are split on paragraph/sentence boundaries and the chunks run concurrently
+    CHUNKING_ENABLED: bool = True
+    CHUNKING_AGENTS: list[str] = [
+        "article-rewriter",
+        "grammar-checker",
+        "spell-checker",
+        "humanize-ai",
+    ]
+    CHUNKING_MIN_CHARS: int = 6000
+    CHUNKING_MAX_CHUNK_CHARS: int = 3000
+    CHUNKING_OVERLAP_CHARS: int = 300  # Tail of the previous chunk sent along as context only
+    CHUNKING_CONCURRENCY: int = 4  # Chunks of one document in flight at once
+    # Cache chunk results even for agents not in RESPONSE_CACHE_AGENTS, so a
+    # resubmitted document only re-runs the chunks that changed
+    CHUNKING_CACHE_CHUNKS: bool = True
+    
+    # Incremental re-checking (/process/{slug}/incremental): the last processed
+    # revision of each document is kept so only changed sentences are re-checked
+    INCREMENTAL_ENABLED: bool = True
+    INCREMENTAL_AGENTS: list[str] = [
+        "grammar-checker",
+        "spell-checker",
+    ]
+    INCREMENTAL_MAX_DOCUMENTS: int = 1000
+    INCREMENTAL_TTL_SECONDS: float = 3600.0
+    INCREMENTAL_MAX_HUNK_CHARS: int = 2000  # Consecutive changed sentences checked in one call
+    INCREMENTAL_CONCURRENCY: int = 4  # Calls per revision in flight at once
+    
+    # Batch Processing Configuration
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_MAX_CONCURRENCY: int = 16
+    BATCH_MAX_TOTAL_CHARS: int = 4000000  # Sum of all item prompts
+    
+    # Async Job Configuration
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_SIZE: int = 1000
+    JOB_STORE: str = "memory"  # "memory" or "sqlite"
+    JOB_STORE_PATH: str = "jobs.db"
+    JOB_STORE_MAX_ENTRIES: int = 10000
+    JOB_RESULT_TTL_SECONDS: float = 86400.0
+    JOB_WAIT_MAX_SECONDS: float = 30.0
+    # Fail jobs left unfinished by a previous run (the production server does this once, before forking)
+    JOB_RECOVER_ON_START: bool = True
+    
+    # Deterministic Tool Execution
+    # Extra plugin modules registering tools with @tool (entry points in the
+    # "webtool_platform.tools" group are loaded as well)
+    TOOL_PLUGIN_MODULES: list[str] = []
+    # Inputs up to this many characters run inline; larger ones go to a worker pool
+    TOOL_INLINE_MAX_CHARS: int = 2000
+    TOOL_THREAD_WORKERS: int = 4
+    TOOL_PROCESS_WORKERS: int = 2
+    TOOL_MAX_PENDING: int = 256
+    # Per-tool overrides, e.g. {"plagiarism-checker": {"pool": "process", "inline_max_chars": 500}}
+    TOOL_POLICIES: dict[str, ToolPolicySettings] = {}
+    
+    # Code Beautifier Configuration
+    CODE_FORMAT_INDENT: int = 4
+    CODE_FORMAT_CACHE_ENTRIES: int = 512  # Formatted outputs kept by content hash
+    CODE_FORMAT_STREAM_CHUNK_LINES: int = 500  # Lines per delta event when streaming
+    
+    # Plagiarism Checker Configuration
+    # Built with `python -m app.services.plagiarism build <corpus_dir>`
+    PLAGIARISM_INDEX_PATH: str = "plagiarism_index"
+    PLAGIARISM_MATCH_THRESHOLD: float = 0.5  # Estimated Jaccard similarity of a matching window
+    PLAGIARISM_TOP_SOURCES: int = 5
+    # Index parameters (used when building; a saved index keeps its own)
+    PLAGIARISM_SHINGLE_SIZE: int = 5
+    PLAGIARISM_WINDOW_WORDS: int = 64
+    PLAGIARISM_NUM_PERM: int = 128
+    PLAGIARISM_BANDS: int = 32
+    
+    # Domain Checker Configuration
+    # Built with `python -m app.services.domain_checker build <zone_files...>`
+    DOMAIN_INDEX_PATH: str = "domain_index"
+    DOMAIN_TLDS: list[str] = ["com", "net", "org", "io", "co", "ai", "app", "dev"]
+    DOMAIN_VARIANT_PREFIXES: list[str] = ["get", "try", "my", "the", "go", "use"]
+    DOMAIN_VARIANT_SUFFIXES: list[str] = ["app", "hq", "hub", "ly", "labs", "now", "online"]
+    DOMAIN_MAX_VARIANTS: int = 64  # Candidate labels per seed name
+    DOMAIN_MAX_CANDIDATES: int = 10000  # Domains checked per request
+    
+    # Usage Ledger Configuration
+    USAGE_LEDGER_ENABLED: bool = True
+    # Clients are identified by an API key sent in USAGE_API_KEY_HEADER and
+    # mapped to a client ID here; requests without a known key count against
+    # their peer address. Client-supplied IDs are never trusted.
+    USAGE_API_KEY_HEADER: str = "X-API-Key"
+    USAGE_API_KEYS: dict[str, str] = {}  # API key -> client ID
+    USAGE_STORE: str = "sqlite"  # "sqlite" or "memory"
+    USAGE_STORE_PATH: str = "usage.db"
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 10.0
+    # Default per-client token quotas (0 = unlimited)
+    USAGE_QUOTA_TOKENS_PER_MINUTE: int = 0
+    USAGE_QUOTA_TOKENS_PER_HOUR: int = 0
+    USAGE_QUOTA_TOKENS_PER_DAY: int = 0
+    # Per-client overrides, e.g. {"acme": {"tokens_per_day": 2000000}}
+    USAGE_CLIENT_QUOTAS: dict[str, UsageQuotaSettings] = {}
+    
+    # Metrics Configuration (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = True
+    # Directory where workers share metric snapshots, so /metrics covers all of them
+    # (app.server uses a temporary directory when running several workers)
+    METRICS_MULTIPROCESS_DIR: str = ""
+    METRICS_SYNC_INTERVAL_SECONDS: float = 5.0
+    
+    # Startup Warmup & Readiness (/health/live, /health/ready)
+    WARMUP_ENABLED: bool = True
+    WARMUP_HTTP_CONNECTIONS: int = 4  # Keep-alive connections opened per provider
+    # Settings overrides to pre-build agent variants for, e.g. [{"temperature": 0.2}]
+    WARMUP_AGENT_VARIANTS: list[dict[str, float]] = []
+    READINESS_CHECK_UPSTREAM: bool = True
+    READINESS_UPSTREAM_TIMEOUT_SECONDS: float = 2.0
+    READINESS_CACHE_SECONDS: float = 10.0  # Upstream probe results are reused this long
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -43,19 +269,76 @@ def get_settings() -> Settings:
 settings = get_settings()
 
 
+def resolve_workers(requested: int) -> int:
+    """Worker count: `requested`, or one per CPU core for 0."""
+    return requested if requested > 0 else (os.cpu_count() or 1)
+
+
 # Cached clients to avoid recreation
+_gemini_http_client = None
 _gemini_client = None
 _gemini_model = None
+_run_config = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client behind a Gemini client.
+    
+    Pool limits, keep-alive, HTTP/2 and timeouts come from Settings.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.GEMINI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GEMINI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.GEMINI_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.GEMINI_CONNECT_TIMEOUT,
+            read=settings.GEMINI_READ_TIMEOUT,
+            write=settings.GEMINI_WRITE_TIMEOUT,
+            pool=settings.GEMINI_POOL_TIMEOUT,
+        ),
+        http2=settings.GEMINI_HTTP2,
+        follow_redirects=True,
+    )
+
+
+def create_gemini_client(api_key: str = None, base_url: str = None, http_client: httpx.AsyncClient = None) -> AsyncOpenAI:
+    """
+    Create a Gemini API client on a pooled, tunable HTTP client.
+    
+    Pool limits, keep-alive, HTTP/2, timeouts and retries come from Settings.
+    
+    Args:
+        api_key: API key (defaults to GEMINI_API_KEY)
+        base_url: Endpoint (defaults to GEMINI_BASE_URL)
+        http_client: HTTP client to send requests through (defaults to a new one)
+        
+    Returns:
+        AsyncOpenAI client
+    """
+    return AsyncOpenAI(
+        api_key=api_key or settings.GEMINI_API_KEY,
+        base_url=base_url or settings.GEMINI_BASE_URL,
+        max_retries=settings.GEMINI_MAX_RETRIES,
+        http_client=http_client or create_http_client(),
+    )
+
+
+def get_gemini_http_client() -> httpx.AsyncClient:
+    """Get the HTTP client behind the shared Gemini client (singleton)."""
+    global _gemini_http_client
+    if _gemini_http_client is None:
+        _gemini_http_client = create_http_client()
+    return _gemini_http_client
 
 
 def get_gemini_client() -> AsyncOpenAI:
     """Get Gemini API client (singleton)."""
     global _gemini_client
     if _gemini_client is None:
-        _gemini_client = AsyncOpenAI(
-            api_key=settings.GEMINI_API_KEY,
-            base_url=settings.GEMINI_BASE_URL,
-        )
+        _gemini_client = create_gemini_client(http_client=get_gemini_http_client())
     return _gemini_client
 
 
@@ -71,9 +354,28 @@ def get_gemini_model() -> OpenAIChatCompletionsModel:
 
 
 def get_run_config() -> RunConfig:
-    """Get RunConfig for agent execution."""
-    return RunConfig(
-        model_provider=get_gemini_client(),
-        model=get_gemini_model(),
-        tracing_disabled=True
-    )
+    """Get RunConfig for agent execution (singleton)."""
+    global _run_config
+    if _run_config is None:
+        _run_config = RunConfig(
+            model_provider=get_gemini_client(),
+            model=get_gemini_model(),
+            tracing_disabled=True
+        )
+    return _run_config
+
+
+def get_http_pool_stats(http_client: httpx.AsyncClient = None) -> Dict[str, Any]:
+    """
+    Snapshot of the HTTP connection pool behind a Gemini client.
+    `queued` counts requests waiting for a free connection.
+    """
+    http_client = http_client or get_gemini_http_client()
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {
+        "max_connections": settings.GEMINI_HTTP_MAX_CONNECTIONS,
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "queued": sum(1 for r in getattr(pool, "_requests", []) if getattr(r, "connection", None) is None),
+    }
@@ -1,11 +1,14 @@
 """
 App Main Module - FastAPI Application Factory
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
 from app.api.v1.router import router as api_v1_router
+from app.services.metrics import MetricsMiddleware, registry as metrics_registry, multiprocess_metrics
+from app.services.warmup import warmup, lifespan
 
 
 def create_app() -> FastAPI:
@@ -15,7 +18,8 @@ def create_app() -> FastAPI:
         description="AI-powered tools and content generation platform",
         version="2.0.0",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
     
     # CORS Configuration
@@ -27,13 +31,30 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Per-request timing and in-flight tracking for /metrics
+    application.add_middleware(MetricsMiddleware)
+    
     # Include routers
     application.include_router(api_v1_router)
     
     @application.get("/health")
+    @application.get("/health/live")
     async def health():
+        """Liveness: the process is up and serving requests."""
         return {"status": "healthy"}
     
+    @application.get("/health/ready")
+    async def readiness():
+        """Readiness: warmup finished and the upstream API is reachable (503 otherwise)."""
+        report = await warmup.readiness()
+        return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+    
+    @application.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        if not metrics_registry.enabled:
+            raise HTTPException(status_code=404, detail="Metrics are disabled")
+        return PlainTextResponse(multiprocess_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
     return application
 
 
@@ -2,15 +2,31 @@
 from .base import (
     AgentRequest,
     AgentResponse,
+    AgentStreamChunk,
+    IncrementalRequest,
+    IncrementalResponse,
     ModelSettingsSchema,
     ErrorResponse,
-    UsageInfo
+    UsageInfo,
+    BatchItem,
+    BatchRequest,
+    BatchItemResult,
+    BatchResponse,
+    JobStatus
 )
 
 __all__ = [
     "AgentRequest",
     "AgentResponse", 
+    "AgentStreamChunk",
+    "IncrementalRequest",
+    "IncrementalResponse",
     "ModelSettingsSchema",
     "ErrorResponse",
-    "UsageInfo"
+    "UsageInfo",
+    "BatchItem",
+    "BatchRequest",
+    "BatchItemResult",
+    "BatchResponse",
+    "JobStatus"
 ]
@@ -2,10 +2,12 @@
 Standardized Pydantic Schemas for Agent Request/Response.
 Follows strict schema to prevent hallucination and ensure consistency.
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 import uuid
 
+from app.core.config import settings as app_settings
+
 
 class ModelSettingsSchema(BaseModel):
     """Model settings that can be passed from frontend."""
@@ -36,8 +38,8 @@ class AgentRequest(BaseModel):
     prompt: str = Field(
         ...,
         min_length=1,
-        max_length=50000,
-        description="The user's input prompt for the agent"
+        max_length=max(app_settings.AGENT_PROMPT_MAX_CHARS, app_settings.TOOL_INPUT_MAX_CHARS),
+        description="The user's input prompt for the agent (agents accept up to AGENT_PROMPT_MAX_CHARS)"
     )
     settings: Optional[ModelSettingsSchema] = Field(
         default=None,
@@ -49,6 +51,49 @@ class AgentRequest(BaseModel):
     )
 
 
+class BatchItem(AgentRequest):
+    """A single unit of work in a batch request."""
+    slug: str = Field(
+        ...,
+        description="Tool/agent identifier to run this item with"
+    )
+
+
+class BatchRequest(BaseModel):
+    """Input schema for processing many prompts in one call."""
+    items: List[BatchItem] = Field(
+        ...,
+        min_length=1,
+        description="Items to process, each with its own slug"
+    )
+    concurrency: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Maximum items processed at once (capped by the server limit)"
+    )
+
+
+class IncrementalRequest(AgentRequest):
+    """A full revision of a document to re-check against its previous revision."""
+    prompt: str = Field(
+        ...,
+        min_length=1,
+        max_length=app_settings.AGENT_PROMPT_MAX_CHARS,
+        description="Full text of the revision"
+    )
+    document_id: str = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Client-chosen identifier of the document being edited"
+    )
+    revision: int = Field(
+        ...,
+        ge=0,
+        description="Revision number, increasing with every edit"
+    )
+
+
 class UsageInfo(BaseModel):
     """Token usage information from the model."""
     prompt_tokens: Optional[int] = None
@@ -79,6 +124,45 @@ class AgentResponse(BaseModel):
     )
 
 
+class IncrementalResponse(AgentResponse):
+    """Corrected full text of a revision, with what was re-checked."""
+    document_id: str = Field(
+        ...,
+        description="Identifier of the document"
+    )
+    revision: int = Field(
+        ...,
+        description="Revision this response corrects"
+    )
+    base_revision: Optional[int] = Field(
+        default=None,
+        description="Revision diffed against, or null if the whole text was checked"
+    )
+    segments: int = Field(
+        ...,
+        description="Sentences in the revision"
+    )
+    changed_segments: int = Field(
+        ...,
+        description="Sentences sent to the agent"
+    )
+
+
+class AgentStreamChunk(BaseModel):
+    """
+    Incremental output emitted while an agent is streaming.
+    Carries only the newly generated text since the previous chunk.
+    """
+    agent_id: str = Field(
+        ...,
+        description="Unique identifier for this agent execution"
+    )
+    delta: str = Field(
+        ...,
+        description="Newly generated text fragment"
+    )
+
+
 class ErrorResponse(BaseModel):
     """
     Standardized error response schema.
@@ -96,3 +180,74 @@ class ErrorResponse(BaseModel):
         default=None,
         description="Agent ID if available"
     )
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item. Exactly one of `response`/`error` is set."""
+    index: int = Field(
+        ...,
+        description="Position of the item in the request"
+    )
+    slug: str = Field(
+        ...,
+        description="Tool/agent identifier the item was run with"
+    )
+    response: Optional[AgentResponse] = Field(
+        default=None,
+        description="Result on success"
+    )
+    error: Optional[ErrorResponse] = Field(
+        default=None,
+        description="Error details on failure"
+    )
+
+
+class BatchResponse(BaseModel):
+    """Output schema for batch processing, results in request order."""
+    status: str = Field(
+        default="success",
+        description="'success' if every item succeeded, otherwise 'partial'"
+    )
+    results: List[BatchItemResult] = Field(
+        ...,
+        description="One result per input item"
+    )
+
+
+class JobStatus(BaseModel):
+    """
+    Status of an asynchronous job.
+    `result` is set once the job succeeds, `error` once it fails.
+    """
+    job_id: str = Field(
+        ...,
+        description="Unique identifier of the job"
+    )
+    slug: str = Field(
+        ...,
+        description="Tool/agent identifier the job runs"
+    )
+    status: str = Field(
+        ...,
+        description="One of 'queued', 'running', 'succeeded' or 'failed'"
+    )
+    created_at: float = Field(
+        ...,
+        description="Submission time (Unix timestamp)"
+    )
+    started_at: Optional[float] = Field(
+        default=None,
+        description="Time a worker picked up the job"
+    )
+    finished_at: Optional[float] = Field(
+        default=None,
+        description="Time the job finished"
+    )
+    result: Optional[AgentResponse] = Field(
+        default=None,
+        description="Agent/tool response on success"
+    )
+    error: Optional[ErrorResponse] = Field(
+        default=None,
+        description="Error details on failure"
+    )
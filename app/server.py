@@ -0,0 +1,215 @@
+"""
+Production Server
+Pre-fork multi-worker launcher: binds the listening socket once, imports the
+app before forking (SERVER_PRELOAD_APP), supervises the workers and drains
+them gracefully on SIGTERM.
+    
+    python -m app.server [--workers N] [--app main:app]
+"""
+import argparse
+import asyncio
+import glob
+import logging
+import logging.config
+import math
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from importlib import import_module
+from typing import Any, Dict, Optional
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from app.core.config import settings, resolve_workers
+
+
+logger = logging.getLogger("uvicorn.error")
+
+# Extra time after SERVER_DRAIN_SECONDS for lifespan shutdown before workers are killed
+SHUTDOWN_GRACE_SECONDS = 5.0
+# Workers dying faster than this after start are restarted with a delay
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+def _set(name: str, value: Any) -> None:
+    """Apply a setting here and, through the environment, in processes that load settings afresh."""
+    setattr(settings, name, value)
+    os.environ[name] = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def prepare_shared_state(workers: int) -> None:
+    """
+    Settle state every worker has to agree on, before the app is imported.
+    
+    Per-process limiters (admission control, usage quotas) size themselves
+    from SERVER_WORKERS; metric snapshots are exchanged through a directory;
+    jobs are kept in SQLite, which every worker can read; unfinished jobs from a previous run are failed once here instead of by
+    each worker, which could otherwise fail jobs another worker is running.
+    """
+    _set("SERVER_WORKERS", workers)
+    
+    if workers > 1 and settings.JOB_STORE == "memory":
+        # An in-memory store would answer GET /jobs/{id} with 404 on every worker but the job's own
+        logger.warning(
+            "JOB_STORE=memory cannot be shared by %d workers; using JOB_STORE=sqlite at %s",
+            workers, os.path.abspath(settings.JOB_STORE_PATH)
+        )
+        _set("JOB_STORE", "sqlite")
+    
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if not directory and workers > 1:
+        directory = tempfile.mkdtemp(prefix="webtool-metrics-")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for stale in glob.glob(os.path.join(directory, "*.json")):
+            os.remove(stale)
+        _set("METRICS_MULTIPROCESS_DIR", directory)
+    
+    if settings.JOB_RECOVER_ON_START:
+        from app.services.job_queue import job_queue
+        recovered = asyncio.run(job_queue.recover())
+        if recovered:
+            logger.info("Marked %d unfinished jobs from the previous run as failed", recovered)
+        _set("JOB_RECOVER_ON_START", False)
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """
+    Forks and supervises uvicorn workers sharing one listening socket.
+    
+    On SIGTERM/SIGINT every worker is asked to stop: uvicorn stops accepting
+    connections, lets in-flight requests, including streaming generations,
+    finish for up to SERVER_DRAIN_SECONDS, then runs the lifespan shutdown.
+    Workers still alive after the drain deadline plus a short grace period
+    are killed. Workers that exit unexpectedly are replaced.
+    """
+    
+    def __init__(self, app: Any, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+    
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        logger.info("Starting %d workers on %s:%d (pid %d)", self.workers, *self.sock.getsockname()[:2], os.getpid())
+        for _ in range(self.workers):
+            self._spawn()
+        
+        while not self.stopping:
+            self._reap(restart=settings.SERVER_RESTART_WORKERS)
+            time.sleep(0.5)
+        return self._drain()
+    
+    def _request_stop(self, signum: int, frame: Optional[Any]) -> None:
+        self.stopping = True
+    
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Worker: uvicorn installs its own signal handlers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            config = uvicorn.Config(
+                self.app,
+                log_level="info",
+                timeout_keep_alive=math.ceil(settings.SERVER_KEEPALIVE_SECONDS),
+                timeout_graceful_shutdown=math.ceil(settings.SERVER_DRAIN_SECONDS),
+                lifespan="on"
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    
+    def _reap(self, restart: bool) -> None:
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %d exited with status %d", pid, os.waitstatus_to_exitcode(status))
+            if restart:
+                if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                    time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+                self._spawn()
+    
+    def _drain(self) -> int:
+        logger.info("Draining %d workers (deadline %.0fs)", len(self.children), settings.SERVER_DRAIN_SECONDS)
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.SERVER_DRAIN_SECONDS + SHUTDOWN_GRACE_SECONDS
+        while self.children and time.monotonic() < deadline:
+            self._reap(restart=False)
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning("Killing worker %d after the drain deadline", pid)
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.children.clear()
+        self.sock.close()
+        return 0
+    
+    @staticmethod
+    def _signal(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--app", default="main:app", help="ASGI app as module:attribute")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per CPU core")
+    args = parser.parse_args(argv)
+    
+    logging.config.dictConfig(LOGGING_CONFIG)
+    workers = resolve_workers(args.workers)
+    
+    # Before any worker imports the app; spawned workers pick it up from the environment
+    prepare_shared_state(workers)
+    if not hasattr(os, "fork"):
+        # No fork (Windows): uvicorn's spawn-based supervisor, without preloading
+        uvicorn.run(args.app, host=args.host, port=args.port, workers=workers,
+                    timeout_graceful_shutdown=math.ceil(settings.SERVER_DRAIN_SECONDS))
+        return
+    
+    app: Any = args.app
+    if settings.SERVER_PRELOAD_APP:
+        # Safe to share: importing the app opens no connections, threads or event loops
+        module, _, attribute = args.app.partition(":")
+        app = getattr(import_module(module), attribute)
+    
+    sock = bind_socket(args.host, args.port, settings.SERVER_BACKLOG)
+    sys.exit(Supervisor(app, sock, workers).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,61 @@
 # Services module
+from .agent_identity import AgentDescriptor, AgentIdentity, agent_identity
 from .agent_executor import AgentExecutor, AgentExecutionError
+from .response_cache import CacheBackend, ResponseCache, response_cache
+from .semantic_cache import SemanticCache, semantic_cache
+from .batch_executor import BatchExecutor
+from .chunking import ChunkedExecutor, chunked_executor
+from .incremental import IncrementalChecker, StaleRevisionError, incremental_checker
+from .job_queue import JobQueue, JobStore, JobQueueFullError, job_queue
+from .agent_variants import AgentVariantPool, agent_variants
+from .provider_pool import Provider, ProviderPool, provider_pool
+from .resilience import RetryPolicy, retry_policy
+from .metrics import MetricsRegistry, MetricsMiddleware
+from .usage_ledger import UsageLedger, QuotaExceededError, usage_ledger
+from .tool_executor import ToolExecutor, ToolExecutorBusyError, tool_executor
+from .tool_registry import ToolSpec, ToolRegistry, tool_registry, tool
+from .warmup import Warmup, warmup
 
-__all__ = ["AgentExecutor", "AgentExecutionError"]
+__all__ = [
+    "AgentDescriptor",
+    "AgentIdentity",
+    "agent_identity",
+    "AgentExecutor",
+    "AgentExecutionError",
+    "CacheBackend",
+    "ResponseCache",
+    "response_cache",
+    "SemanticCache",
+    "semantic_cache",
+    "BatchExecutor",
+    "ChunkedExecutor",
+    "chunked_executor",
+    "IncrementalChecker",
+    "StaleRevisionError",
+    "incremental_checker",
+    "JobQueue",
+    "JobStore",
+    "JobQueueFullError",
+    "job_queue",
+    "AgentVariantPool",
+    "agent_variants",
+    "Provider",
+    "ProviderPool",
+    "provider_pool",
+    "RetryPolicy",
+    "retry_policy",
+    "MetricsRegistry",
+    "MetricsMiddleware",
+    "UsageLedger",
+    "QuotaExceededError",
+    "usage_ledger",
+    "ToolExecutor",
+    "ToolExecutorBusyError",
+    "tool_executor",
+    "ToolSpec",
+    "ToolRegistry",
+    "tool_registry",
+    "tool",
+    "Warmup",
+    "warmup",
+]
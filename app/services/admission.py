@@ -0,0 +1,261 @@
+"""
+Admission Control Service
+Client-side rate limiting in front of the Gemini API: token buckets for
+requests/min and tokens/min, priority lanes, and load shedding with 429s.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Tuple
+
+from app.core.config import settings as app_settings, resolve_workers
+
+
+# Lanes in priority order: cheap precise agents are admitted first
+LANES = ("priority", "standard")
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed because the upstream budget is exhausted."""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.message = f"Server is at capacity, retry in {self.retry_after}s"
+        super().__init__(self.message)
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `rate` is units per second."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+    
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+    
+    def give_back(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdmissionController:
+    """
+    Admits upstream calls against requests/min and tokens/min budgets.
+    
+    Requests that cannot be admitted immediately wait in a per-lane FIFO and
+    are granted in lane priority order by a single dispatcher task. If the
+    expected wait exceeds `max_wait` (or a lane is full) the request is shed
+    with AdmissionRejectedError. Upstream 429s shrink the effective rate
+    (multiplicative decrease) and pause admission for Retry-After; each
+    success grows it back (additive increase).
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_wait: float,
+        max_queue: int,
+        burst_seconds: float = 1.0,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        # Burst capacity of `burst_seconds` worth of budget, at least one request
+        self._requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60 * burst_seconds))
+        self._tokens = TokenBucket(tokens_per_minute / 60, max(1.0, tokens_per_minute / 60 * burst_seconds))
+        self._lanes: Dict[str, Deque[Tuple[int, "asyncio.Future[None]"]]] = {lane: deque() for lane in LANES}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+        self._paused_until = 0.0
+        self.rate_scale = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.upstream_rate_limited = 0
+    
+    async def acquire(self, tokens: int, lane: str = "standard") -> None:
+        """
+        Wait until the request may be sent upstream.
+        
+        Args:
+            tokens: Estimated total tokens (prompt + completion) of the call
+            lane: One of LANES
+        
+        Raises:
+            AdmissionRejectedError: If the request would wait longer than max_wait
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not self._has_waiters(lane) and self._delay(tokens, now) == 0:
+            self._grant(tokens)
+            return
+        
+        expected_wait = self._expected_wait(tokens, lane, now)
+        if expected_wait > self.max_wait or len(self._lanes[lane]) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejectedError(expected_wait)
+        
+        future = asyncio.get_running_loop().create_future()
+        entry = (tokens, future)
+        self._lanes[lane].append(entry)
+        self._ensure_dispatcher()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if entry in self._lanes[lane]:
+                self._lanes[lane].remove(entry)
+            self.rejected += 1
+            raise AdmissionRejectedError(self._expected_wait(tokens, lane, time.monotonic()))
+    
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the tokens/min budget once the real usage is known."""
+        if self.enabled and actual is not None:
+            self._tokens.give_back(estimated - actual)
+    
+    def on_success(self) -> None:
+        if self.rate_scale < 1.0:
+            self._set_scale(self.rate_scale + 0.02)
+    
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """React to an upstream 429: halve the rate and pause for Retry-After."""
+        self.upstream_rate_limited += 1
+        self._set_scale(self.rate_scale * 0.5)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "rate_scale": round(self.rate_scale, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "upstream_rate_limited": self.upstream_rate_limited,
+            "queued": {lane: len(queue) for lane, queue in self._lanes.items()},
+        }
+    
+    def _set_scale(self, scale: float) -> None:
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        self.rate_scale = min(1.0, max(0.1, scale))
+        self._requests.rate = self.requests_per_minute / 60 * self.rate_scale
+        self._tokens.rate = self.tokens_per_minute / 60 * self.rate_scale
+    
+    def _delay(self, tokens: int, now: float) -> float:
+        return max(
+            self._paused_until - now,
+            self._requests.delay_for(1, now),
+            self._tokens.delay_for(tokens, now),
+        )
+    
+    def _grant(self, tokens: int) -> None:
+        self._requests.take(1)
+        self._tokens.take(tokens)
+        self.admitted += 1
+    
+    def _has_waiters(self, lane: str) -> bool:
+        """True if anyone at this lane's priority or higher is already waiting."""
+        for name in LANES:
+            if self._lanes[name]:
+                return True
+            if name == lane:
+                return False
+        return False
+    
+    def _expected_wait(self, tokens: int, lane: str, now: float) -> float:
+        """Time to drain everything queued ahead of this request plus the request itself."""
+        ahead_requests, ahead_tokens = 1, tokens
+        for name in LANES:
+            ahead_requests += len(self._lanes[name])
+            ahead_tokens += sum(t for t, _ in self._lanes[name])
+            if name == lane:
+                break
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        request_wait = max(0.0, ahead_requests - self._requests.tokens) / self._requests.rate
+        token_wait = max(0.0, ahead_tokens - self._tokens.tokens) / self._tokens.rate
+        return max(self._paused_until - now, request_wait, token_wait)
+    
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+    
+    async def _dispatch(self) -> None:
+        while True:
+            head = self._head()
+            if head is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            lane, (tokens, future) = head
+            delay = self._delay(tokens, time.monotonic())
+            if delay > 0:
+                # Wake early if a higher-priority request arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            self._lanes[lane].popleft()
+            if not future.done():
+                self._grant(tokens)
+                future.set_result(None)
+    
+    def _head(self) -> Optional[Tuple[str, Tuple[int, "asyncio.Future[None]"]]]:
+        for lane in LANES:
+            queue = self._lanes[lane]
+            while queue and queue[0][1].done():
+                queue.popleft()
+            if queue:
+                return lane, queue[0]
+        return None
+
+
+def estimate_tokens(prompt: str, max_tokens: Optional[int]) -> int:
+    """Rough token estimate: ~4 characters per prompt token plus the completion budget."""
+    return len(prompt) // 4 + 1 + (max_tokens or app_settings.ADMISSION_DEFAULT_COMPLETION_TOKENS)
+
+
+def lane_for(temperature: Optional[float]) -> str:
+    """Precise (low-temperature) agents are cheap and latency-sensitive."""
+    if temperature is not None and temperature <= app_settings.ADMISSION_PRIORITY_MAX_TEMPERATURE:
+        return "priority"
+    return "standard"
+
+
+# Global admission controller. The upstream budget is shared by all server
+# workers, so each worker process gets an equal share of it (SERVER_WORKERS=0
+# counts one worker per CPU core, as app.server starts them).
+_workers = resolve_workers(app_settings.SERVER_WORKERS)
+admission_controller = AdmissionController(
+    requests_per_minute=app_settings.ADMISSION_REQUESTS_PER_MINUTE / _workers,
+    tokens_per_minute=app_settings.ADMISSION_TOKENS_PER_MINUTE / _workers,
+    max_wait=app_settings.ADMISSION_MAX_WAIT_SECONDS,
+    max_queue=app_settings.ADMISSION_MAX_QUEUE,
+    burst_seconds=app_settings.ADMISSION_BURST_SECONDS,
+    enabled=app_settings.ADMISSION_ENABLED
+)
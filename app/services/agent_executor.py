@@ -2,13 +2,137 @@
 Agent Executor Service
 Handles the execution of AI agents with proper error boundaries and output sanitization.
 """
+import asyncio
+import math
+import time
 import uuid
-from typing import Optional, Dict, Any
-from agents import Agent, Runner, ModelSettings
+from contextlib import AsyncExitStack
+from typing import Optional, Dict, Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Tuple, TypeVar, Union
+from agents import Agent, Runner, ModelSettings, RunResultStreaming, StreamEvent
+from openai import RateLimitError
+from openai.types.responses import ResponseTextDeltaEvent
 
-# Use the same config that agents use
-from config.gemini_config import gemini_config
-from app.schemas import AgentResponse, ErrorResponse, UsageInfo, ModelSettingsSchema
+from app.schemas import AgentResponse, AgentStreamChunk, ErrorResponse, UsageInfo, ModelSettingsSchema
+from app.core.config import settings as app_settings
+from app.services.response_cache import response_cache, build_cache_key, CachedResponse
+from app.services.semantic_cache import semantic_cache, build_scope_key
+from app.services.agent_identity import agent_identity, AgentDescriptor
+from app.services.agent_variants import agent_variants
+# Every run goes through a balanced Gemini provider (API key / endpoint)
+from app.services.provider_pool import provider_pool, retry_after_seconds
+from app.services.admission import admission_controller, estimate_tokens, lane_for, AdmissionRejectedError
+from app.services.resilience import retry_policy
+from app.services import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-flight request table that coalesces identical concurrent executions.
+    The first caller for a key starts the upstream call; concurrent callers
+    with the same key await that same task instead of starting their own.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key among concurrent callers.
+        
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that
+            joined an execution started by someone else
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        
+        # Shield so a disconnecting caller does not cancel the shared call
+        return await asyncio.shield(task), shared
+    
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved if every waiter went away
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+# Global in-flight table
+single_flight = SingleFlight()
+
+
+class UpstreamStream:
+    """
+    A streamed run opened up to its first text delta, with the provider slot,
+    in-flight gauge and admission estimate it holds until `finish` or `abandon`.
+    """
+    
+    def __init__(self, estimated_tokens: int, full_prompt: str, slug: Optional[str]):
+        self.estimated_tokens = estimated_tokens
+        self.full_prompt = full_prompt
+        self.result: Optional[RunResultStreaming] = None
+        self.deltas: Optional[AsyncIterator[str]] = None
+        self.first_delta: Optional[str] = None
+        self.streamed_chars = 0
+        self.started = time.perf_counter()
+        self._events: Optional[AsyncIterator[StreamEvent]] = None
+        self._resources = AsyncExitStack()
+        self._resources.callback(metrics.upstream_in_flight.dec, slug)
+        metrics.upstream_in_flight.inc(slug)
+    
+    async def enter(self, context: AsyncContextManager[T]) -> T:
+        return await self._resources.enter_async_context(context)
+    
+    def start(self, result: RunResultStreaming, deadline: float) -> None:
+        self.result = result
+        self._events = AgentExecutor._events_until(result, deadline)
+        self.deltas = self._text_deltas()
+    
+    async def _text_deltas(self) -> AsyncIterator[str]:
+        async for event in self._events:
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                if event.data.delta:
+                    self.streamed_chars += len(event.data.delta)
+                    yield event.data.delta
+    
+    async def finish(self) -> None:
+        """Release the resources of a run that streamed to the end."""
+        await self._resources.aclose()
+    
+    async def abandon(self, error: Optional[BaseException] = None) -> None:
+        """Stop an unfinished run and settle its admission estimate from what it produced."""
+        if self.result is not None and not self.result.is_complete:
+            self.result.cancel()
+        if self._events is not None:
+            await self.deltas.aclose()
+            await self._events.aclose()
+        usage = AgentExecutor._extract_usage(self.result) if self.result is not None else None
+        AgentExecutor._settle_unfinished(self.estimated_tokens, self.full_prompt, usage, self.streamed_chars)
+        if isinstance(error, RateLimitError):
+            admission_controller.on_rate_limited(retry_after_seconds(error))
+        # The provider slot sees the error, so a 429 takes the provider out of rotation
+        if error is None:
+            await self._resources.aclose()
+        else:
+            await self._resources.__aexit__(type(error), error, error.__traceback__)
 
 
 class AgentExecutor:
@@ -22,7 +146,10 @@ class AgentExecutor:
         agent: Agent,
         prompt: str,
         settings: Optional[ModelSettingsSchema] = None,
-        user_context: Optional[Dict[str, Any]] = None
+        user_context: Optional[Dict[str, Any]] = None,
+        cacheable: bool = False,
+        timeout: Optional[float] = None,
+        semantic_threshold: Optional[float] = None
     ) -> AgentResponse:
         """
         Execute an agent with the given prompt and settings.
@@ -32,61 +159,422 @@ class AgentExecutor:
             prompt: User's input prompt
             settings: Optional model settings override
             user_context: Optional additional context
-            
+            cacheable: Deterministic agent - its responses may be cached and
+                identical concurrent requests coalesced into one upstream call
+            timeout: Deadline in seconds across all attempts (defaults to AGENT_TIMEOUT_SECONDS)
+            semantic_threshold: Serve near-duplicate prompts from the semantic
+                cache at this cosine similarity (None = exact matches only)
+        
         Returns:
             AgentResponse with clean content
         """
         agent_id = str(uuid.uuid4())
+        AgentExecutor._check_prompt(prompt, agent_id)
         
         try:
-            # Build the full prompt with context if provided
-            full_prompt = prompt
-            if user_context:
-                context_str = "\n".join(f"{k}: {v}" for k, v in user_context.items())
-                full_prompt = f"Context:\n{context_str}\n\nRequest:\n{prompt}"
+            request_key = AgentExecutor._request_key(agent, prompt, settings, user_context, cacheable)
+            if request_key and response_cache.enabled:
+                cached = await response_cache.get(request_key)
+                metrics.count_cache_lookup("miss" if cached is None else "hit")
+                if cached is not None:
+                    # No upstream tokens were spent on a cache hit
+                    return AgentResponse(status="success", agent_id=agent_id, content=cached.content)
             
-            # Execute the agent using the SAME config that agents use
-            result = await Runner.run(agent, full_prompt, run_config=gemini_config)
+            scope = AgentExecutor._semantic_scope(agent, prompt, settings, user_context, semantic_threshold)
+            if scope is not None:
+                similar = await AgentExecutor._semantic_lookup(scope, prompt, semantic_threshold, request_key)
+                if similar is not None:
+                    return AgentResponse(status="success", agent_id=agent_id, content=similar.content)
             
-            # Extract clean content - NO meta-talk, NO debugging strings
-            content = result.final_output
+            started = time.perf_counter()
+            full_prompt = AgentExecutor._build_prompt(prompt, user_context)
+            run_agent = agent_variants.resolve(agent, settings)
+            descriptor = agent_identity.for_agent(agent)
+            metrics.observe_stage("prompt_build", started)
             
-            # Ensure content is a string
-            if not isinstance(content, str):
-                content = str(content)
+            async def attempt() -> CachedResponse:
+                estimated_tokens = await AgentExecutor._admit(run_agent, full_prompt, descriptor)
+                slug = metrics.current_slug.get()
+                metrics.upstream_in_flight.inc(slug)
+                started = time.perf_counter()
+                try:
+                    # Execute the agent on the least-loaded provider, failing over on 429
+                    result = await provider_pool.run(
+                        lambda provider: Runner.run(run_agent, full_prompt, run_config=provider.run_config)
+                    )
+                except BaseException as e:
+                    # Failed, or cancelled as the losing hedge: return the unused completion budget
+                    AgentExecutor._settle_unfinished(estimated_tokens, full_prompt)
+                    if isinstance(e, RateLimitError):
+                        admission_controller.on_rate_limited(retry_after_seconds(e))
+                    raise
+                finally:
+                    metrics.upstream_in_flight.dec(slug)
+                metrics.observe_stage("upstream", started)
+                
+                # Extract clean content - NO meta-talk, NO debugging strings
+                output = CachedResponse(
+                    AgentExecutor._extract_content(result),
+                    AgentExecutor._extract_usage(result)
+                )
+                AgentExecutor._settle(estimated_tokens, output.usage)
+                if output.usage:
+                    metrics.count_tokens(output.usage.prompt_tokens, output.usage.completion_tokens)
+                return output
             
-            # Build usage info if available
-            usage = None
-            if hasattr(result, 'usage') and result.usage:
-                usage = UsageInfo(
-                    prompt_tokens=getattr(result.usage, 'prompt_tokens', None),
-                    completion_tokens=getattr(result.usage, 'completion_tokens', None),
-                    total_tokens=getattr(result.usage, 'total_tokens', None)
+            async def run_upstream() -> CachedResponse:
+                # Transient failures are retried with backoff inside the deadline
+                output = await retry_policy.call(
+                    run_agent.name,
+                    attempt,
+                    timeout=AgentExecutor._deadline(timeout),
+                    hedge=app_settings.HEDGE_ENABLED
                 )
+                if request_key and response_cache.enabled:
+                    await response_cache.set(request_key, output)
+                if scope is not None:
+                    semantic_cache.set(scope, prompt, output)
+                return output
             
+            shared = False
+            if request_key and app_settings.SINGLE_FLIGHT_ENABLED:
+                output, shared = await single_flight.do(request_key, run_upstream)
+                if shared:
+                    metrics.count_cache_lookup("coalesced")
+            else:
+                output = await run_upstream()
+            
+            # Tokens are attributed to the caller that started the upstream call
             return AgentResponse(
                 status="success",
                 agent_id=agent_id,
-                content=content,
-                usage=usage
+                content=output.content,
+                usage=None if shared else output.usage
             )
-            
+        
         except Exception as e:
+            metrics.count_error(type(e).__name__)
             # Return clean error without exposing internals
+            raise AgentExecutor._to_execution_error(e, agent_id)
+    
+    @staticmethod
+    async def stream(
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema] = None,
+        user_context: Optional[Dict[str, Any]] = None,
+        cacheable: bool = False,
+        timeout: Optional[float] = None,
+        semantic_threshold: Optional[float] = None
+    ) -> AsyncIterator[Union[AgentStreamChunk, AgentResponse]]:
+        """
+        Execute an agent and yield text deltas as they are generated.
+        
+        Yields one AgentStreamChunk per token delta, followed by a single
+        AgentResponse carrying the complete content and usage. A cache hit
+        yields only the final AgentResponse.
+        
+        The deadline covers the whole stream. Transient failures are retried
+        (and, with HEDGE_ENABLED, a slow first delta hedged) through the retry
+        policy only until the first delta has been sent to the client.
+        
+        Raises:
+            AgentExecutionError: If the run fails at any point of the stream
+        """
+        agent_id = str(uuid.uuid4())
+        AgentExecutor._check_prompt(prompt, agent_id)
+        
+        try:
+            request_key = AgentExecutor._request_key(agent, prompt, settings, user_context, cacheable)
+            if request_key and response_cache.enabled:
+                cached = await response_cache.get(request_key)
+                metrics.count_cache_lookup("miss" if cached is None else "hit")
+                if cached is not None:
+                    yield AgentResponse(status="success", agent_id=agent_id, content=cached.content)
+                    return
+            
+            scope = AgentExecutor._semantic_scope(agent, prompt, settings, user_context, semantic_threshold)
+            if scope is not None:
+                similar = await AgentExecutor._semantic_lookup(scope, prompt, semantic_threshold, request_key)
+                if similar is not None:
+                    yield AgentResponse(status="success", agent_id=agent_id, content=similar.content)
+                    return
+            
+            started = time.perf_counter()
+            full_prompt = AgentExecutor._build_prompt(prompt, user_context)
+            run_agent = agent_variants.resolve(agent, settings)
+            descriptor = agent_identity.for_agent(agent)
+            metrics.observe_stage("prompt_build", started)
+            
+            slug = metrics.current_slug.get()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + AgentExecutor._deadline(timeout)
+            # Retries and hedging apply until the first delta; sent deltas cannot be taken back
+            upstream = await retry_policy.call(
+                f"{run_agent.name}:stream",
+                lambda: AgentExecutor._open_stream(run_agent, full_prompt, descriptor, deadline, slug),
+                timeout=max(0.0, deadline - loop.time()),
+                hedge=app_settings.HEDGE_ENABLED,
+                discard=UpstreamStream.abandon
+            )
+            try:
+                if upstream.first_delta is not None:
+                    yield AgentStreamChunk(agent_id=agent_id, delta=upstream.first_delta)
+                async for delta in upstream.deltas:
+                    yield AgentStreamChunk(agent_id=agent_id, delta=delta)
+            except BaseException as e:
+                # Also reached when the client disconnects at a yield above
+                if isinstance(e, asyncio.TimeoutError):
+                    retry_policy.record_timeout()
+                await upstream.abandon(e)
+                raise
+            await upstream.finish()
+            metrics.observe_stage("upstream", upstream.started, slug=slug)
+            result = upstream.result
+            estimated_tokens = upstream.estimated_tokens
+            
+            response = AgentResponse(
+                status="success",
+                agent_id=agent_id,
+                content=AgentExecutor._extract_content(result),
+                usage=AgentExecutor._extract_usage(result)
+            )
+            AgentExecutor._settle(estimated_tokens, response.usage)
+            if response.usage:
+                metrics.count_tokens(response.usage.prompt_tokens, response.usage.completion_tokens, slug)
+            if request_key and response_cache.enabled:
+                await response_cache.set(request_key, CachedResponse(response.content, response.usage))
+            if scope is not None:
+                semantic_cache.set(scope, prompt, CachedResponse(response.content, response.usage))
+            yield response
+        
+        except Exception as e:
+            metrics.count_error(type(e).__name__)
+            raise AgentExecutor._to_execution_error(e, agent_id)
+    
+    @staticmethod
+    async def _open_stream(
+        run_agent: Agent,
+        full_prompt: str,
+        descriptor: Optional[AgentDescriptor],
+        deadline: float,
+        slug: Optional[str]
+    ) -> "UpstreamStream":
+        """One streamed attempt: admit, start the run and wait for its first text delta."""
+        estimated_tokens = await AgentExecutor._admit(run_agent, full_prompt, descriptor)
+        upstream = UpstreamStream(estimated_tokens, full_prompt, slug)
+        try:
+            provider = await upstream.enter(provider_pool.acquire())
+            upstream.start(Runner.run_streamed(run_agent, full_prompt, run_config=provider.run_config), deadline)
+            upstream.first_delta = await anext(upstream.deltas, None)
+            if upstream.first_delta is not None:
+                metrics.observe_stage("ttft", upstream.started, slug=slug)
+            return upstream
+        except BaseException as e:
+            # Failed, or cancelled as the losing hedge
+            await upstream.abandon(e)
+            raise
+    
+    @staticmethod
+    def _check_prompt(prompt: str, agent_id: str) -> None:
+        """Reject prompts over AGENT_PROMPT_MAX_CHARS (the request schema admits larger tool inputs)."""
+        if len(prompt) > app_settings.AGENT_PROMPT_MAX_CHARS:
             raise AgentExecutionError(
-                message=f"Agent execution failed: {str(e)}",
-                agent_id=agent_id
+                message=f"Prompt too long: {len(prompt)} characters (maximum {app_settings.AGENT_PROMPT_MAX_CHARS})",
+                agent_id=agent_id,
+                status_code=422
             )
+    
+    @staticmethod
+    def _request_key(
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema],
+        user_context: Optional[Dict[str, Any]],
+        cacheable: bool
+    ) -> Optional[str]:
+        """Return the key used for caching and coalescing, or None when neither applies."""
+        if not cacheable or not (response_cache.enabled or app_settings.SINGLE_FLIGHT_ENABLED):
+            return None
+        return build_cache_key(agent, prompt, settings, user_context)
+    
+    @staticmethod
+    def _semantic_scope(
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema],
+        user_context: Optional[Dict[str, Any]],
+        threshold: Optional[float]
+    ) -> Optional[str]:
+        """Return the semantic cache scope of a request, or None when the tier does not apply."""
+        if threshold is None or not semantic_cache.enabled or not semantic_cache.applies(prompt):
+            return None
+        return build_scope_key(agent, settings, user_context)
+    
+    @staticmethod
+    async def _semantic_lookup(
+        scope: str,
+        prompt: str,
+        threshold: float,
+        request_key: Optional[str]
+    ) -> Optional[CachedResponse]:
+        """Look up a near-duplicate prompt; a hit is also stored under the exact key."""
+        similar = semantic_cache.get(scope, prompt, threshold)
+        metrics.count_cache_lookup("semantic_miss" if similar is None else "semantic_hit")
+        if similar is None:
+            return None
+        cached = similar[0]
+        if request_key and response_cache.enabled:
+            await response_cache.set(request_key, cached)
+        return cached
+    
+    @staticmethod
+    async def _events_until(result: RunResultStreaming, deadline: float) -> AsyncIterator[StreamEvent]:
+        """
+        Yield the run's stream events, cancelling the run once the loop-time
+        deadline passes or when the generator is closed before the stream ends.
+        
+        Raises:
+            asyncio.TimeoutError: If the deadline passes before the stream ends
+        """
+        loop = asyncio.get_running_loop()
+        events = result.stream_events().__aiter__()
+        try:
+            while True:
+                # Await each event in its own task so a timeout never cancels the caller
+                next_event = asyncio.ensure_future(events.__anext__())
+                try:
+                    done, _ = await asyncio.wait({next_event}, timeout=max(0.0, deadline - loop.time()))
+                finally:
+                    if not next_event.done():
+                        result.cancel()
+                        next_event.cancel()
+                        # The cancelled generator finishes with StopAsyncIteration; consume it
+                        next_event.add_done_callback(lambda task: task.cancelled() or task.exception())
+                if not done:
+                    raise asyncio.TimeoutError()
+                try:
+                    event = next_event.result()
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            # Closed early (consumer gone or failed): the run must not keep generating upstream
+            if not result.is_complete:
+                result.cancel()
+    
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> float:
+        return timeout if timeout is not None else app_settings.AGENT_TIMEOUT_SECONDS
+    
+    @staticmethod
+    async def _admit(run_agent: Agent, full_prompt: str, descriptor: Optional[AgentDescriptor]) -> int:
+        """
+        Wait for admission of one upstream call; returns its estimated token cost.
+        Without max_tokens, the completion is budgeted by the agent's cost class.
+        """
+        model_settings = run_agent.model_settings
+        completion_tokens = model_settings.max_tokens or (descriptor.completion_tokens if descriptor else None)
+        estimated_tokens = estimate_tokens(full_prompt, completion_tokens)
+        await admission_controller.acquire(estimated_tokens, lane_for(model_settings.temperature))
+        return estimated_tokens
+    
+    @staticmethod
+    def _settle(estimated_tokens: int, usage: Optional[UsageInfo]) -> None:
+        """Feed a successful call's real token usage back into admission control."""
+        admission_controller.on_success()
+        admission_controller.settle(estimated_tokens, usage.total_tokens if usage else None)
+    
+    @staticmethod
+    def _settle_unfinished(estimated_tokens: int, full_prompt: str, usage: Optional[UsageInfo] = None, completion_chars: int = 0) -> None:
+        """
+        Settle the admission estimate of a call that failed, was cancelled or
+        was abandoned: reported usage if any, else the prompt plus the text
+        received so far.
+        """
+        actual = usage.total_tokens if usage else len(full_prompt) // 4 + 1 + completion_chars // 4
+        admission_controller.settle(estimated_tokens, actual)
+    
+    @staticmethod
+    def _to_execution_error(error: Exception, agent_id: str) -> "AgentExecutionError":
+        """Map a failure to AgentExecutionError, keeping rate limits (429) and timeouts (504) distinguishable."""
+        if isinstance(error, AdmissionRejectedError):
+            return AgentExecutionError(
+                message=error.message,
+                agent_id=agent_id,
+                status_code=429,
+                retry_after=error.retry_after
+            )
+        if isinstance(error, RateLimitError):
+            return AgentExecutionError(
+                message="Upstream rate limit exceeded, please retry later",
+                agent_id=agent_id,
+                status_code=429,
+                retry_after=retry_after_seconds(error) or app_settings.PROVIDER_COOLDOWN_SECONDS
+            )
+        if isinstance(error, asyncio.TimeoutError):
+            return AgentExecutionError(
+                message="Agent execution timed out, please retry with a shorter input",
+                agent_id=agent_id,
+                status_code=504
+            )
+        return AgentExecutionError(
+            message=f"Agent execution failed: {str(error)}",
+            agent_id=agent_id
+        )
+    
+    @staticmethod
+    def _build_prompt(prompt: str, user_context: Optional[Dict[str, Any]]) -> str:
+        """Build the full prompt with context if provided."""
+        if not user_context:
+            return prompt
+        context_str = "\n".join(f"{k}: {v}" for k, v in user_context.items())
+        return f"Context:\n{context_str}\n\nRequest:\n{prompt}"
+    
+    @staticmethod
+    def _extract_content(result: Any) -> str:
+        """Return the final output of a run as a string."""
+        content = result.final_output
+        if not isinstance(content, str):
+            content = str(content)
+        return content
+    
+    @staticmethod
+    def _extract_usage(result: Any) -> Optional[UsageInfo]:
+        """Build usage info from the run context if the model reported any."""
+        context_wrapper = getattr(result, "context_wrapper", None)
+        usage = getattr(context_wrapper, "usage", None)
+        if not usage or not usage.total_tokens:
+            return None
+        return UsageInfo(
+            prompt_tokens=usage.input_tokens,
+            completion_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens
+        )
 
 
 class AgentExecutionError(Exception):
     """Custom exception for agent execution failures."""
     
-    def __init__(self, message: str, agent_id: str):
+    def __init__(
+        self,
+        message: str,
+        agent_id: str,
+        status_code: int = 500,
+        retry_after: Optional[float] = None
+    ):
         self.message = message
         self.agent_id = agent_id
+        self.status_code = status_code
+        self.retry_after = retry_after
         super().__init__(self.message)
     
+    def http_headers(self) -> Optional[Dict[str, str]]:
+        """Headers to send with the HTTP error (Retry-After for 429s)."""
+        if self.retry_after is None:
+            return None
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+    
     def to_error_response(self) -> ErrorResponse:
         """Convert to standardized error response."""
         return ErrorResponse(
@@ -0,0 +1,120 @@
+"""
+Agent Identity Service
+Canonical identities for agents exposed under several slugs. Aliases resolve
+to one stable identity, the canonical slug, and every agent gets a
+precomputed descriptor, so caches, coalescing, metrics and limiters treat
+alias traffic as traffic to the same agent.
+"""
+import hashlib
+from typing import Optional, Dict, Any, List, Iterable
+from agents import Agent
+
+from app.core.config import settings as app_settings
+
+
+# Expected completion size relative to ADMISSION_DEFAULT_COMPLETION_TOKENS
+COST_CLASSES = {
+    "short": 0.25,
+    "standard": 1.0,
+    "long": 2.0,
+}
+
+
+def instructions_fingerprint(agent: Agent) -> str:
+    """SHA-256 of an agent's instructions (qualified name for dynamic instructions)."""
+    instructions = agent.instructions
+    if not isinstance(instructions, str):
+        instructions = getattr(instructions, "__qualname__", repr(instructions))
+    return hashlib.sha256(instructions.encode()).hexdigest()
+
+
+class AgentDescriptor:
+    """
+    Precomputed identity of one agent.
+    
+    Attributes:
+        slug: Canonical slug, the agent's stable identity
+        aliases: Other slugs serving the same agent
+        agent: The Agent instance
+        instructions_hash: Fingerprint of the agent's instructions
+        model: Model name
+        settings: The agent's default model settings
+        cost_class: Expected completion size, a COST_CLASSES key
+    """
+    
+    __slots__ = ("slug", "aliases", "agent", "instructions_hash", "model", "settings", "cost_class")
+    
+    def __init__(self, slug: str, agent: Agent, aliases: Iterable[str] = (), cost_class: str = "standard"):
+        if cost_class not in COST_CLASSES:
+            raise ValueError(f"Unknown cost class '{cost_class}' for agent '{slug}', use one of {tuple(COST_CLASSES)}")
+        self.slug = slug
+        self.aliases = tuple(aliases)
+        self.agent = agent
+        self.instructions_hash = instructions_fingerprint(agent)
+        self.model = str(getattr(agent.model, "model", agent.model))
+        self.settings: Dict[str, Any] = agent.model_settings.to_json_dict()
+        self.cost_class = cost_class
+    
+    @property
+    def completion_tokens(self) -> int:
+        """Completion tokens to budget for a run without an explicit max_tokens."""
+        return int(COST_CLASSES[self.cost_class] * app_settings.ADMISSION_DEFAULT_COMPLETION_TOKENS)
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "slug": self.slug,
+            "name": self.agent.name,
+            "aliases": list(self.aliases),
+            "instructions_hash": self.instructions_hash[:16],
+            "model": self.model,
+            "settings": self.settings,
+            "cost_class": self.cost_class,
+        }
+
+
+class AgentIdentity:
+    """
+    Alias table and descriptor index.
+    
+    Aliases are known up front; descriptors are registered when an agent is
+    first loaded and can then be found by any slug or by the Agent instance.
+    """
+    
+    def __init__(self):
+        self._aliases: Dict[str, str] = {}
+        self._descriptors: Dict[str, AgentDescriptor] = {}
+        self._by_agent: Dict[int, AgentDescriptor] = {}
+    
+    def add_aliases(self, aliases: Dict[str, str]) -> None:
+        """Register alias -> canonical slug pairs."""
+        for alias, canonical in aliases.items():
+            if canonical in self._aliases:
+                raise ValueError(f"Alias '{alias}' points to another alias '{canonical}'")
+            self._aliases[alias] = canonical
+    
+    def canonical(self, slug: str) -> str:
+        """Canonical slug for a slug; unknown slugs and tools map to themselves."""
+        return self._aliases.get(slug, slug)
+    
+    def aliases_of(self, slug: str) -> List[str]:
+        return [alias for alias, canonical in self._aliases.items() if canonical == slug]
+    
+    def register(self, descriptor: AgentDescriptor) -> AgentDescriptor:
+        self._descriptors[descriptor.slug] = descriptor
+        self._by_agent[id(descriptor.agent)] = descriptor
+        return descriptor
+    
+    def get(self, slug: str) -> Optional[AgentDescriptor]:
+        return self._descriptors.get(self.canonical(slug))
+    
+    def for_agent(self, agent: Agent) -> Optional[AgentDescriptor]:
+        """Descriptor of a registered Agent instance (not of its per-request variants)."""
+        descriptor = self._by_agent.get(id(agent))
+        return descriptor if descriptor is not None and descriptor.agent is agent else None
+    
+    def descriptors(self) -> List[AgentDescriptor]:
+        return list(self._descriptors.values())
+
+
+# Global agent identity index (filled by the agent registry)
+agent_identity = AgentIdentity()
@@ -0,0 +1,70 @@
+"""
+Agent Variant Pool
+Applies per-request model settings overrides by reusing memoized Agent clones
+instead of copying an Agent on every call.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+from agents import Agent, ModelSettings
+
+from app.core.config import settings as app_settings
+from app.schemas import ModelSettingsSchema
+
+
+VariantKey = Tuple[int, Optional[float], Optional[float], Optional[int]]
+
+
+class AgentVariantPool:
+    """
+    Bounded LRU pool of Agent clones keyed by (agent, temperature, top_p, max_tokens).
+    Requests without overrides always get the original agent back.
+    """
+    
+    def __init__(self, max_variants: int):
+        self.max_variants = max_variants
+        # Values keep a reference to the base agent so its id() stays valid
+        self._variants: "OrderedDict[VariantKey, Tuple[Agent, Agent]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def resolve(self, agent: Agent, settings: Optional[ModelSettingsSchema]) -> Agent:
+        """
+        Return the agent to run for the given overrides.
+        
+        Args:
+            agent: Base agent from the registry
+            settings: Optional per-request model settings override
+        
+        Returns:
+            The base agent, or a cached clone with the overrides applied
+        """
+        if settings is None:
+            return agent
+        overrides = settings.model_dump(exclude_none=True)
+        if not overrides:
+            return agent
+        
+        key = (id(agent), settings.temperature, settings.top_p, settings.max_tokens)
+        entry = self._variants.get(key)
+        if entry is not None and entry[0] is agent:
+            self._variants.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        variant = agent.clone(model_settings=agent.model_settings.resolve(ModelSettings(**overrides)))
+        self._variants[key] = (agent, variant)
+        while len(self._variants) > self.max_variants:
+            self._variants.popitem(last=False)
+        return variant
+    
+    def stats(self) -> dict:
+        return {
+            "variants": len(self._variants),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global variant pool
+agent_variants = AgentVariantPool(max_variants=app_settings.AGENT_VARIANT_POOL_SIZE)
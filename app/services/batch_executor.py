@@ -0,0 +1,123 @@
+"""
+Batch Executor Service
+Fans a list of work items out over a bounded pool of concurrent workers.
+"""
+import asyncio
+from typing import TypeVar, Awaitable, Callable, Sequence, List, AsyncIterator, Optional
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchExecutor:
+    """
+    Runs one coroutine per item with at most `concurrency` in flight.
+    
+    A fixed number of workers pull item indexes from a shared counter, so a
+    batch of thousands of items never creates more than `concurrency` tasks.
+    Workers that should not abort the batch handle their own errors and
+    return a result for their item; an exception escaping a worker cancels
+    the items still in flight and is raised to the caller.
+    """
+    
+    @staticmethod
+    async def run_ordered(
+        items: Sequence[T],
+        worker: Callable[[int, T], Awaitable[R]],
+        concurrency: int
+    ) -> List[R]:
+        """
+        Process all items and return their results in input order.
+        
+        Args:
+            items: Work items
+            worker: Coroutine function called with (index, item)
+            concurrency: Maximum number of items processed at once
+        
+        Returns:
+            List of results aligned with `items`
+        
+        Raises:
+            The first exception raised by `worker`; remaining items are cancelled
+        """
+        results: List[R] = [None] * len(items)  # type: ignore[list-item]
+        
+        async def collect(index: int, result: R) -> None:
+            results[index] = result
+        
+        await BatchExecutor._run(items, worker, concurrency, collect)
+        return results
+    
+    @staticmethod
+    async def run_as_completed(
+        items: Sequence[T],
+        worker: Callable[[int, T], Awaitable[R]],
+        concurrency: int
+    ) -> AsyncIterator[R]:
+        """
+        Process all items and yield each result as soon as it is ready.
+        
+        Args:
+            items: Work items
+            worker: Coroutine function called with (index, item)
+            concurrency: Maximum number of items processed at once
+        
+        Yields:
+            Results in completion order
+        
+        Raises:
+            The first exception raised by `worker`; remaining items are cancelled
+        """
+        queue: "asyncio.Queue[R]" = asyncio.Queue()
+        
+        async def collect(index: int, result: R) -> None:
+            await queue.put(result)
+        
+        runner = asyncio.ensure_future(BatchExecutor._run(items, worker, concurrency, collect))
+        getter: "Optional[asyncio.Future[R]]" = None
+        try:
+            remaining = len(items)
+            while remaining:
+                if not queue.empty():
+                    remaining -= 1
+                    yield queue.get_nowait()
+                    continue
+                # Wait for the next result or for the runner to fail, whichever comes first
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait((getter, runner), return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    remaining -= 1
+                    yield getter.result()
+                else:
+                    getter.cancel()
+                    runner.result()
+            await runner
+        finally:
+            # Client went away mid-stream or an item failed: stop scheduling remaining items
+            if getter is not None and not getter.done():
+                getter.cancel()
+            if not runner.done():
+                runner.cancel()
+    
+    @staticmethod
+    async def _run(
+        items: Sequence[T],
+        worker: Callable[[int, T], Awaitable[R]],
+        concurrency: int,
+        collect: Callable[[int, R], Awaitable[None]]
+    ) -> None:
+        next_index = 0
+        
+        async def drain() -> None:
+            nonlocal next_index
+            while next_index < len(items):
+                index = next_index
+                next_index += 1
+                await collect(index, await worker(index, items[index]))
+        
+        workers = [asyncio.ensure_future(drain()) for _ in range(max(1, min(concurrency, len(items))))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
@@ -0,0 +1,99 @@
+"""
+Built-in Deterministic Tools
+Non-AI tools registered with the tool registry. Engines are imported inside
+the tool functions so listing tools stays cheap; warmup hooks load them
+ahead of the first request.
+"""
+import logging
+from typing import Iterator
+
+from app.services.tool_registry import tool, tool_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_colors() -> None:
+    from app.services.color_converter import convert_colors
+    convert_colors("#000000")
+
+
+def _warm_formatter() -> None:
+    from app.services.code_formatter import code_formatter
+    code_formatter.format("x = 1")
+
+
+def _warm_domains() -> None:
+    from app.services.domain_checker import get_domain_index
+    get_domain_index()
+
+
+def _warm_plagiarism() -> None:
+    from app.services.plagiarism import index_status
+    status = index_status()
+    if not status["passages"]:
+        logger.warning(
+            "No plagiarism reference corpus indexed at %s; plagiarism-checker cannot score originality "
+            "(build one with `python -m app.services.plagiarism build <corpus_dir>`)",
+            status["path"]
+        )
+
+
+@tool("hex-to-rgb", description="Convert hex colors to RGB (single code or whole palette)", warmup=_warm_colors)
+def hex_to_rgb_logic(input_data: str) -> str:
+    """Convert hex colors to RGB: one code, a comma/newline-separated list or a JSON array."""
+    from app.services.color_converter import convert_colors
+    return convert_colors(input_data)
+
+
+@tool("color-converter", description="Convert hex colors to RGB, HSL, HSV, CMYK and Lab", warmup=_warm_colors)
+def color_converter_logic(input_data: str) -> str:
+    """Convert hex colors to RGB, HSL, HSV, CMYK and Lab (JSON input may pick formats)."""
+    from app.services.color_converter import convert_colors, FORMATS
+    return convert_colors(input_data, default_formats=FORMATS)
+
+
+# The formatter keeps its own content-hash cache, so responses are not cached again
+@tool("code-beautifier", description="Re-indent and clean up Python, JSON and brace-language code", warmup=_warm_formatter)
+def code_beautifier_logic(input_data: str) -> str:
+    """Format code with the backend for its language (``` fence tag or detected)."""
+    from app.services.code_formatter import code_formatter
+    if not input_data.strip():
+        return "Please provide code to beautify"
+    return code_formatter.format(input_data)[1]
+
+
+@tool_registry.streamer("code-beautifier")
+def code_beautifier_stream(input_data: str) -> Iterator[str]:
+    """Format code and yield it in chunks of lines (for large files)."""
+    from app.services.code_formatter import code_formatter
+    if not input_data.strip():
+        return iter(["Please provide code to beautify"])
+    return code_formatter.stream(input_data)
+
+
+@tool(
+    "domain-checker",
+    description="Domain availability from local zone files, across TLDs and name variants",
+    max_input_chars=500000,
+    warmup=_warm_domains
+)
+def domain_checker_logic(input_data: str) -> str:
+    """Check domain availability against the local zone-file index (names, domains or JSON)."""
+    from app.services.domain_checker import check_domain_request
+    return check_domain_request(input_data)
+
+
+@tool(
+    "plagiarism-checker",
+    description="Originality score and matching sources from a local reference corpus",
+    cacheable=True,
+    warmup=_warm_plagiarism
+)
+def plagiarism_checker_logic(input_data: str) -> str:
+    """Check text against the local reference corpus (MinHash/LSH index)."""
+    from app.services.plagiarism import check_plagiarism, format_report
+    text = input_data.strip()
+    if not text:
+        return "Please provide text to check"
+    return format_report(check_plagiarism(text))
@@ -0,0 +1,290 @@
+"""
+Chunked Execution Service
+Map-reduce mode for rewriting and checking agents on long inputs: the text
+is split on paragraph and sentence boundaries, the chunks run concurrently
+through the agent executor (each with the tail of the previous chunk as
+context) and the outputs are stitched back together in order.
+"""
+import re
+import uuid
+from contextlib import aclosing
+from typing import Optional, Dict, Any, List, AsyncIterator, Union
+
+from agents import Agent
+
+from app.schemas import AgentResponse, AgentStreamChunk, UsageInfo, ModelSettingsSchema
+from app.core.config import settings as app_settings
+from app.services.agent_executor import AgentExecutor
+from app.services.batch_executor import BatchExecutor
+
+
+_PARAGRAPH_BREAK = re.compile(r"(\n[ \t]*\n\s*)")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])(\s+)")
+_WHITESPACE = re.compile(r"\s+")
+
+# user_context key carrying the overlap; it is context for the model, not text to process
+OVERLAP_CONTEXT_KEY = "Preceding text (context only, do not include it in the output)"
+
+
+class Chunk:
+    """A span of the input and the whitespace separating it from the previous chunk."""
+    
+    __slots__ = ("separator", "text")
+    
+    def __init__(self, separator: str, text: str):
+        self.separator = separator
+        self.text = text
+
+
+def _split_keep(pattern: "re.Pattern[str]", text: str) -> List[List[str]]:
+    """Split text into [separator, piece] pairs; the first separator is empty."""
+    parts = pattern.split(text)
+    pairs = [["", parts[0]]]
+    for index in range(1, len(parts) - 1, 2):
+        pairs.append([parts[index], parts[index + 1]])
+    return [pair for pair in pairs if pair[1]]
+
+
+def _hard_split(text: str, max_chars: int) -> List[List[str]]:
+    """Split an over-long sentence at the last whitespace before max_chars (or at max_chars)."""
+    pieces: List[List[str]] = []
+    separator = ""
+    while len(text) > max_chars:
+        cut = max((match.start() for match in _WHITESPACE.finditer(text, 0, max_chars + 1)), default=0)
+        if cut <= 0:
+            pieces.append([separator, text[:max_chars]])
+            separator, text = "", text[max_chars:]
+            continue
+        gap = _WHITESPACE.match(text, cut)
+        pieces.append([separator, text[:cut]])
+        separator, text = gap.group(), text[gap.end():]
+    if text:
+        pieces.append([separator, text])
+    return pieces
+
+
+def split_text(text: str, max_chars: int) -> List[Chunk]:
+    """
+    Split text into chunks of at most `max_chars`, packing whole paragraphs,
+    then whole sentences of over-long paragraphs, then words.
+    
+    Separators between chunks are kept, so joining every chunk's separator
+    and text reproduces the stripped input exactly.
+    """
+    units: List[List[str]] = []
+    for separator, paragraph in _split_keep(_PARAGRAPH_BREAK, text.strip()):
+        if len(paragraph) <= max_chars:
+            units.append([separator, paragraph])
+            continue
+        for index, (gap, sentence) in enumerate(_split_keep(_SENTENCE_BREAK, paragraph)):
+            pieces = _hard_split(sentence, max_chars) if len(sentence) > max_chars else [["", sentence]]
+            pieces[0][0] = separator if index == 0 else gap
+            units.extend(pieces)
+    
+    chunks: List[Chunk] = []
+    for separator, unit in units:
+        if chunks and len(chunks[-1].text) + len(separator) + len(unit) <= max_chars:
+            chunks[-1].text += separator + unit
+        else:
+            chunks.append(Chunk(separator if chunks else "", unit))
+    return chunks
+
+
+def split_paragraphs(text: str) -> List[List[str]]:
+    """Split text into [separator, paragraph] pairs; the first separator is empty."""
+    return _split_keep(_PARAGRAPH_BREAK, text.strip())
+
+
+def split_sentences(text: str) -> List[List[str]]:
+    """Split text into [separator, sentence] pairs across paragraphs; the first separator is empty."""
+    segments: List[List[str]] = []
+    for separator, paragraph in split_paragraphs(text):
+        sentences = _split_keep(_SENTENCE_BREAK, paragraph)
+        sentences[0][0] = separator
+        segments.extend(sentences)
+    return segments
+
+
+def overlap_tail(text: str, max_chars: int) -> str:
+    """The last whole sentences of `text` fitting in `max_chars` (empty if none do)."""
+    if max_chars <= 0 or not text:
+        return ""
+    if len(text) <= max_chars:
+        return text
+    window = text[-max_chars:]
+    match = _SENTENCE_BREAK.search(window)
+    return window[match.end():] if match else ""
+
+
+def sum_usage(usages: List[Optional[UsageInfo]]) -> Optional[UsageInfo]:
+    """Total token usage over chunks; None if no chunk reached the model."""
+    reported = [usage for usage in usages if usage is not None]
+    if not reported:
+        return None
+    return UsageInfo(
+        prompt_tokens=sum(usage.prompt_tokens or 0 for usage in reported),
+        completion_tokens=sum(usage.completion_tokens or 0 for usage in reported),
+        total_tokens=sum(usage.total_tokens or 0 for usage in reported)
+    )
+
+
+class ChunkedExecutor:
+    """
+    Splits long prompts into chunks and runs them with bounded fan-out.
+    
+    Each chunk is an ordinary AgentExecutor call, so admission control,
+    retries, deadlines and the response cache apply per chunk. Chunks are
+    cached even for agents that are not cacheable as a whole (unless
+    `cache_chunks` is off): on resubmission only chunks whose text, or
+    whose preceding overlap, changed go upstream again.
+    """
+    
+    def __init__(
+        self,
+        min_chars: int,
+        max_chunk_chars: int,
+        overlap_chars: int,
+        concurrency: int,
+        cache_chunks: bool = True,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.min_chars = min_chars
+        self.max_chunk_chars = max_chunk_chars
+        self.overlap_chars = overlap_chars
+        self.concurrency = concurrency
+        self.cache_chunks = cache_chunks
+        self.documents = 0
+        self.chunks = 0
+    
+    def applies(self, prompt: str) -> bool:
+        return self.enabled and len(prompt) > self.min_chars
+    
+    def split(self, prompt: str) -> List[Chunk]:
+        return split_text(prompt, self.max_chunk_chars)
+    
+    def _chunk_context(
+        self,
+        chunks: List[Chunk],
+        index: int,
+        user_context: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        tail = overlap_tail(chunks[index - 1].text, self.overlap_chars) if index else ""
+        if not tail:
+            return user_context
+        return {**(user_context or {}), OVERLAP_CONTEXT_KEY: tail}
+    
+    async def _run_chunks(
+        self,
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema],
+        user_context: Optional[Dict[str, Any]],
+        cacheable: bool,
+        timeout: Optional[float],
+        semantic_threshold: Optional[float]
+    ) -> AsyncIterator[AgentResponse]:
+        """Yield one response per chunk, in input order, while later chunks are still running."""
+        # Chunking must not lift the prompt size limit
+        AgentExecutor._check_prompt(prompt, str(uuid.uuid4()))
+        chunks = self.split(prompt)
+        self.documents += 1
+        self.chunks += len(chunks)
+        
+        async def run_chunk(index: int, chunk: Chunk) -> Any:
+            response = await AgentExecutor.execute(
+                agent=agent,
+                prompt=chunk.text,
+                settings=settings,
+                user_context=self._chunk_context(chunks, index, user_context),
+                cacheable=cacheable or self.cache_chunks,
+                timeout=timeout,
+                semantic_threshold=semantic_threshold
+            )
+            return index, response
+        
+        # Chunks finish out of order; hold early ones back until their predecessors are out
+        pending: Dict[int, AgentResponse] = {}
+        emitted = 0
+        async with aclosing(BatchExecutor.run_as_completed(chunks, run_chunk, self.concurrency)) as completed:
+            async for index, response in completed:
+                pending[index] = response
+                while emitted in pending:
+                    response = pending.pop(emitted)
+                    yield response.model_copy(update={"content": chunks[emitted].separator + response.content.strip()})
+                    emitted += 1
+    
+    async def execute(
+        self,
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema] = None,
+        user_context: Optional[Dict[str, Any]] = None,
+        cacheable: bool = False,
+        timeout: Optional[float] = None,
+        semantic_threshold: Optional[float] = None
+    ) -> AgentResponse:
+        """
+        Run a long prompt chunk by chunk (same arguments as AgentExecutor.execute).
+        
+        Returns:
+            AgentResponse with the stitched content and the summed usage
+        
+        Raises:
+            AgentExecutionError: If any chunk fails; the remaining chunks are cancelled
+        """
+        parts: List[str] = []
+        usages: List[Optional[UsageInfo]] = []
+        async for response in self._run_chunks(agent, prompt, settings, user_context, cacheable, timeout, semantic_threshold):
+            parts.append(response.content)
+            usages.append(response.usage)
+        return AgentResponse(status="success", content="".join(parts), usage=sum_usage(usages))
+    
+    async def stream(
+        self,
+        agent: Agent,
+        prompt: str,
+        settings: Optional[ModelSettingsSchema] = None,
+        user_context: Optional[Dict[str, Any]] = None,
+        cacheable: bool = False,
+        timeout: Optional[float] = None,
+        semantic_threshold: Optional[float] = None
+    ) -> AsyncIterator[Union[AgentStreamChunk, AgentResponse]]:
+        """
+        Stream a long prompt chunk by chunk (same protocol as AgentExecutor.stream).
+        
+        Yields:
+            One AgentStreamChunk per finished chunk, in input order, then the
+            stitched AgentResponse
+        """
+        response = AgentResponse(status="success", content="")
+        parts: List[str] = []
+        usages: List[Optional[UsageInfo]] = []
+        # Closing this stream early must cancel the chunks still running
+        async with aclosing(self._run_chunks(agent, prompt, settings, user_context, cacheable, timeout, semantic_threshold)) as chunk_responses:
+            async for chunk_response in chunk_responses:
+                parts.append(chunk_response.content)
+                usages.append(chunk_response.usage)
+                yield AgentStreamChunk(agent_id=response.agent_id, delta=chunk_response.content)
+        response.content = "".join(parts)
+        response.usage = sum_usage(usages)
+        yield response
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "concurrency": self.concurrency,
+        }
+
+
+# Global chunked executor instance
+chunked_executor = ChunkedExecutor(
+    min_chars=app_settings.CHUNKING_MIN_CHARS,
+    max_chunk_chars=app_settings.CHUNKING_MAX_CHUNK_CHARS,
+    overlap_chars=app_settings.CHUNKING_OVERLAP_CHARS,
+    concurrency=app_settings.CHUNKING_CONCURRENCY,
+    cache_chunks=app_settings.CHUNKING_CACHE_CHUNKS,
+    enabled=app_settings.CHUNKING_ENABLED
+)
@@ -0,0 +1,413 @@
+"""
+Code Formatter Service
+Heuristic language detection and per-language formatting backends (Python,
+JSON, brace languages, plain text) with a content-hash result cache and a
+chunked streaming mode for large files.
+"""
+import ast
+import hashlib
+import io
+import json
+import re
+import threading
+import tokenize
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Tuple
+
+from app.core.config import settings as app_settings
+
+
+# Markdown code fence around pasted code, e.g. ```python ... ```
+_FENCE = re.compile(r"\A\s*```[ \t]*([\w+#-]*)[ \t]*\n(.*?)\n?```\s*\Z", re.DOTALL)
+
+# Fence tags -> backend
+LANGUAGE_ALIASES = {
+    "python": "python", "py": "python", "python3": "python",
+    "json": "json",
+    **{tag: "braces" for tag in (
+        "javascript", "js", "jsx", "typescript", "ts", "tsx", "java", "c", "h", "cpp", "c++",
+        "cs", "csharp", "c#", "go", "rust", "rs", "php", "swift", "kotlin", "kt", "scala",
+        "css", "scss", "less", "dart",
+    )},
+    # No SQL backend: statements are not brace-nested, whitespace cleanup only
+    "sql": "text",
+}
+
+_PYTHON_HINTS = re.compile(
+    r"^[ \t]*(?:def \w+\(|class \w+[(:]|import \w|from [\w.]+ import |elif\b|except\b|"
+    r"(?:if|for|while|with|try|else)\b[^{;]*:[ \t]*(?:#.*)?$|@\w+)",
+    re.MULTILINE
+)
+_BRACE_HINTS = re.compile(r"[{};][ \t]*$|^[ \t]*}|^[ \t]*(?://|/\*|#include\b)", re.MULTILINE)
+# SQL statement at the start of the code, after any `--` comment lines
+_SQL_START = re.compile(
+    r"(?:\s|--[^\n]*\n)*(?:SELECT\b[\s\S]*?\bFROM\b|INSERT[ \t]+INTO\b|UPDATE[ \t]+[\w.\"`]+[ \t]+SET\b|DELETE[ \t]+FROM\b|"
+    r"(?:CREATE|ALTER|DROP)[ \t]+(?:TABLE|VIEW|INDEX|UNIQUE[ \t]+INDEX)\b|WITH[ \t]+\w+[ \t]+AS[ \t]*\()",
+    re.IGNORECASE
+)
+_LINE_END_SEMICOLON = re.compile(r";[ \t]*$", re.MULTILINE)
+
+_OPENERS = {"{": "}", "(": ")", "[": "]"}
+_CLOSERS = set(_OPENERS.values())
+
+
+def detect_language(code: str) -> str:
+    """
+    Guess the formatting backend from a sample of the code.
+    
+    Returns:
+        "json", "python", "braces" or "text"
+    """
+    head = code.lstrip()[:1]
+    if head in ("{", "["):
+        try:
+            json.loads(code)
+            return "json"
+        except ValueError:
+            pass
+    sample = code[:8192]
+    python = len(_PYTHON_HINTS.findall(sample))
+    braces = len(_BRACE_HINTS.findall(sample))
+    if python and python >= braces:
+        return "python"
+    if _parses_as_python(sample):
+        return "python"
+    if _SQL_START.match(sample):
+        return "text"
+    if braces:
+        return "braces"
+    return "text"
+
+
+def _parses_as_python(sample: str) -> bool:
+    """
+    Whether the sample is a Python module with more than bare names and
+    literals (prose like `hello` parses too). Lines ending in `;` are left
+    to the brace heuristics, since `foo();` is valid Python as well.
+    """
+    if _LINE_END_SEMICOLON.search(sample):
+        return False
+    try:
+        tree = ast.parse(sample)
+    except (SyntaxError, ValueError):
+        return False
+    return any(
+        not (isinstance(node, ast.Expr) and isinstance(node.value, (ast.Name, ast.Constant)))
+        for node in tree.body
+    )
+
+
+def format_text(lines: Iterable[str]) -> Iterator[str]:
+    """Strip trailing whitespace, drop leading blank lines, keep at most two blank lines in a row."""
+    blank = 0
+    started = False
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            blank += 1
+            continue
+        if started:
+            yield from [""] * min(blank, 2)
+        blank = 0
+        started = True
+        yield line
+
+
+def format_braces(lines: Iterable[str], indent: str = "    ") -> Iterator[str]:
+    """
+    Re-indent a brace language line by line from bracket nesting.
+    
+    All brackets opened on one line add a single indent level, so
+    `foo(function() {` indents its body once. Brackets inside string
+    literals and comments are ignored; block comment lines are re-indented
+    with their leading `*`, multi-line template strings are kept verbatim.
+    """
+    levels: List[int] = []  # indent level of the content of each open bracket
+    in_comment = False
+    in_template = False
+    for raw in format_text(lines):
+        if in_template:
+            yield raw
+            in_comment, in_template = _scan_brackets(raw, levels, levels[-1] if levels else 0, in_comment, in_template)
+            continue
+        text = raw.strip()
+        if in_comment:
+            level = levels[-1] if levels else 0
+            text = " " + text if text.startswith("*") else text
+        else:
+            # Leading closers belong to the enclosing level: `}`, `});`
+            leading = len(text) - len(text.lstrip("".join(_CLOSERS)))
+            level = levels[-1 - leading] if len(levels) > leading else 0
+        yield indent * level + text if text else ""
+        in_comment, in_template = _scan_brackets(raw, levels, level, in_comment, in_template)
+
+
+def _scan_brackets(line: str, levels: List[int], level: int, in_comment: bool, in_template: bool) -> Tuple[bool, bool]:
+    """Push/pop `levels` for the brackets of one line; returns (in block comment, in template string)."""
+    quote = "`" if in_template else None
+    i = 0
+    length = len(line)
+    while i < length:
+        char = line[i]
+        if in_comment:
+            if line.startswith("*/", i):
+                in_comment = False
+                i += 1
+        elif quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif line.startswith("//", i):
+            break
+        elif line.startswith("/*", i):
+            in_comment = True
+            i += 1
+        elif char in "\"'`":
+            quote = char
+        elif char in _OPENERS:
+            levels.append(level + 1)
+        elif char in _CLOSERS and levels:
+            levels.pop()
+        i += 1
+    return in_comment, quote == "`"
+
+
+def format_json(code: str, indent: int = 4) -> str:
+    """Pretty-print JSON, keeping key order and non-ASCII text."""
+    return json.dumps(json.loads(code), indent=indent, ensure_ascii=False)
+
+
+def format_python(code: str, indent: str = "    ") -> str:
+    """
+    Normalize Python indentation and whitespace with a tokenizer pass.
+    
+    Statement lines are re-indented from INDENT/DEDENT nesting, continuation
+    lines move with their statement, and comment lines follow the block they
+    sit in. Multi-line string contents are never touched. Only whitespace
+    outside string literals changes, so the result is checked with a single
+    parse instead of an AST comparison.
+    
+    Raises:
+        SyntaxError: If the input is not valid Python
+        tokenize.TokenError: If the input cannot be tokenized
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    new_indent: Dict[int, int] = {}  # statement row -> indent width
+    statement_of: Dict[int, int] = {}  # continuation row -> statement row
+    verbatim: set = set()  # rows inside multi-line strings
+    keep_tail: set = set()  # rows whose trailing whitespace belongs to a string
+    levels: List[Tuple[int, int]] = [(0, 0)]  # (original column, new column) per block
+    comments: List[Tuple[int, int, List[Tuple[int, int]]]] = []  # own-line comments awaiting the next statement
+    statement: Optional[int] = None
+    fstring_rows: List[int] = []
+    
+    for tok in tokenize.generate_tokens(io.StringIO("\n".join(lines) + "\n").readline):
+        kind, (start_row, start_col), (end_row, _) = tok.type, tok.start, tok.end
+        if kind == tokenize.INDENT:
+            levels.append((len(tok.string), levels[-1][1] + len(indent)))
+            continue
+        if kind == tokenize.DEDENT:
+            levels.pop()
+            continue
+        if kind == tokenize.NEWLINE:
+            statement = None
+            continue
+        if kind in (tokenize.NL, tokenize.ENDMARKER):
+            continue
+        if kind == getattr(tokenize, "FSTRING_START", None):
+            fstring_rows.append(start_row)
+        elif kind == getattr(tokenize, "FSTRING_END", None):
+            _protect(fstring_rows.pop(), end_row, verbatim, keep_tail)
+        elif end_row > start_row:
+            _protect(start_row, end_row, verbatim, keep_tail)
+        
+        if kind == tokenize.COMMENT and statement is None:
+            comments.append((start_row, start_col, list(levels)))
+        elif statement is None:
+            statement = start_row
+            new_indent[start_row] = levels[-1][1]
+            _place_comments(comments, (start_col, levels[-1][1]), new_indent)
+        elif start_row != statement:
+            statement_of.setdefault(start_row, statement)
+    _place_comments(comments, None, new_indent)
+    
+    result: List[str] = []
+    for row, line in enumerate(lines, start=1):
+        if row in verbatim:
+            result.append(line)
+            continue
+        body = line.lstrip(" \t")
+        if row in new_indent:
+            line = " " * new_indent[row] + body
+        elif row in statement_of:
+            anchor = statement_of[row]
+            shift = new_indent[anchor] - _indent_width(lines[anchor - 1])
+            line = " " * max(_indent_width(line) + shift, 0) + body
+        result.append(line if row in keep_tail else line.rstrip())
+    
+    formatted = "\n".join(_collapse_blank_lines(result, verbatim))
+    ast.parse(formatted)
+    return formatted
+
+
+def _place_comments(
+    comments: List[Tuple[int, int, List[Tuple[int, int]]]],
+    following: Optional[Tuple[int, int]],
+    new_indent: Dict[int, int]
+) -> None:
+    """
+    Indent own-line comments like the deepest block (open when the comment
+    was read, or opened by the following statement) they are not left of.
+    """
+    for row, column, levels in comments:
+        candidates = levels + [following] if following else levels
+        new_indent[row] = max((level for level in candidates if level[0] <= column), default=(0, 0))[1]
+    comments.clear()
+
+
+def _indent_width(line: str) -> int:
+    return len(line[:len(line) - len(line.lstrip(" \t"))].expandtabs(8))
+
+
+def _protect(first_row: int, last_row: int, verbatim: set, keep_tail: set) -> None:
+    verbatim.update(range(first_row + 1, last_row + 1))
+    keep_tail.update(range(first_row, last_row))
+
+
+def _collapse_blank_lines(lines: List[str], verbatim: set) -> Iterator[str]:
+    blank = 0
+    started = False
+    for row, line in enumerate(lines, start=1):
+        if not line and row not in verbatim:
+            blank += 1
+            continue
+        if started:
+            yield from [""] * min(blank, 2)
+        blank = 0
+        started = True
+        yield line
+
+
+class CodeFormatter:
+    """
+    Formats code with the backend for its language and caches results by
+    content hash, so re-submitting the same file is a dictionary lookup.
+    
+    Python and JSON are formatted as a whole (Python falls back to plain
+    whitespace cleanup if it does not parse). Brace languages and plain
+    text are formatted line by line, which lets `stream` emit the first
+    chunks of a large file before the rest has been processed.
+    """
+    
+    def __init__(self, max_entries: int, indent: int = 4, chunk_lines: int = 500):
+        self.max_entries = max_entries
+        self.indent = indent
+        self.chunk_lines = chunk_lines
+        self._cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def format(self, code: str, language: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Format code.
+        
+        Args:
+            code: Source code, optionally wrapped in a ``` fence with a language tag
+            language: Backend or language name; detected when omitted
+        
+        Returns:
+            Tuple of (backend used, formatted code)
+        """
+        code, language = self._resolve(code, language)
+        key = self._key(code, language)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        result = language, "\n".join(self._format_lines(code, language))
+        self._put(key, result)
+        return result
+    
+    def stream(self, code: str, language: Optional[str] = None) -> Iterator[str]:
+        """Yield the formatted code in chunks of `chunk_lines` lines."""
+        code, language = self._resolve(code, language)
+        key = self._key(code, language)
+        cached = self._get(key)
+        lines = iter(cached[1].split("\n")) if cached is not None else self._format_lines(code, language)
+        
+        emitted: List[str] = []
+        chunk: List[str] = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= self.chunk_lines:
+                emitted.append("\n".join(chunk))
+                yield emitted[-1] + "\n"
+                chunk = []
+        if chunk:
+            emitted.append("\n".join(chunk))
+            yield emitted[-1]
+        if cached is None:
+            self._put(key, (language, "\n".join(emitted)))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+    
+    def _resolve(self, code: str, language: Optional[str]) -> Tuple[str, str]:
+        fence = _FENCE.match(code)
+        if fence:
+            tag, code = fence.groups()
+            language = language or tag
+        if language:
+            language = LANGUAGE_ALIASES.get(language.lower(), language.lower())
+        if language not in BACKENDS:
+            language = detect_language(code)
+        return code, language
+    
+    def _format_lines(self, code: str, language: str) -> Iterator[str]:
+        backend = BACKENDS[language]
+        try:
+            yield from backend(code, self.indent)
+        except (SyntaxError, ValueError, tokenize.TokenError):
+            # Not valid for the detected language: whitespace cleanup only
+            yield from format_text(code.splitlines())
+    
+    @staticmethod
+    def _key(code: str, language: str) -> str:
+        return hashlib.blake2b(f"{language}\0{code}".encode(), digest_size=16).hexdigest()
+    
+    def _get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            result = self._cache.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def _put(self, key: str, result: Tuple[str, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+
+# Backend name -> fn(code, indent width) yielding formatted lines
+BACKENDS: Dict[str, Callable[[str, int], Iterable[str]]] = {
+    "python": lambda code, indent: format_python(code, " " * indent).split("\n"),
+    "json": lambda code, indent: format_json(code, indent).split("\n"),
+    "braces": lambda code, indent: format_braces(code.splitlines(), " " * indent),
+    "text": lambda code, indent: format_text(code.splitlines()),
+}
+
+
+# Global code formatter
+code_formatter = CodeFormatter(
+    max_entries=app_settings.CODE_FORMAT_CACHE_ENTRIES,
+    indent=app_settings.CODE_FORMAT_INDENT,
+    chunk_lines=app_settings.CODE_FORMAT_STREAM_CHUNK_LINES
+)
@@ -0,0 +1,284 @@
+"""
+Color Conversion Service
+Vectorized hex color parsing and conversion to RGB, HSL, HSV, CMYK and Lab
+for single colors and whole palettes.
+"""
+import json
+import re
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+
+FORMATS = ("rgb", "hsl", "hsv", "cmyk", "lab")
+
+# Per-color error messages, indexed by the error codes of parse_hex
+ERRORS = (
+    None,
+    "Invalid Hex Code: Must be 3 or 6 characters",
+    "Invalid Hex Code: Contains non-hex characters",
+    "Invalid Hex Code: Must be a string",
+)
+
+_SEPARATORS = re.compile(r"[\s,;]+")
+
+# ASCII code point -> nibble value, 255 for anything that is not a hex digit
+_NIBBLES = np.full(256, 255, np.uint8)
+for _i, _c in enumerate("0123456789abcdef"):
+    _NIBBLES[ord(_c)] = _NIBBLES[ord(_c.upper())] = _i
+
+# Picks RRGGBB from RGB for shorthand codes
+_SHORTHAND = np.array([0, 0, 1, 1, 2, 2])
+_FULL = np.arange(6)
+
+# sRGB (D65) -> XYZ, and the D65 reference white
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_D65 = np.array([0.95047, 1.0, 1.08883])
+
+
+class ColorInputError(ValueError):
+    """Raised when the request itself (not a single color) cannot be parsed."""
+
+
+def parse_hex(codes: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse hex color codes in one pass.
+    
+    Args:
+        codes: Codes like "#FF5733", "ff5733" or "#F53", already stripped
+    
+    Returns:
+        Tuple of (rgb (N, 3) uint8, error codes (N,) uint8 indexing ERRORS,
+        0 for valid codes)
+    """
+    count = len(codes)
+    if not count:
+        return np.empty((0, 3), np.uint8), np.empty(0, np.uint8)
+    
+    # Fixed-width UTF-32 view: one uint32 code point per character, zero padded
+    chars = np.array(codes, dtype="<U8").view(np.uint32).reshape(count, 8)
+    hashed = chars[:, 0] == ord("#")
+    lengths = np.fromiter(map(len, codes), np.int64, count) - hashed
+    
+    # Gather the six digit positions per row: skip a leading '#', double shorthand digits
+    shorthand = lengths == 3
+    positions = np.where(shorthand[:, None], _SHORTHAND, _FULL) + hashed[:, None]
+    digits = np.take_along_axis(chars, positions, axis=1)
+    nibbles = _NIBBLES[np.minimum(digits, 255)]
+    rgb = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    
+    errors = np.zeros(count, np.uint8)
+    errors[(nibbles == 255).any(axis=1)] = 2
+    errors[~(shorthand | (lengths == 6))] = 1
+    rgb[errors > 0] = 0
+    return rgb, errors
+
+
+def _hue(rgb: np.ndarray, high: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """Hue in degrees for RGB in [0, 1]."""
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    safe = np.where(delta == 0, 1.0, delta)
+    hue = np.select(
+        [delta == 0, high == r, high == g],
+        [0.0, ((g - b) / safe) % 6, (b - r) / safe + 2],
+        (r - g) / safe + 4
+    )
+    return hue * 60
+
+
+def to_hsl(rgb: np.ndarray) -> np.ndarray:
+    """RGB (N, 3) uint8 -> HSL (hue degrees, saturation %, lightness %)."""
+    unit = rgb / 255.0
+    high, low = unit.max(axis=1), unit.min(axis=1)
+    delta = high - low
+    lightness = (high + low) / 2
+    denominator = 1 - np.abs(2 * lightness - 1)
+    saturation = np.where(delta == 0, 0.0, delta / np.where(denominator == 0, 1.0, denominator))
+    return np.column_stack([_hue(unit, high, delta), saturation * 100, lightness * 100])
+
+
+def to_hsv(rgb: np.ndarray) -> np.ndarray:
+    """RGB (N, 3) uint8 -> HSV (hue degrees, saturation %, value %)."""
+    unit = rgb / 255.0
+    high, low = unit.max(axis=1), unit.min(axis=1)
+    delta = high - low
+    saturation = np.where(high == 0, 0.0, delta / np.where(high == 0, 1.0, high))
+    return np.column_stack([_hue(unit, high, delta), saturation * 100, high * 100])
+
+
+def to_cmyk(rgb: np.ndarray) -> np.ndarray:
+    """RGB (N, 3) uint8 -> CMYK percentages."""
+    unit = rgb / 255.0
+    black = 1 - unit.max(axis=1)
+    scale = np.where(black >= 1, 1.0, 1 - black)[:, None]
+    cmy = np.where(black[:, None] >= 1, 0.0, (1 - unit - black[:, None]) / scale)
+    return np.column_stack([cmy, black]) * 100
+
+
+def to_lab(rgb: np.ndarray) -> np.ndarray:
+    """RGB (N, 3) uint8 (sRGB, D65) -> CIE L*a*b*."""
+    unit = rgb / 255.0
+    linear = np.where(unit <= 0.04045, unit / 12.92, ((unit + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _D65
+    epsilon, kappa = 216 / 24389, 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+    return np.column_stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ])
+
+
+def convert(rgb: np.ndarray, fmt: str) -> np.ndarray:
+    """
+    Convert parsed colors to one output format, rounded for display.
+    
+    Returns:
+        (N, 3) or (N, 4) array: ints for rgb/hsl/hsv/cmyk, two decimals for lab
+    """
+    if fmt == "rgb":
+        return rgb.astype(np.int64)
+    if fmt == "lab":
+        # + 0.0 turns the -0.0 that rounding leaves on greys into 0.0
+        return np.round(to_lab(rgb), 2) + 0.0
+    converted = {"hsl": to_hsl, "hsv": to_hsv, "cmyk": to_cmyk}[fmt](rgb)
+    return np.rint(converted).astype(np.int64)
+
+
+# CSS-style rendering of each format for plain-text output: the literal text
+# around each value
+_TEMPLATES = {
+    "rgb": ("rgb(", ", ", ", ", ")"),
+    "hsl": ("hsl(", ", ", "%, ", "%)"),
+    "hsv": ("hsv(", ", ", "%, ", "%)"),
+    "cmyk": ("cmyk(", "%, ", "%, ", "%, ", "%)"),
+    "lab": ("lab(", ", ", ", ", ")"),
+}
+
+# Lookup tables for rendering without per-item str.format: integer parts
+# (hue tops out at 360, |a*| and |b*| stay below 130 for sRGB) and two-decimal
+# fractions as "{:g}" prints them ("" for whole numbers) and as JSON floats do
+_INTEGERS = np.array([str(i) for i in range(361)])
+_FRACTIONS = np.array([""] + [f".{i:02d}".rstrip("0") for i in range(1, 100)])
+_JSON_FRACTIONS = np.array([".0"] + _FRACTIONS[1:].tolist())
+
+
+def _numbers(values: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """Format one converted column as decimal strings."""
+    if values.dtype.kind == "i":
+        return _INTEGERS[values]
+    hundredths = np.rint(np.abs(values) * 100).astype(np.int64)
+    text = np.char.add(_INTEGERS[hundredths // 100], fractions[hundredths % 100])
+    return np.where(values < 0, np.char.add("-", text), text)
+
+
+def _join(values: np.ndarray, pieces: Sequence[str], fractions: np.ndarray) -> np.ndarray:
+    """Interleave the columns of a converted (N, k) array with k + 1 literal pieces."""
+    out = np.char.add(pieces[0], _numbers(values[:, 0], fractions))
+    for piece, column in zip(pieces[1:], values.T[1:]):
+        out = np.char.add(np.char.add(out, piece), _numbers(column, fractions))
+    return np.char.add(out, pieces[-1])
+
+
+def _render(fmt: str, values: np.ndarray) -> List[str]:
+    """Format a converted (N, k) array as CSS-style strings."""
+    return _join(values, _TEMPLATES[fmt], _FRACTIONS).tolist()
+
+
+def _json_column(values: np.ndarray, invalid: np.ndarray) -> str:
+    """Encode a converted (N, k) array as a JSON array of arrays, null for invalid rows."""
+    rows = _join(values, ("[",) + (",",) * (values.shape[1] - 1) + ("]",), _JSON_FRACTIONS)
+    rows[invalid] = "null"
+    return "[" + ",".join(rows.tolist()) + "]"
+
+
+def _parse_request(input_data: str, default_formats: Sequence[str]) -> Tuple[List[Any], List[str], bool]:
+    """
+    Split a request into color codes and output formats.
+    
+    Accepts a JSON array of codes, a JSON object {"colors": [...],
+    "formats": [...]}, or codes separated by newlines, commas, semicolons or
+    spaces.
+    
+    Returns:
+        Tuple of (codes, formats, whether the input was JSON); JSON items
+        that are not strings are passed through unchanged
+    
+    Raises:
+        ColorInputError: On malformed JSON or unknown formats
+    """
+    text = input_data.strip()
+    formats: Sequence[str] = default_formats
+    if text[:1] not in ("[", "{"):
+        return [code for code in _SEPARATORS.split(text) if code], list(formats), False
+    
+    try:
+        payload = json.loads(text)
+    except ValueError as e:
+        raise ColorInputError(f"Invalid JSON input: {e}")
+    if isinstance(payload, dict):
+        formats = payload.get("formats") or formats
+        if isinstance(formats, str):
+            formats = [formats]
+        payload = payload.get("colors", [])
+    if not isinstance(payload, list):
+        raise ColorInputError('Expected a JSON array of colors or {"colors": [...], "formats": [...]}')
+    
+    formats = [str(fmt).lower() for fmt in formats]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ColorInputError(f"Unknown color format(s): {', '.join(unknown)}. Use {', '.join(FORMATS)}")
+    return [code.strip() if isinstance(code, str) else code for code in payload], formats, True
+
+
+def convert_colors(input_data: str, default_formats: Sequence[str] = ("rgb",)) -> str:
+    """
+    Convert one color or a palette.
+    
+    A single plain-text color with a single format returns just the value,
+    e.g. "rgb(255, 87, 51)". Plain-text lists return one line per color.
+    JSON input returns JSON with one column per format (null for invalid
+    colors) and the per-item errors.
+    
+    Args:
+        input_data: Tool input, see `_parse_request`
+        default_formats: Formats used when the request does not name any
+    
+    Returns:
+        Converted colors, or an error message
+    """
+    try:
+        codes, formats, as_json = _parse_request(input_data, default_formats)
+    except ColorInputError as e:
+        return str(e)
+    if not codes and not as_json:
+        return "Please provide a hex color code"
+    
+    # JSON numbers, null etc. are per-item errors rather than coerced to text
+    others = [i for i, code in enumerate(codes) if not isinstance(code, str)] if as_json else []
+    rgb, errors = parse_hex([code if isinstance(code, str) else "" for code in codes] if others else codes)
+    errors[others] = 3
+    invalid = np.nonzero(errors)[0]
+    converted = {fmt: convert(rgb, fmt) for fmt in formats}
+    
+    if as_json:
+        # Same document json.dumps would produce, with the columns encoded vectorized
+        columns = ",".join(f'"{fmt}":{_json_column(values, invalid)}' for fmt, values in converted.items())
+        report = [{"index": int(i), "input": codes[i], "error": ERRORS[errors[i]]} for i in invalid]
+        return (
+            f'{{"count":{len(codes)},"valid":{len(codes) - len(invalid)},'
+            f'"formats":{json.dumps(formats, separators=(",", ":"))},"colors":{{{columns}}},'
+            f'"errors":{json.dumps(report, separators=(",", ":"))}}}'
+        )
+    
+    rendered = [_render(fmt, values) for fmt, values in converted.items()]
+    if len(codes) == 1:
+        return ERRORS[errors[0]] if errors[0] else "\n".join(column[0] for column in rendered)
+    lines = list(map(" | ".join, zip(*rendered))) if len(rendered) > 1 else rendered[0]
+    for i in invalid:
+        lines[i] = ERRORS[errors[i]]
+    return "\n".join(map("{}: {}".format, codes, lines))
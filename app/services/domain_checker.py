@@ -0,0 +1,322 @@
+"""
+Domain Checker Service
+Availability lookups against a local, memory-mapped index of registered
+domains built from registry zone files, plus bulk candidate generation.
+
+Build or extend the index from zone files (optionally .gz) or plain domain lists:
+    python -m app.services.domain_checker build <zone_files...> [--index index_dir]
+    python -m app.services.domain_checker add <files...> [--index index_dir]
+"""
+import argparse
+import ast
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings as app_settings
+
+
+AVAILABLE = "available"
+TAKEN = "taken"
+UNKNOWN = "unknown"  # TLD not covered by the index
+INVALID = "invalid"
+
+_LABEL = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$")
+_WORDS = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+# Files of an index directory
+_META = "meta.json"
+_HASHES = "hashes.npy"
+
+
+def domain_hashes(domains: Sequence[str]) -> np.ndarray:
+    """64-bit blake2b hashes of lowercase domain names."""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(domain.encode(), digest_size=8).digest(), "little") for domain in domains),
+        dtype=np.uint64,
+        count=len(domains)
+    )
+
+
+def iter_zone_domains(path: str) -> Iterator[str]:
+    """
+    Registered domains in a zone file or a plain list of domains.
+    
+    Zone files are read with their $ORIGIN; every owner name is reduced to
+    the label directly below the origin, so glue records such as
+    `ns1.example.com` count as `example.com`.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    origin = ""
+    owner = ""
+    with opener(path, "rt", encoding="utf-8", errors="ignore") as lines:
+        for line in lines:
+            line = line.split(";", 1)[0].rstrip()
+            if not line:
+                continue
+            if line.startswith("$ORIGIN"):
+                origin = line.split()[1].strip(".").lower()
+                continue
+            if line.startswith("$"):
+                continue
+            if not line[0].isspace():
+                owner = line.split(None, 1)[0].lower()
+            if owner == "@" or not owner:
+                continue
+            if owner.endswith("."):
+                name = owner.rstrip(".")
+            else:
+                name = f"{owner}.{origin}" if origin else owner
+            zone = origin or name.split(".", 1)[-1]
+            if name.endswith("." + zone):
+                label = name[:-len(zone) - 1].rsplit(".", 1)[-1]
+                yield f"{label}.{zone}"
+
+
+class DomainIndex:
+    """
+    Sorted uint64 hashes of registered domains, memory-mapped from disk,
+    with a small in-memory delta for domains added at runtime. A domain is
+    taken if its hash is present; only TLDs listed in `tlds` are covered.
+    """
+    
+    def __init__(self, hashes: Optional[np.ndarray] = None, tlds: Optional[Set[str]] = None):
+        self._hashes = hashes if hashes is not None else np.empty(0, np.uint64)
+        self._delta = np.empty(0, np.uint64)
+        self.tlds: Set[str] = set(tlds or ())
+    
+    @property
+    def size(self) -> int:
+        return len(self._hashes) + len(self._delta)
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DomainIndex":
+        directory = Path(path)
+        meta = json.loads((directory / _META).read_text())
+        return cls(np.load(directory / _HASHES, mmap_mode="r" if mmap else None), set(meta["tlds"]))
+    
+    def add(self, domains: Iterable[str]) -> int:
+        """Mark domains as registered. Returns the number of names read."""
+        names = list(domains)
+        self.tlds.update(name.split(".", 1)[-1] for name in names)
+        self._delta = np.union1d(self._delta, domain_hashes(names))
+        return len(names)
+    
+    def save(self, path: str) -> None:
+        """Merge the delta into the base and write it (atomic per file)."""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        merged = np.union1d(np.asarray(self._hashes), self._delta)
+        tmp = directory / "hashes.tmp.npy"
+        np.save(tmp, merged)
+        os.replace(tmp, directory / _HASHES)
+        tmp = directory / "meta.tmp"
+        tmp.write_text(json.dumps({"tlds": sorted(self.tlds), "domains": len(merged)}))
+        os.replace(tmp, directory / _META)
+    
+    def contains(self, domains: Sequence[str]) -> np.ndarray:
+        """Vectorized membership test: bool array, True for registered domains."""
+        hashes = domain_hashes(domains)
+        found = np.zeros(len(hashes), bool)
+        for sorted_hashes in (self._hashes, self._delta):
+            if len(sorted_hashes):
+                positions = np.searchsorted(sorted_hashes, hashes)
+                in_range = positions < len(sorted_hashes)
+                found[in_range] |= np.asarray(sorted_hashes[positions[in_range]]) == hashes[in_range]
+        return found
+
+
+def normalize_label(name: str) -> Optional[str]:
+    """Turn a name or phrase into a DNS label ("Nova Labs!" -> "novalabs"), None if impossible."""
+    label = re.sub(r"[\s_.'’]+", "", name.strip().lower())
+    try:
+        label = label.encode("idna").decode("ascii") if not label.isascii() else label
+    except UnicodeError:
+        return None
+    label = re.sub(r"[^a-z0-9-]", "", label).strip("-")
+    return label if _LABEL.match(label) else None
+
+
+def generate_variants(seed: str, limit: int) -> List[str]:
+    """
+    Candidate labels for a seed name: the name itself, hyphenated words,
+    and configured prefixes/suffixes, in that order, without duplicates.
+    """
+    words = [word.lower() for word in _WORDS.findall(seed)] or [seed]
+    base = normalize_label("".join(words))
+    if base is None:
+        return []
+    candidates = [base, "-".join(words)]
+    candidates += [prefix + base for prefix in app_settings.DOMAIN_VARIANT_PREFIXES]
+    suffixes = [suffix for suffix in app_settings.DOMAIN_VARIANT_SUFFIXES if not base.endswith(suffix)]
+    candidates += [base + suffix for suffix in suffixes]
+    candidates += [f"{prefix}-{base}" for prefix in app_settings.DOMAIN_VARIANT_PREFIXES]
+    candidates += [f"{base}-{suffix}" for suffix in suffixes]
+    labels = dict.fromkeys(label for label in map(normalize_label, candidates) if label)
+    return list(labels)[:limit]
+
+
+_index: Optional[DomainIndex] = None
+
+
+def get_domain_index() -> DomainIndex:
+    """Get the registered-domain index (singleton), memory-mapped from DOMAIN_INDEX_PATH."""
+    global _index
+    if _index is None:
+        path = Path(app_settings.DOMAIN_INDEX_PATH)
+        _index = DomainIndex.load(str(path)) if (path / _META).exists() else DomainIndex()
+    return _index
+
+
+def check_domains(domains: Sequence[str]) -> List[Tuple[str, str]]:
+    """Availability of full domain names, as (domain, status) pairs in input order."""
+    index = get_domain_index()
+    names: List[str] = []
+    statuses: List[str] = []
+    for domain in domains:
+        domain = domain.strip().lower().rstrip(".")
+        label, _, tld = domain.partition(".")
+        names.append(domain)
+        if not tld or normalize_label(label) != label:
+            statuses.append(INVALID)
+        else:
+            statuses.append(UNKNOWN if tld not in index.tlds else "")
+    lookup = [i for i, status in enumerate(statuses) if not status]
+    if lookup:
+        taken = index.contains([names[i] for i in lookup])
+        for i, registered in zip(lookup, taken):
+            statuses[i] = TAKEN if registered else AVAILABLE
+    return list(zip(names, statuses))
+
+
+def candidates_for(names: Sequence[str], tlds: Sequence[str], variants: bool, limit: int) -> List[str]:
+    """Expand names into domains: full domains as-is, other names across `tlds` (and variants)."""
+    domains: List[str] = []
+    for name in names:
+        name = re.sub(r"^\s*(?:[a-z]+://)?(?:www\.)?", "", str(name), flags=re.I).split("/", 1)[0]
+        if "." in name.strip(". "):
+            domains.append(name.strip())
+            continue
+        labels = generate_variants(name, app_settings.DOMAIN_MAX_VARIANTS) if variants else [normalize_label(name)]
+        domains.extend(f"{label}.{tld}" for label in labels if label for tld in tlds)
+    return list(dict.fromkeys(domains))[:limit]
+
+
+def _string_list(value: Any) -> Optional[List[str]]:
+    """A JSON field holding one string or a list of strings, as a list (None if it is neither)."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    return None
+
+
+def check_domain_request(input_data: str) -> str:
+    """
+    Domain checker tool.
+    
+    Plain text: one name or domain per line (or comma separated). Names
+    without a TLD are checked across DOMAIN_TLDS, and for a single name the
+    first available variants are listed too. JSON: {"names": [...],
+    "tlds": [...], "variants": bool, "available_only": bool} returns JSON.
+    """
+    text = input_data.strip()
+    if not text:
+        return "Please provide a domain name"
+    limit = app_settings.DOMAIN_MAX_CANDIDATES
+    
+    if text.startswith("{"):
+        try:
+            request = json.loads(text)
+        except ValueError as e:
+            return f"Invalid JSON input: {e}"
+        names = _string_list(request.get("names") or [])
+        tlds = _string_list(request.get("tlds") or app_settings.DOMAIN_TLDS)
+        if names is None or tlds is None:
+            return 'Invalid JSON input: "names" and "tlds" must be a string or a list of strings'
+        tlds = [tld.strip(".").lower() for tld in tlds]
+        results = check_domains(candidates_for(names, tlds, bool(request.get("variants")), limit))
+        if request.get("available_only"):
+            results = [result for result in results if result[1] == AVAILABLE]
+        summary: Dict[str, Any] = {status: 0 for status in (AVAILABLE, TAKEN, UNKNOWN, INVALID)}
+        for _, status in results:
+            summary[status] += 1
+        return json.dumps({
+            "summary": summary,
+            "results": [{"domain": domain, "status": status} for domain, status in results],
+        }, separators=(",", ":"))
+    
+    names = [name for name in re.split(r"[\n,]+", text) if name.strip()]
+    results = check_domains(candidates_for(names, app_settings.DOMAIN_TLDS, False, limit))
+    lines = [f"- {domain}: {_describe(status, domain)}" for domain, status in results]
+    if len(names) == 1 and "." not in names[0]:
+        variants = check_domains(candidates_for(names, app_settings.DOMAIN_TLDS[:1], True, limit))
+        free = [domain for domain, status in variants[1:] if status == AVAILABLE][:10]
+        if free:
+            lines += ["", "Available variants:"] + [f"- {domain}" for domain in free]
+    return "Domain availability:\n" + "\n".join(lines)
+
+
+def annotate_names(content: str, tlds: Optional[Sequence[str]] = None, available_only: bool = False) -> str:
+    """
+    Annotate generated business names with domain availability.
+    
+    Accepts the agent's output as a list repr ("['A', 'B']") or one name per
+    line (list markers are ignored). Each name gets its availability across
+    `tlds`; with `available_only`, names without any available domain are
+    dropped.
+    """
+    tlds = [tld.strip(".").lower() for tld in (tlds or app_settings.DOMAIN_TLDS[:3])]
+    try:
+        parsed = ast.literal_eval(content.strip())
+        names = [str(name) for name in parsed] if isinstance(parsed, (list, tuple)) else None
+    except (ValueError, SyntaxError):
+        names = None
+    if names is None:
+        names = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*|\*\*", "", line).strip() for line in content.splitlines()]
+        names = [name for name in names if name]
+    
+    labels = [normalize_label(name) for name in names]
+    statuses = dict(check_domains([f"{label}.{tld}" for label in labels if label for tld in tlds]))
+    lines = []
+    for name, label in zip(names, labels):
+        domains = [(f"{label}.{tld}", statuses[f"{label}.{tld}"]) for tld in tlds] if label else []
+        if available_only and not any(status == AVAILABLE for _, status in domains):
+            continue
+        details = ", ".join(f"{domain}: {status}" for domain, status in domains) or "no valid domain"
+        lines.append(f"{name} ({details})")
+    return "\n".join(lines) if lines else "No generated names have an available domain"
+
+
+def _describe(status: str, domain: str) -> str:
+    if status == UNKNOWN:
+        return f"unknown (no zone data for .{domain.partition('.')[2]})"
+    return status
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or extend the registered-domain index")
+    parser.add_argument("command", choices=("build", "add"))
+    parser.add_argument("files", nargs="+", help="Zone files (.txt/.zone, optionally .gz) or domain lists")
+    parser.add_argument("--index", default=app_settings.DOMAIN_INDEX_PATH)
+    args = parser.parse_args(argv)
+    for path in args.files:
+        if not Path(path).is_file():
+            parser.error(f"{path} is not a file")
+    
+    index = DomainIndex.load(args.index, mmap=False) if args.command == "add" else DomainIndex()
+    for path in args.files:
+        index.add(iter_zone_domains(path))
+    index.save(args.index)
+    index = DomainIndex.load(args.index)
+    print(f"Indexed {index.size} domains across {len(index.tlds)} TLDs into {args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Incremental Checking Service
+Re-checks edited documents for the grammar and spell checkers: every
+revision is split into sentences and diffed against the last processed
+revision of the same document, only changed sentences go to the agent,
+and stored corrections are reused for the rest of the text.
+"""
+import difflib
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+from agents import Agent
+
+from app.schemas import IncrementalResponse, UsageInfo, ModelSettingsSchema
+from app.core.config import settings as app_settings
+from app.services.agent_executor import AgentExecutor
+from app.services.batch_executor import BatchExecutor
+from app.services.chunking import OVERLAP_CONTEXT_KEY, split_paragraphs, split_sentences, sum_usage
+from app.services.semantic_cache import build_scope_key
+
+
+class StaleRevisionError(Exception):
+    """Raised when a revision older than the last processed one is submitted."""
+    
+    def __init__(self, document_id: str, revision: int, current: int):
+        self.document_id = document_id
+        self.revision = revision
+        self.current = current
+        self.message = f"Revision {revision} of document '{document_id}' is older than the last processed revision {current}"
+        super().__init__(self.message)
+
+
+class Block:
+    """Consecutive source sentences checked in one call and their corrected text."""
+    
+    __slots__ = ("sources", "corrected")
+    
+    def __init__(self, sources: Tuple[str, ...], corrected: str):
+        self.sources = sources
+        self.corrected = corrected
+
+
+class DocumentState:
+    """Last processed revision of a document."""
+    
+    __slots__ = ("revision", "scope", "blocks", "expires")
+    
+    def __init__(self, revision: int, scope: str, blocks: List[Block], expires: float):
+        self.revision = revision
+        self.scope = scope
+        self.blocks = blocks
+        self.expires = expires
+
+
+DocumentKey = Tuple[str, str, str]  # (client, canonical slug, document ID)
+
+
+class DocumentStore:
+    """Bounded LRU store of document states with a TTL."""
+    
+    def __init__(self, max_documents: int, ttl: float):
+        self.max_documents = max_documents
+        self.ttl = ttl
+        self._documents: "OrderedDict[DocumentKey, DocumentState]" = OrderedDict()
+    
+    def get(self, key: DocumentKey) -> Optional[DocumentState]:
+        state = self._documents.get(key)
+        if state is None:
+            return None
+        if state.expires < time.monotonic():
+            del self._documents[key]
+            return None
+        self._documents.move_to_end(key)
+        return state
+    
+    def put(self, key: DocumentKey, revision: int, scope: str, blocks: List[Block]) -> None:
+        current = self._documents.get(key)
+        # A slower request for an older revision must not replace a newer one
+        if current is not None and current.revision > revision:
+            return
+        self._documents[key] = DocumentState(revision, scope, blocks, time.monotonic() + self.ttl)
+        self._documents.move_to_end(key)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+def reusable_blocks(blocks: List[Block], sentences: List[str]) -> Dict[int, Block]:
+    """
+    Map positions in `sentences` to stored blocks that can be reused there.
+    
+    A block is reusable when all of its source sentences survive the edit
+    unchanged and still consecutive.
+    """
+    old = [sentence for block in blocks for sentence in block.sources]
+    moved: Dict[int, int] = {}
+    matcher = difflib.SequenceMatcher(None, old, sentences, autojunk=False)
+    for tag, old_start, old_end, new_start, _ in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(old_end - old_start):
+                moved[old_start + offset] = new_start + offset
+    
+    reused: Dict[int, Block] = {}
+    start = 0
+    for block in blocks:
+        first = moved.get(start)
+        if first is not None and all(moved.get(start + k) == first + k for k in range(len(block.sources))):
+            reused[first] = block
+        start += len(block.sources)
+    return reused
+
+
+def _align(segments: List[List[str]], corrected: str) -> List[Block]:
+    """
+    Attribute a corrected hunk to its source sentences: per sentence if the
+    correction has as many sentences, else per paragraph if it has as many
+    paragraphs, else as one block.
+    """
+    sources = [sentence for _, sentence in segments]
+    sentences = [sentence for _, sentence in split_sentences(corrected)]
+    if len(sentences) == len(sources):
+        return [Block((source,), sentence) for source, sentence in zip(sources, sentences)]
+    
+    groups: List[List[str]] = []
+    for index, (separator, sentence) in enumerate(segments):
+        if index == 0 or "\n" in separator:
+            groups.append([])
+        groups[-1].append(sentence)
+    paragraphs = [paragraph for _, paragraph in split_paragraphs(corrected)]
+    if len(groups) > 1 and len(paragraphs) == len(groups):
+        return [Block(tuple(group), paragraph) for group, paragraph in zip(groups, paragraphs)]
+    return [Block(tuple(sources), corrected)]
+
+
+class IncrementalChecker:
+    """
+    Diff-based re-checking with a per-document store.
+    
+    Runs of changed sentences (up to `max_hunk_chars`) are sent to the agent
+    as one call each, with the preceding sentence as context, `concurrency`
+    at a time. Corrections are stored per sentence (or per paragraph) where
+    they split back into as many parts as the source, so later edits
+    re-check as little as possible. Documents are keyed by client, agent
+    and document ID; a change of model settings or context re-checks the
+    whole text.
+    """
+    
+    def __init__(self, max_documents: int, ttl: float, max_hunk_chars: int, concurrency: int):
+        self.store = DocumentStore(max_documents, ttl)
+        self.max_hunk_chars = max_hunk_chars
+        self.concurrency = concurrency
+        self.checks = 0
+        self.segments = 0
+        self.changed_segments = 0
+    
+    def _hunks(self, segments: List[List[str]], reused: Dict[int, Block]) -> List[Tuple[int, int]]:
+        """Ranges of consecutive sentences not covered by a reusable block."""
+        hunks: List[Tuple[int, int]] = []
+        index = 0
+        while index < len(segments):
+            block = reused.get(index)
+            if block is not None:
+                index += len(block.sources)
+                continue
+            start, size = index, len(segments[index][1])
+            index += 1
+            while index < len(segments) and index not in reused:
+                size += len(segments[index][0]) + len(segments[index][1])
+                if size > self.max_hunk_chars:
+                    break
+                index += 1
+            hunks.append((start, index))
+        return hunks
+    
+    async def check(
+        self,
+        client_id: str,
+        slug: str,
+        agent: Agent,
+        document_id: str,
+        revision: int,
+        text: str,
+        settings: Optional[ModelSettingsSchema] = None,
+        user_context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> IncrementalResponse:
+        """
+        Check a revision of a document, re-checking only what changed since the stored revision.
+        
+        Args:
+            client_id: Calling client (documents are private to it)
+            slug: Canonical agent slug
+            agent: The checking agent
+            document_id: Client-chosen document identifier
+            revision: Revision number of `text`
+            text: Full text of the revision
+        
+        Returns:
+            IncrementalResponse with the corrected full text
+        
+        Raises:
+            StaleRevisionError: If a newer revision was already processed
+            AgentExecutionError: If checking a changed part fails
+        """
+        AgentExecutor._check_prompt(text, str(uuid.uuid4()))
+        key = (client_id, slug, document_id)
+        scope = build_scope_key(agent, settings, user_context)
+        base = self.store.get(key)
+        if base is not None and revision < base.revision:
+            raise StaleRevisionError(document_id, revision, base.revision)
+        if base is not None and base.scope != scope:
+            base = None
+        
+        segments = split_sentences(text)
+        sentences = [sentence for _, sentence in segments]
+        reused = reusable_blocks(base.blocks, sentences) if base is not None else {}
+        hunks = self._hunks(segments, reused)
+        
+        async def check_hunk(index: int, hunk: Tuple[int, int]) -> Tuple[List[Block], Optional[UsageInfo]]:
+            start, end = hunk
+            prompt = sentences[start] + "".join(separator + sentence for separator, sentence in segments[start + 1:end])
+            context = {**(user_context or {}), OVERLAP_CONTEXT_KEY: sentences[start - 1]} if start else user_context
+            response = await AgentExecutor.execute(
+                agent=agent,
+                prompt=prompt,
+                settings=settings,
+                user_context=context,
+                cacheable=True,
+                timeout=timeout
+            )
+            return _align(segments[start:end], response.content.strip()), response.usage
+        
+        results = await BatchExecutor.run_ordered(hunks, check_hunk, self.concurrency)
+        for (start, _), (blocks, _) in zip(hunks, results):
+            position = start
+            for block in blocks:
+                reused[position] = block
+                position += len(block.sources)
+        
+        blocks: List[Block] = []
+        parts: List[str] = []
+        index = 0
+        while index < len(segments):
+            block = reused[index]
+            blocks.append(block)
+            parts.append(segments[index][0] + block.corrected)
+            index += len(block.sources)
+        self.store.put(key, revision, scope, blocks)
+        
+        changed = sum(end - start for start, end in hunks)
+        self.checks += 1
+        self.segments += len(segments)
+        self.changed_segments += changed
+        return IncrementalResponse(
+            status="success",
+            content="".join(parts),
+            usage=sum_usage([usage for _, usage in results]),
+            document_id=document_id,
+            revision=revision,
+            base_revision=base.revision if base is not None else None,
+            segments=len(segments),
+            changed_segments=changed
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.store),
+            "checks": self.checks,
+            "segments": self.segments,
+            "changed_segments": self.changed_segments,
+            "changed_ratio": round(self.changed_segments / self.segments, 4) if self.segments else 0.0,
+        }
+
+
+# Global incremental checker instance
+incremental_checker = IncrementalChecker(
+    max_documents=app_settings.INCREMENTAL_MAX_DOCUMENTS,
+    ttl=app_settings.INCREMENTAL_TTL_SECONDS,
+    max_hunk_chars=app_settings.INCREMENTAL_MAX_HUNK_CHARS,
+    concurrency=app_settings.INCREMENTAL_CONCURRENCY
+)
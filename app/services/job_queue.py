@@ -0,0 +1,303 @@
+"""
+Job Queue Service
+Runs long generations in background workers and persists their results,
+so request handling is decoupled from generation latency.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, List, Awaitable, Callable, Tuple
+
+from app.core.config import settings as app_settings, resolve_workers
+from app.schemas import AgentResponse, ErrorResponse, JobStatus
+
+
+logger = logging.getLogger(__name__)
+
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+    
+    def __init__(self, max_size: int):
+        self.message = f"Job queue is full ({max_size} pending jobs)"
+        super().__init__(self.message)
+
+
+class JobStore(ABC):
+    """Interface for job persistence backends."""
+    
+    @abstractmethod
+    async def save(self, job: JobStatus) -> None:
+        """Insert or replace a job record."""
+    
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        """Return a job by id, or None if unknown or expired."""
+    
+    @abstractmethod
+    async def fail_unfinished(self, message: str) -> int:
+        """Mark queued/running jobs as failed (used after a restart). Returns the count."""
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store bounded by entry count and age."""
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+    
+    async def save(self, job: JobStatus) -> None:
+        self._jobs[job.job_id] = job
+        self._evict()
+    
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.created_at < time.time() - self.ttl:
+            del self._jobs[job_id]
+            return None
+        return job
+    
+    async def fail_unfinished(self, message: str) -> int:
+        return 0
+    
+    def _evict(self) -> None:
+        cutoff = time.time() - self.ttl
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if len(self._jobs) <= self.max_entries and oldest.created_at >= cutoff:
+                break
+            self._jobs.popitem(last=False)
+
+
+class SQLiteJobStore(JobStore):
+    """Job store persisted to a SQLite file; blocking I/O runs in a thread."""
+    
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection of the current process: SQLite handles must not be shared across a fork."""
+        if self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+        conn.commit()
+        return conn
+    
+    async def save(self, job: JobStatus) -> None:
+        await asyncio.to_thread(self._save, job)
+    
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        return await asyncio.to_thread(self._get, job_id)
+    
+    async def fail_unfinished(self, message: str) -> int:
+        return await asyncio.to_thread(self._fail_unfinished, message)
+    
+    def _save(self, job: JobStatus) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+                (job.job_id, job.status, job.created_at, job.model_dump_json())
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._conn.execute("DELETE FROM jobs WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+    
+    def _get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND created_at >= ?",
+                (job_id, time.time() - self.ttl)
+            ).fetchone()
+        return JobStatus.model_validate_json(row[0]) if row else None
+    
+    def _fail_unfinished(self, message: str) -> int:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM jobs WHERE status NOT IN (?, ?)", TERMINAL_STATES
+            ).fetchall()
+            for (data,) in rows:
+                job = JobStatus.model_validate_json(data)
+                job.status = "failed"
+                job.finished_at = time.time()
+                job.error = ErrorResponse(message=message)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, data = ? WHERE job_id = ?",
+                    (job.status, job.model_dump_json(), job.job_id)
+                )
+            self._conn.commit()
+        return len(rows)
+
+
+JobRunner = Callable[[], Awaitable[AgentResponse]]
+
+
+class JobQueue:
+    """
+    Bounded queue of pending jobs drained by a fixed pool of worker tasks.
+    Workers are started lazily on first submission.
+    """
+    
+    def __init__(self, store: JobStore, workers: int, max_size: int, recover: bool = True):
+        self.store = store
+        self.worker_count = workers
+        self.max_size = max_size
+        self._queue: Optional["asyncio.Queue[Tuple[str, JobRunner]]"] = None
+        self._workers: List["asyncio.Task[None]"] = []
+        self._done_events: Dict[str, asyncio.Event] = {}
+        # With several server workers sharing a store, only the supervisor recovers
+        self._recovered = not recover
+    
+    async def submit(self, slug: str, runner: JobRunner) -> JobStatus:
+        """
+        Enqueue a job and return its initial (queued) status.
+        
+        Raises:
+            JobQueueFullError: If `max_size` jobs are already pending
+        """
+        await self._ensure_started()
+        if self._queue.full():
+            raise JobQueueFullError(self.max_size)
+        
+        job = JobStatus(job_id=str(uuid.uuid4()), slug=slug, status="queued", created_at=time.time())
+        await self.store.save(job)
+        self._done_events[job.job_id] = asyncio.Event()
+        self._queue.put_nowait((job.job_id, runner))
+        return job
+    
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        return await self.store.get(job_id)
+    
+    async def wait(self, job_id: str, timeout: float) -> Optional[JobStatus]:
+        """
+        Long-poll a job until it finishes or `timeout` seconds elapse.
+        Jobs owned by another process are polled from the store.
+        """
+        event = self._done_events.get(job_id)
+        deadline = time.monotonic() + timeout
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await self.store.get(job_id)
+        
+        while True:
+            job = await self.store.get(job_id)
+            if job is None or job.status in TERMINAL_STATES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+    
+    async def shutdown(self) -> None:
+        """Cancel the worker tasks; unfinished jobs are failed on next start."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+    
+    async def recover(self) -> int:
+        """Fail jobs left queued or running by a previous server run (once)."""
+        if self._recovered:
+            return 0
+        self._recovered = True
+        return await self.store.fail_unfinished("Job was interrupted by a server restart")
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._workers),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+        }
+    
+    async def _ensure_started(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        await self.recover()
+        self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.worker_count)]
+    
+    async def _work(self) -> None:
+        while True:
+            job_id, runner = await self._queue.get()
+            try:
+                await self._run_job(job_id, runner)
+            finally:
+                self._queue.task_done()
+    
+    async def _run_job(self, job_id: str, runner: JobRunner) -> None:
+        job = await self.store.get(job_id)
+        if job is None:
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        await self.store.save(job)
+        
+        try:
+            job.result = await runner()
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = e.to_error_response() if hasattr(e, "to_error_response") else ErrorResponse(
+                message=f"Execution error: {str(e)}"
+            )
+        
+        job.finished_at = time.time()
+        await self.store.save(job)
+        event = self._done_events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+
+def _create_store() -> JobStore:
+    workers = resolve_workers(app_settings.SERVER_WORKERS)
+    if app_settings.JOB_STORE == "sqlite" or workers > 1:
+        if app_settings.JOB_STORE == "memory":
+            # Several workers started outside app.server (which switches the store itself):
+            # an in-memory store would only hold each worker's own jobs
+            logger.warning(
+                "JOB_STORE=memory cannot be shared by %d workers; using JOB_STORE=sqlite at %s",
+                workers, os.path.abspath(app_settings.JOB_STORE_PATH)
+            )
+        return SQLiteJobStore(app_settings.JOB_STORE_PATH, ttl=app_settings.JOB_RESULT_TTL_SECONDS)
+    return InMemoryJobStore(
+        max_entries=app_settings.JOB_STORE_MAX_ENTRIES,
+        ttl=app_settings.JOB_RESULT_TTL_SECONDS
+    )
+
+
+# Global job queue instance
+job_queue = JobQueue(
+    store=_create_store(),
+    workers=app_settings.JOB_WORKERS,
+    max_size=app_settings.JOB_QUEUE_MAX_SIZE,
+    recover=app_settings.JOB_RECOVER_ON_START
+)
@@ -0,0 +1,388 @@
+"""
+Metrics Service
+In-process Prometheus-style counters, gauges and histograms for the agent
+pipeline, rendered in the text exposition format at /metrics.
+"""
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional, Dict, List, Tuple, Sequence, Iterator
+
+from app.core.config import settings as app_settings
+
+
+# Latency buckets in seconds, from in-process stages up to long generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Set per request by MetricsMiddleware / the agents router so deeper layers can label samples
+request_started: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+current_slug: ContextVar[str] = ContextVar("current_slug", default="unknown")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter keyed by label values.
+    
+    Updates are plain dict operations: every worker process runs a single
+    event loop, so no locking is needed and each worker keeps its own totals.
+    """
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+    
+    def render(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+    
+    def snapshot(self) -> list:
+        return [[list(labels), value] for labels, value in self._values.items()]
+    
+    def merge(self, rows: list) -> None:
+        """Add another process's snapshot rows to this metric."""
+        for labels, value in rows:
+            self.inc(*labels, amount=value)
+    
+    def empty(self) -> "Counter":
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests in flight."""
+    
+    kind = "gauge"
+    
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+    
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+    
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are cumulated only when rendered."""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+    
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+    
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series.count if series else 0
+    
+    def render(self) -> Iterator[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(series.sum)}"
+            yield f"{self.name}_count{label_str} {series.count}"
+    
+    def snapshot(self) -> list:
+        return [[list(labels), s.counts, s.sum, s.count] for labels, s in self._series.items()]
+    
+    def merge(self, rows: list) -> None:
+        """Add another process's snapshot rows to this histogram."""
+        for labels, counts, total, count in rows:
+            labels = tuple(labels)
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = _HistogramSeries(len(self.buckets))
+            series.counts = [a + b for a, b in zip(series.counts, counts)]
+            series.sum += total
+            series.count += count
+    
+    def empty(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets[:-1])
+
+
+class MetricsRegistry:
+    """Owns all metrics of this worker process and renders them for scraping."""
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[Counter] = []
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self, snapshots: Optional[List[Dict[str, list]]] = None) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        
+        Args:
+            snapshots: Per-process snapshots to merge and render instead of
+                this process's own values (see MultiprocessMetrics)
+        """
+        metrics = self._metrics
+        if snapshots is not None:
+            metrics = []
+            for metric in self._metrics:
+                merged = metric.empty()
+                for snapshot in snapshots:
+                    merged.merge(snapshot.get(metric.name, []))
+                metrics.append(merged)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self) -> Dict[str, list]:
+        """JSON-serializable values of every metric, for cross-process merging."""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+    
+    def kinds(self) -> Dict[str, str]:
+        return {metric.name: metric.kind for metric in self._metrics}
+    
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class MultiprocessMetrics:
+    """
+    Shares metric snapshots between the worker processes of one server.
+    
+    Every worker writes its snapshot to `<directory>/<pid>.json` each
+    `interval` seconds and whenever it is scraped; /metrics on any worker
+    merges all files. Counters and histograms of exited workers are kept so
+    totals stay monotonic, their gauges are dropped. Without a directory
+    (single process) only the local registry is rendered.
+    """
+    
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.registry.enabled
+    
+    def write(self) -> None:
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.registry.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+    
+    def collect(self) -> List[Dict[str, list]]:
+        """Snapshots of all workers, past and present."""
+        kinds = self.registry.kinds()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(int(name[:-5])):
+                snapshot = {metric: rows for metric, rows in snapshot.items() if kinds.get(metric) != "gauge"}
+            snapshots.append(snapshot)
+        return snapshots
+    
+    def render(self) -> str:
+        if not self.enabled:
+            return self.registry.render()
+        self.write()
+        return self.registry.render(self.collect())
+    
+    def start(self) -> None:
+        """Start periodic snapshot writes (call from within the event loop)."""
+        if self.enabled and self._task is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._task = asyncio.ensure_future(self._write_periodically())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self.write()
+    
+    async def _write_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Global registry and pipeline metrics
+registry = MetricsRegistry(enabled=app_settings.METRICS_ENABLED)
+
+stage_seconds = registry.histogram(
+    "webtool_stage_seconds",
+    "Time spent per pipeline stage (parse, lookup, prompt_build, upstream, ttft, tool, serialize)",
+    ("stage", "slug", "kind")
+)
+tokens_total = registry.counter(
+    "webtool_tokens_total",
+    "Upstream tokens reported in UsageInfo",
+    ("slug", "type")
+)
+errors_total = registry.counter(
+    "webtool_errors_total",
+    "Failed requests by error type",
+    ("slug", "kind", "error")
+)
+cache_lookups_total = registry.counter(
+    "webtool_cache_lookups_total",
+    "Response cache lookups by result (hit, miss, coalesced, semantic_hit, semantic_miss)",
+    ("slug", "result")
+)
+http_in_flight = registry.gauge(
+    "webtool_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+upstream_in_flight = registry.gauge(
+    "webtool_upstream_requests_in_flight",
+    "Agent runs currently waiting on the model API",
+    ("slug",)
+)
+
+# Cross-worker aggregation for /metrics (METRICS_MULTIPROCESS_DIR, set by app.server)
+multiprocess_metrics = MultiprocessMetrics(
+    registry,
+    directory=app_settings.METRICS_MULTIPROCESS_DIR,
+    interval=app_settings.METRICS_SYNC_INTERVAL_SECONDS
+)
+
+
+def observe_stage(stage: str, started: float, kind: str = "agent", slug: Optional[str] = None) -> None:
+    """Record the time since `started` (a perf_counter value) for a pipeline stage."""
+    if registry.enabled:
+        stage_seconds.observe(time.perf_counter() - started, stage, slug or current_slug.get(), kind)
+
+
+def observe_parse(entered: float, slug: str, kind: str) -> None:
+    """Record time from request arrival to endpoint entry (body read and validation)."""
+    started = request_started.get()
+    if started is not None and registry.enabled:
+        stage_seconds.observe(entered - started, "parse", slug, kind)
+
+
+def count_tokens(prompt_tokens: int, completion_tokens: int, slug: Optional[str] = None) -> None:
+    if registry.enabled:
+        slug = slug or current_slug.get()
+        tokens_total.inc(slug, "prompt", amount=prompt_tokens)
+        tokens_total.inc(slug, "completion", amount=completion_tokens)
+
+
+def count_cache_lookup(result: str) -> None:
+    if registry.enabled:
+        cache_lookups_total.inc(current_slug.get(), result)
+
+
+def count_error(error: str, kind: str = "agent", slug: Optional[str] = None) -> None:
+    if registry.enabled:
+        errors_total.inc(slug or current_slug.get(), kind, error)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware stamping request arrival and tracking requests in flight."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+        request_started.set(time.perf_counter())
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            http_in_flight.dec()
@@ -0,0 +1,464 @@
+"""
+Plagiarism Detection Service
+Word-shingle MinHash signatures with a banded LSH index over a local reference
+corpus. The index is built offline, memory-mapped at startup and can grow
+incrementally.
+
+Build or extend an index from a directory of .txt files:
+    python -m app.services.plagiarism build <corpus_dir> [index_dir]
+    python -m app.services.plagiarism add <files_or_dirs...> [--index index_dir]
+"""
+import argparse
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+import numpy as np
+
+from app.core.config import settings as app_settings
+
+
+WORD_RE = re.compile(r"\w+")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# Files of an index directory
+_META = "meta.json"
+_SOURCES = "sources.json"
+_ARRAYS = ("keys", "ids", "signatures", "passages")
+
+
+class MinHasher:
+    """
+    MinHash over word k-shingles, computed for sliding windows of a text.
+    Words are hashed with CRC32 so signatures are stable across processes.
+    """
+    
+    def __init__(self, num_perm: int, bands: int, shingle_size: int, window: int, stride: int, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.window = window
+        self.stride = stride
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: odd multipliers, top 32 bits kept
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    
+    def params(self) -> Dict[str, int]:
+        return {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "window": self.window,
+            "stride": self.stride,
+            "seed": self.seed,
+        }
+    
+    def windows(self, text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Signatures of the text's word windows.
+        
+        Returns:
+            Tuple of (signatures (W, num_perm) uint32, window char spans (W, 2),
+            word char spans (N, 2)). Texts shorter than one window yield a
+            single window.
+        """
+        matches = list(WORD_RE.finditer(text))
+        if not matches:
+            return np.empty((0, self.num_perm), np.uint32), np.empty((0, 2), np.int64), np.empty((0, 2), np.int64)
+        
+        words = np.array([zlib.crc32(m.group().lower().encode()) for m in matches], dtype=np.uint64)
+        word_spans = np.array([m.span() for m in matches], dtype=np.int64)
+        
+        shingles = self._shingles(words)
+        # (num_perm, shingles), rows contiguous for the window reduction below
+        hashed = np.multiply.outer(self._a, shingles)
+        hashed += self._b[:, None]
+        hashed >>= np.uint64(32)
+        hashed = hashed.astype(np.uint32)
+        
+        count = len(words)
+        firsts = np.arange(0, max(count - self.window, 0) + 1, self.stride)
+        if firsts[-1] + self.window < count:
+            firsts = np.append(firsts, count - self.window)
+        last_words = np.minimum(firsts + self.window, count) - 1
+        shingle_ends = np.minimum(np.maximum(last_words - self.shingle_size + 1, firsts), len(shingles) - 1)
+        
+        # Min over each window's shingles in one pass: reduceat over
+        # [first, end + 1) pairs, keeping every other (overlapping) segment
+        bounds = np.column_stack([firsts, shingle_ends + 1]).ravel()
+        if bounds[-1] == len(shingles):
+            bounds = bounds[:-1]
+        signatures = np.minimum.reduceat(hashed, bounds, axis=1)[:, ::2].T.copy()
+        spans = np.column_stack([word_spans[firsts, 0], word_spans[last_words, 1]])
+        return signatures, spans, word_spans
+    
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Collapse each band of `rows` signature values into one uint64 key: (W, bands)."""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros(banded.shape[:2], np.uint64)
+        for row in range(self.rows):
+            keys = keys * _MIX + banded[:, :, row]
+        return keys
+    
+    def _shingles(self, words: np.ndarray) -> np.ndarray:
+        size = min(self.shingle_size, len(words))
+        count = len(words) - size + 1
+        shingles = np.zeros(count, np.uint64)
+        for offset in range(size):
+            shingles = shingles * _MIX + words[offset:offset + count]
+        return shingles
+
+
+class PlagiarismIndex:
+    """
+    LSH index of corpus passages (one passage per MinHasher window).
+    
+    The base segment is a set of .npy arrays (memory-mapped when loaded):
+    per band, sorted passage keys with their passage ids; per passage, its
+    signature and (document, start char, end char). Documents added at
+    runtime go to an in-memory delta segment until `save` compacts both.
+    """
+    
+    def __init__(self, hasher: MinHasher, sources: Optional[List[str]] = None, arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.hasher = hasher
+        self.sources: List[str] = sources or []
+        if arrays is None:
+            arrays = {
+                "keys": np.empty((hasher.bands, 0), np.uint64),
+                "ids": np.empty((hasher.bands, 0), np.uint32),
+                "signatures": np.empty((0, hasher.num_perm), np.uint32),
+                "passages": np.empty((0, 3), np.int64),
+            }
+        self._keys = arrays["keys"]
+        self._ids = arrays["ids"]
+        self._signatures = arrays["signatures"]
+        self._passages = arrays["passages"]
+        self._delta_buckets: List[Dict[int, List[int]]] = [{} for _ in range(hasher.bands)]
+        self._delta_signatures: List[np.ndarray] = []
+        self._delta_passages: List[Tuple[int, int, int]] = []
+    
+    @property
+    def base_size(self) -> int:
+        return len(self._passages)
+    
+    @property
+    def size(self) -> int:
+        return self.base_size + len(self._delta_passages)
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PlagiarismIndex":
+        """Open an index directory; arrays are memory-mapped unless `mmap` is False."""
+        directory = Path(path)
+        meta = json.loads((directory / _META).read_text())
+        sources = json.loads((directory / _SOURCES).read_text())
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in _ARRAYS
+        }
+        return cls(MinHasher(**meta), sources, arrays)
+    
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str]], hasher: MinHasher) -> "PlagiarismIndex":
+        """Index (source, text) pairs into a new base segment."""
+        sources: List[str] = []
+        signatures: List[np.ndarray] = []
+        passages: List[np.ndarray] = []
+        for source, text in documents:
+            doc_signatures, spans, _ = hasher.windows(text)
+            if not len(doc_signatures):
+                continue
+            doc = np.column_stack([np.full(len(spans), len(sources), np.int64), spans])
+            sources.append(source)
+            signatures.append(doc_signatures)
+            passages.append(doc)
+        if not sources:
+            return cls(hasher)
+        return cls(hasher, sources, _segment(hasher, np.concatenate(signatures), np.concatenate(passages)))
+    
+    def add(self, source: str, text: str) -> int:
+        """Add one document to the delta segment. Returns its passage count."""
+        signatures, spans, _ = self.hasher.windows(text)
+        if not len(signatures):
+            return 0
+        doc_id = len(self.sources)
+        self.sources.append(source)
+        keys = self.hasher.band_keys(signatures)
+        for i in range(len(signatures)):
+            passage_id = self.size
+            self._delta_signatures.append(signatures[i])
+            self._delta_passages.append((doc_id, int(spans[i, 0]), int(spans[i, 1])))
+            for band in range(self.hasher.bands):
+                self._delta_buckets[band].setdefault(int(keys[i, band]), []).append(passage_id)
+        return len(signatures)
+    
+    def save(self, path: str) -> None:
+        """Write base + delta as a new base segment (atomic per file)."""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        signatures = np.concatenate([np.asarray(self._signatures), np.array(self._delta_signatures, np.uint32).reshape(-1, self.hasher.num_perm)])
+        passages = np.concatenate([np.asarray(self._passages), np.array(self._delta_passages, np.int64).reshape(-1, 3)])
+        arrays = _segment(self.hasher, signatures, passages)
+        for name, array in arrays.items():
+            tmp = directory / f"{name}.tmp.npy"
+            np.save(tmp, array)
+            os.replace(tmp, directory / f"{name}.npy")
+        for name, content in ((_SOURCES, self.sources), (_META, self.hasher.params())):
+            tmp = directory / f"{name}.tmp"
+            tmp.write_text(json.dumps(content))
+            os.replace(tmp, directory / name)
+    
+    def query(self, text: str, threshold: float, top_k: int, max_bucket: int = 64) -> Dict[str, Any]:
+        """
+        Find corpus passages similar to windows of `text`.
+        
+        Args:
+            text: Text to check
+            threshold: Minimum estimated Jaccard similarity for a window to count as matched
+            top_k: Number of sources to report
+            max_bucket: Candidates taken per LSH bucket (caps boilerplate passages)
+        
+        Returns:
+            Dict with originality (0-1, None when the index is empty), words,
+            and the top sources with similarity, share of the text and
+            matching character spans
+        """
+        signatures, spans, word_spans = self.hasher.windows(text)
+        words = len(word_spans)
+        if not self.size:
+            return {"originality": None, "words": words, "sources": []}
+        if not words:
+            return {"originality": 1.0, "words": words, "sources": []}
+        
+        windows, passages = self._candidates(signatures, max_bucket)
+        if not len(windows):
+            return {"originality": 1.0, "words": words, "sources": []}
+        
+        similarity = (signatures[windows] == self._passage_signatures(passages)).mean(axis=1)
+        keep = similarity >= threshold
+        windows, passages, similarity = windows[keep], passages[keep], similarity[keep]
+        
+        # Best passage per matched window
+        order = np.lexsort((-similarity, windows))
+        first = np.ones(len(order), bool)
+        first[1:] = windows[order][1:] != windows[order][:-1]
+        best = order[first]
+        
+        matched = np.zeros(len(text) + 1, np.int32)
+        by_doc: Dict[int, List[Tuple[int, int, float]]] = {}
+        for i in best:
+            start, end = spans[windows[i]]
+            matched[start] += 1
+            matched[end] -= 1
+            doc_id = self._passage(int(passages[i]))[0]
+            by_doc.setdefault(doc_id, []).append((int(windows[i]), int(passages[i]), float(similarity[i])))
+        covered = np.cumsum(matched)[:-1] > 0
+        boundaries = np.zeros(len(text) + 1, np.int32)
+        np.add.at(boundaries, word_spans[:, 0], 1)
+        np.add.at(boundaries, word_spans[:, 1], -1)
+        letters = np.cumsum(boundaries)[:-1] > 0
+        total = max(int(letters.sum()), 1)
+        
+        sources = [self._source_report(doc_id, hits, spans, len(text), total, letters) for doc_id, hits in by_doc.items()]
+        sources.sort(key=lambda s: (s["share"], s["similarity"]), reverse=True)
+        return {
+            "originality": round(1.0 - int((covered & letters).sum()) / total, 4),
+            "words": words,
+            "sources": sources[:top_k],
+        }
+    
+    def _candidates(self, signatures: np.ndarray, max_bucket: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique (window, passage) pairs sharing at least one band key."""
+        keys = self.hasher.band_keys(signatures)
+        pairs_w: List[np.ndarray] = []
+        pairs_p: List[np.ndarray] = []
+        if self.base_size:
+            for band in range(self.hasher.bands):
+                band_keys = self._keys[band]
+                lo = np.searchsorted(band_keys, keys[:, band], side="left")
+                hi = np.searchsorted(band_keys, keys[:, band], side="right")
+                for window in np.nonzero(hi > lo)[0]:
+                    ids = np.asarray(self._ids[band, lo[window]:min(hi[window], lo[window] + max_bucket)])
+                    pairs_w.append(np.full(len(ids), window, np.int64))
+                    pairs_p.append(ids.astype(np.int64))
+        if self._delta_passages:
+            for band, buckets in enumerate(self._delta_buckets):
+                for window in range(len(keys)):
+                    ids = buckets.get(int(keys[window, band]))
+                    if ids:
+                        pairs_w.append(np.full(min(len(ids), max_bucket), window, np.int64))
+                        pairs_p.append(np.array(ids[:max_bucket], np.int64))
+        if not pairs_w:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        pairs = np.unique(np.stack([np.concatenate(pairs_w), np.concatenate(pairs_p)], axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+    
+    def _passage_signatures(self, passages: np.ndarray) -> np.ndarray:
+        in_base = passages < self.base_size
+        if in_base.all():
+            return np.asarray(self._signatures[passages])
+        result = np.empty((len(passages), self.hasher.num_perm), np.uint32)
+        result[in_base] = self._signatures[passages[in_base]]
+        for i in np.nonzero(~in_base)[0]:
+            result[i] = self._delta_signatures[passages[i] - self.base_size]
+        return result
+    
+    def _passage(self, passage_id: int) -> Tuple[int, int, int]:
+        if passage_id < self.base_size:
+            doc_id, start, end = self._passages[passage_id]
+            return int(doc_id), int(start), int(end)
+        return self._delta_passages[passage_id - self.base_size]
+    
+    def _source_report(
+        self,
+        doc_id: int,
+        hits: List[Tuple[int, int, float]],
+        spans: np.ndarray,
+        length: int,
+        total: int,
+        letters: np.ndarray
+    ) -> Dict[str, Any]:
+        """Merge a source's matched windows into contiguous input/source spans."""
+        hits.sort()
+        merged: List[List[int]] = []
+        for window, passage_id, _ in hits:
+            start, end = (int(x) for x in spans[window])
+            _, source_start, source_end = self._passage(passage_id)
+            if merged and start <= merged[-1][1]:
+                last = merged[-1]
+                last[1] = max(last[1], end)
+                last[2] = min(last[2], source_start)
+                last[3] = max(last[3], source_end)
+            else:
+                merged.append([start, end, source_start, source_end])
+        covered = np.zeros(length, bool)
+        for start, end, _, _ in merged:
+            covered[start:end] = True
+        return {
+            "source": self.sources[doc_id],
+            "similarity": round(max(s for _, _, s in hits), 4),
+            "share": round(int((covered & letters).sum()) / total, 4),
+            "spans": [{"input": [s, e], "source": [ss, se]} for s, e, ss, se in merged],
+        }
+
+
+def _segment(hasher: MinHasher, signatures: np.ndarray, passages: np.ndarray) -> Dict[str, np.ndarray]:
+    """Base segment arrays: band keys sorted per band, with their passage ids."""
+    keys = hasher.band_keys(signatures).T
+    order = np.argsort(keys, axis=1, kind="stable")
+    return {
+        "keys": np.take_along_axis(keys, order, axis=1),
+        "ids": order.astype(np.uint32),
+        "signatures": signatures,
+        "passages": passages,
+    }
+
+
+_index: Optional[PlagiarismIndex] = None
+
+
+def default_hasher() -> MinHasher:
+    return MinHasher(
+        num_perm=app_settings.PLAGIARISM_NUM_PERM,
+        bands=app_settings.PLAGIARISM_BANDS,
+        shingle_size=app_settings.PLAGIARISM_SHINGLE_SIZE,
+        window=app_settings.PLAGIARISM_WINDOW_WORDS,
+        stride=app_settings.PLAGIARISM_WINDOW_WORDS // 2
+    )
+
+
+def get_plagiarism_index() -> PlagiarismIndex:
+    """Get the reference index (singleton), memory-mapped from PLAGIARISM_INDEX_PATH."""
+    global _index
+    if _index is None:
+        path = Path(app_settings.PLAGIARISM_INDEX_PATH)
+        _index = PlagiarismIndex.load(str(path)) if (path / _META).exists() else PlagiarismIndex(default_hasher())
+    return _index
+
+
+def index_status() -> Dict[str, Any]:
+    """Size of the reference index, for warmup logs and the readiness probe."""
+    index = get_plagiarism_index()
+    return {
+        "path": app_settings.PLAGIARISM_INDEX_PATH,
+        "documents": len(index.sources),
+        "passages": index.size,
+    }
+
+
+def check_plagiarism(text: str) -> Dict[str, Any]:
+    """Check text against the reference corpus."""
+    return get_plagiarism_index().query(
+        text,
+        threshold=app_settings.PLAGIARISM_MATCH_THRESHOLD,
+        top_k=app_settings.PLAGIARISM_TOP_SOURCES
+    )
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    """Render a `check_plagiarism` result as the tool's text output."""
+    if result["originality"] is None:
+        score = "not available (no reference corpus indexed)"
+    else:
+        score = f"{result['originality'] * 100:.1f}%"
+    lines = [
+        "Plagiarism Check Complete.",
+        f"- Originality Score: {score}",
+        f"- Words Analyzed: {result['words']}",
+        f"- Matching Sources: {len(result['sources'])}",
+    ]
+    for match in result["sources"]:
+        spans = ", ".join(
+            f"{span['input'][0]}-{span['input'][1]} -> {span['source'][0]}-{span['source'][1]}"
+            for span in match["spans"]
+        )
+        lines.append(
+            f"  * {match['source']}: {match['share'] * 100:.1f}% of text, "
+            f"similarity {match['similarity']:.2f} (chars {spans})"
+        )
+    return "\n".join(lines)
+
+
+def _read_corpus(paths: Iterable[str]) -> Iterable[Tuple[str, str]]:
+    for path in paths:
+        root = Path(path)
+        files = sorted(root.rglob("*.txt")) if root.is_dir() else [root]
+        for file in files:
+            source = str(file.relative_to(root)) if root.is_dir() else file.name
+            yield source, file.read_text(encoding="utf-8", errors="ignore")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or extend the plagiarism reference index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index every .txt file of a corpus directory")
+    build.add_argument("corpus")
+    build.add_argument("index", nargs="?", default=app_settings.PLAGIARISM_INDEX_PATH)
+    add = commands.add_parser("add", help="Add documents to an existing index")
+    add.add_argument("paths", nargs="+")
+    add.add_argument("--index", default=app_settings.PLAGIARISM_INDEX_PATH)
+    args = parser.parse_args(argv)
+    for path in [args.corpus] if args.command == "build" else args.paths:
+        if not Path(path).exists():
+            parser.error(f"{path} does not exist")
+    
+    if args.command == "build":
+        index = PlagiarismIndex.build(_read_corpus([args.corpus]), default_hasher())
+        index.save(args.index)
+    else:
+        index = PlagiarismIndex.load(args.index, mmap=False)
+        for source, text in _read_corpus(args.paths):
+            index.add(source, text)
+        index.save(args.index)
+    print(f"Indexed {len(index.sources)} documents ({index.size} passages) into {args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Provider Pool Service
+Balances agent runs across several Gemini API keys / endpoints so throughput
+scales with the number of keys instead of one key's rate limit.
+"""
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, TypeVar
+import httpx
+from agents import AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
+from openai import RateLimitError
+
+from app.core.config import (
+    settings as app_settings,
+    create_http_client,
+    create_gemini_client,
+    get_gemini_http_client,
+    get_gemini_client,
+    get_run_config
+)
+
+T = TypeVar("T")
+
+
+class Provider:
+    """One API key/endpoint with its own client, HTTP pool, run config and load counters."""
+    
+    def __init__(
+        self,
+        name: str,
+        client: AsyncOpenAI,
+        http_client: httpx.AsyncClient,
+        run_config: RunConfig,
+        weight: float = 1.0
+    ):
+        self.name = name
+        self.client = client
+        self.http_client = http_client
+        self.run_config = run_config
+        self.weight = max(weight, 0.001)
+        self.outstanding = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+    
+    def is_cooling_down(self, now: float) -> bool:
+        return self.cooldown_until > now
+    
+    def load(self) -> float:
+        """Weighted outstanding requests, counting the one about to be added."""
+        return (self.outstanding + 1) / self.weight
+    
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "cooling_down": self.is_cooling_down(now),
+        }
+
+
+class ProviderPool:
+    """
+    Least-outstanding-requests balancer over weighted providers.
+    A provider that returns 429 is taken out of rotation for a cooldown period.
+    """
+    
+    def __init__(self, providers: List[Provider], cooldown: float):
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self.providers = providers
+        self.cooldown = cooldown
+    
+    def pick(self) -> Provider:
+        """
+        Choose the provider with the lowest weighted outstanding load.
+        If every provider is cooling down, the one that recovers first is used.
+        """
+        now = time.monotonic()
+        available = [p for p in self.providers if not p.is_cooling_down(now)]
+        if not available:
+            return min(self.providers, key=lambda p: p.cooldown_until)
+        best = min(p.load() for p in available)
+        return random.choice([p for p in available if p.load() == best])
+    
+    @asynccontextmanager
+    async def acquire(self, provider: Optional[Provider] = None) -> AsyncIterator[Provider]:
+        """Reserve a provider for the duration of one upstream call."""
+        provider = provider or self.pick()
+        provider.outstanding += 1
+        provider.requests += 1
+        try:
+            yield provider
+        except RateLimitError as e:
+            self.mark_rate_limited(provider, e)
+            raise
+        finally:
+            provider.outstanding -= 1
+    
+    async def run(self, fn: Callable[[Provider], Awaitable[T]]) -> T:
+        """
+        Run `fn` on a balanced provider, failing over to another provider on 429.
+        Each provider is tried at most once per call.
+        """
+        tried = set()
+        while True:
+            provider = self.pick()
+            if provider.name in tried:
+                provider = next((p for p in self.providers if p.name not in tried), provider)
+            tried.add(provider.name)
+            try:
+                async with self.acquire(provider) as acquired:
+                    return await fn(acquired)
+            except RateLimitError:
+                if len(tried) >= len(self.providers):
+                    raise
+    
+    def mark_rate_limited(self, provider: Provider, error: Optional[Exception] = None) -> None:
+        """Take a provider out of rotation, honoring Retry-After when it is longer."""
+        provider.rate_limited += 1
+        cooldown = max(self.cooldown, retry_after_seconds(error) or 0.0)
+        provider.cooldown_until = time.monotonic() + cooldown
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [p.stats(now) for p in self.providers]
+
+
+def retry_after_seconds(error: Optional[Exception]) -> Optional[float]:
+    """Retry-After of an upstream error response, in seconds, if present."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _provider_name(index: int, api_key: str, base_url: str) -> str:
+    """Readable provider label that never exposes the full API key."""
+    return f"{index}:{base_url}#...{api_key[-4:]}"
+
+
+def _build_provider(index: int, api_key: str, base_url: str, weight: float) -> Provider:
+    http_client = create_http_client()
+    client = create_gemini_client(api_key=api_key, base_url=base_url, http_client=http_client)
+    model = OpenAIChatCompletionsModel(model=app_settings.GEMINI_MODEL, openai_client=client)
+    run_config = RunConfig(model_provider=client, model=model, tracing_disabled=True)
+    return Provider(
+        name=_provider_name(index, api_key, base_url),
+        client=client,
+        http_client=http_client,
+        run_config=run_config,
+        weight=weight
+    )
+
+
+def _create_pool() -> ProviderPool:
+    configured = app_settings.GEMINI_PROVIDERS
+    if not configured:
+        # Single-key setup: reuse the shared client and run config
+        default = Provider(
+            name=_provider_name(0, app_settings.GEMINI_API_KEY, app_settings.GEMINI_BASE_URL),
+            client=get_gemini_client(),
+            http_client=get_gemini_http_client(),
+            run_config=get_run_config()
+        )
+        return ProviderPool([default], cooldown=app_settings.PROVIDER_COOLDOWN_SECONDS)
+    
+    providers = [
+        _build_provider(
+            index=i,
+            api_key=p.api_key or app_settings.GEMINI_API_KEY,
+            base_url=p.base_url or app_settings.GEMINI_BASE_URL,
+            weight=p.weight
+        )
+        for i, p in enumerate(configured)
+    ]
+    return ProviderPool(providers, cooldown=app_settings.PROVIDER_COOLDOWN_SECONDS)
+
+
+# Global provider pool
+provider_pool = _create_pool()
@@ -0,0 +1,172 @@
+"""
+Resilience Service
+Jittered retries for transient upstream failures, latency-tracked hedged
+requests and deadline helpers for agent execution.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Deque, Awaitable, Callable, TypeVar
+from openai import APIConnectionError, APITimeoutError, InternalServerError
+
+from app.core.config import settings as app_settings
+
+T = TypeVar("T")
+
+# Transient failures worth retrying; rate limits are handled by admission control
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (1-based) failed attempt."""
+    ceiling = min(app_settings.RETRY_MAX_DELAY_SECONDS, app_settings.RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies per key."""
+    
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+    
+    def record(self, key: str, seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+    
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RetryPolicy:
+    """Retries, hedging and deadline enforcement around one logical upstream call."""
+    
+    def __init__(self, latencies: LatencyTracker):
+        self.latencies = latencies
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+    
+    async def call(
+        self,
+        key: str,
+        attempt: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+        hedge: bool = False,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> T:
+        """
+        Run `attempt` until it succeeds, retrying transient errors with backoff.
+        
+        Args:
+            key: Latency bucket (e.g. agent name) used for hedge delays
+            attempt: Coroutine factory performing one upstream call
+            timeout: Overall deadline in seconds covering all attempts
+            hedge: Fire a second attempt after the p95 latency and keep the first result
+            discard: Releases the result of a hedged attempt that also succeeded
+                but was not used (losers still running are cancelled instead)
+        
+        Raises:
+            asyncio.TimeoutError: If the deadline passes
+            Exception: The last error once retries are exhausted or it is not retryable
+        """
+        try:
+            return await asyncio.wait_for(self._call_with_retries(key, attempt, hedge, discard), timeout)
+        except asyncio.TimeoutError:
+            self.record_timeout()
+            raise
+    
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+    
+    async def _call_with_retries(
+        self,
+        key: str,
+        attempt: Callable[[], Awaitable[T]],
+        hedge: bool,
+        discard: Optional[Callable[[T], Awaitable[None]]]
+    ) -> T:
+        attempts = max(1, app_settings.RETRY_MAX_ATTEMPTS)
+        for number in range(1, attempts + 1):
+            started = time.monotonic()
+            try:
+                if hedge:
+                    result = await self._hedged(key, attempt, discard)
+                else:
+                    result = await attempt()
+                self.latencies.record(key, time.monotonic() - started)
+                return result
+            except Exception as e:
+                if number >= attempts or not is_retryable(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(number))
+    
+    async def _hedged(
+        self,
+        key: str,
+        attempt: Callable[[], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]]
+    ) -> T:
+        delay = self.hedge_delay(key)
+        primary = asyncio.ensure_future(attempt())
+        if delay is None:
+            return await primary
+        
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(attempt()))
+            while True:
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    winner = primary if primary in succeeded else succeeded[0]
+                    if winner is not primary:
+                        self.hedge_wins += 1
+                    for task in succeeded:
+                        if task is not winner and discard is not None:
+                            await discard(task.result())
+                    return winner.result()
+                for task in done:
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Losers (and, on timeout, every attempt) are cancelled; they settle their own reservations
+            for task in pending:
+                task.cancel()
+    
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """p95-derived delay before hedging, or None until enough samples exist."""
+        p95 = self.latencies.percentile(key, 0.95, min_samples=app_settings.HEDGE_MIN_SAMPLES)
+        if p95 is None:
+            return None
+        return max(app_settings.HEDGE_MIN_DELAY_SECONDS, p95)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+        }
+
+
+# Global retry policy
+retry_policy = RetryPolicy(LatencyTracker(window=app_settings.HEDGE_LATENCY_WINDOW))
@@ -0,0 +1,219 @@
+"""
+Response Cache Service
+Two-tier cache for deterministic agent responses: an in-process LRU+TTL tier
+backed by an optional shared tier (e.g. Redis) behind a pluggable interface.
+"""
+import hashlib
+import json
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from agents import Agent
+
+from app.core.config import settings as app_settings
+from app.schemas import ModelSettingsSchema, UsageInfo
+from app.services.agent_identity import agent_identity, instructions_fingerprint
+
+
+class CacheBackend(ABC):
+    """Interface for a shared cache tier. Values are JSON strings."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value or None on miss."""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedResponse:
+    """Content and usage of a successful agent run."""
+
+    __slots__ = ("content", "usage")
+
+    def __init__(self, content: str, usage: Optional[UsageInfo]):
+        self.content = content
+        self.usage = usage
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "content": self.content,
+            "usage": self.usage.model_dump() if self.usage else None
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CachedResponse":
+        data = json.loads(raw)
+        usage = UsageInfo(**data["usage"]) if data.get("usage") else None
+        return cls(content=data["content"], usage=usage)
+
+
+_HORIZONTAL_WHITESPACE = re.compile(r"[ \t\f\v]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize insignificant whitespace so trivially different inputs share a key."""
+    text = prompt.replace("\r\n", "\n").strip()
+    return "\n".join(_HORIZONTAL_WHITESPACE.sub(" ", line).strip() for line in text.split("\n"))
+
+
+def scope_payload(
+    agent: Agent,
+    settings: Optional[ModelSettingsSchema] = None,
+    user_context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Everything besides the prompt that influences an agent's output: the
+    agent identity and instructions, the model, the effective model settings
+    (agent defaults merged with request overrides) and the user context.
+
+    Registered agents are keyed by their canonical slug from the
+    precomputed descriptor, so all aliases of an agent share entries.
+    """
+    descriptor = agent_identity.for_agent(agent)
+    if descriptor is not None:
+        effective_settings = dict(descriptor.settings)
+        identity = {"agent": descriptor.slug, "instructions": descriptor.instructions_hash, "model": descriptor.model}
+    else:
+        effective_settings = agent.model_settings.to_json_dict()
+        identity = {
+            "agent": agent.name,
+            "instructions": instructions_fingerprint(agent),
+            "model": str(getattr(agent.model, "model", agent.model)),
+        }
+    if settings:
+        effective_settings.update(settings.model_dump(exclude_none=True))
+    return {**identity, "settings": effective_settings, "context": user_context or {}}
+
+
+def build_cache_key(
+    agent: Agent,
+    prompt: str,
+    settings: Optional[ModelSettingsSchema] = None,
+    user_context: Optional[Dict[str, Any]] = None
+) -> str:
+    """Build a cache key from the agent scope (see scope_payload) and the normalized prompt."""
+    payload = scope_payload(agent, settings, user_context)
+    payload["prompt"] = normalize_prompt(prompt)
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def build_tool_cache_key(slug: str, input_data: str) -> str:
+    """Cache key for a deterministic tool result: the tool and its exact input."""
+    digest = hashlib.sha256(input_data.encode()).hexdigest()
+    return f"tool:{slug}:{digest}"
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with hit/miss accounting.
+    The local tier is always consulted first; the shared tier is optional.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        shared: Optional[CacheBackend] = None,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.local = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def set_shared_backend(self, backend: Optional[CacheBackend]) -> None:
+        """Attach (or detach with None) the shared cache tier."""
+        self.shared = backend
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        cached = self.local.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(key)
+            except Exception:
+                # The shared tier is best-effort; never fail a request on it
+                raw = None
+            if raw is not None:
+                cached = CachedResponse.from_json(raw)
+                self.local.set(key, cached)
+                self.hits += 1
+                self.shared_hits += 1
+                return cached
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: CachedResponse) -> None:
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value.to_json(), self.ttl)
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the metrics endpoint."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    max_entries=app_settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=app_settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=app_settings.RESPONSE_CACHE_ENABLED
+)
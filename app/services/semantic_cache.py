@@ -0,0 +1,227 @@
+"""
+Semantic Cache Service
+Near-duplicate tier behind the exact-match response cache: prompts are
+embedded locally as hashed character n-gram vectors and looked up by cosine
+similarity in a bounded NumPy index per agent scope, so trivially different
+inputs ("i has a apple" / "I has a apple.") reuse one upstream answer.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from agents import Agent
+
+from app.core.config import settings as app_settings
+from app.schemas import ModelSettingsSchema
+from app.services.response_cache import CachedResponse, normalize_prompt, scope_payload
+
+
+NGRAMS = (3, 4, 5)
+_MIX1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX2 = np.uint64(0x94d049bb133111eb)
+_BYTE_SHIFTS = {n: np.arange(n, dtype=np.uint64) * np.uint64(8) for n in NGRAMS}
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """
+    Unit-length feature-hashing embedding of a text's character 3/4/5-grams.
+    
+    Case and whitespace are ignored. Hashing is deterministic across
+    processes (no Python hash randomization), so workers agree on vectors.
+    """
+    folded = " ".join(normalize_prompt(text).lower().split())
+    data = np.frombuffer(f" {folded} ".encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+    keys = [
+        (sliding_window_view(data, n) << _BYTE_SHIFTS[n]).sum(axis=1, dtype=np.uint64) ^ (np.uint64(n) << np.uint64(56))
+        for n in NGRAMS if data.size >= n
+    ]
+    vector = np.zeros(dim, dtype=np.float32)
+    if not keys:
+        return vector
+    # splitmix64 finalizer: n-gram bytes -> well-mixed 64-bit hash
+    hashes = np.concatenate(keys)
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * _MIX1
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * _MIX2
+    hashes ^= hashes >> np.uint64(31)
+    signs = np.where(hashes & np.uint64(1), 1.0, -1.0)
+    vector[:] = np.bincount((hashes >> np.uint64(1)) % np.uint64(dim), weights=signs, minlength=dim)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticIndex:
+    """
+    Bounded vector index for one agent scope.
+    
+    Vectors live in one contiguous float32 matrix that grows up to
+    `capacity` rows; a lookup is a single matrix-vector product, which at
+    these sizes is faster than an approximate index and exact. When full,
+    an expired entry or else the least recently used one is replaced.
+    """
+    
+    INITIAL_ROWS = 64
+    
+    def __init__(self, dim: int, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        rows = min(self.INITIAL_ROWS, capacity)
+        self.vectors = np.zeros((rows, dim), dtype=np.float32)
+        self.expires = np.zeros(rows, dtype=np.float64)
+        self.used = np.zeros(rows, dtype=np.float64)
+        self.values: List[Optional[CachedResponse]] = [None] * rows
+        self.size = 0
+    
+    def search(self, vector: np.ndarray, now: float) -> Tuple[int, float]:
+        """Most similar live entry as (slot, cosine similarity); (-1, -1.0) when empty."""
+        if not self.size:
+            return -1, -1.0
+        scores = self.vectors[:self.size] @ vector
+        scores[self.expires[:self.size] < now] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+    
+    def get(self, slot: int, now: float) -> CachedResponse:
+        self.used[slot] = now
+        return self.values[slot]
+    
+    def add(self, vector: np.ndarray, value: CachedResponse, now: float, replace: int = -1) -> None:
+        """Store an entry, overwriting `replace` (a near-identical slot) if given."""
+        slot = replace if replace >= 0 else self._free_slot(now)
+        self.vectors[slot] = vector
+        self.expires[slot] = now + self.ttl
+        self.used[slot] = now
+        self.values[slot] = value
+    
+    def _free_slot(self, now: float) -> int:
+        if self.size < self.capacity:
+            if self.size == len(self.values):
+                self._grow(min(self.capacity, 2 * self.size))
+            self.size += 1
+            return self.size - 1
+        expired = np.flatnonzero(self.expires < now)
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self.used))
+    
+    def _grow(self, rows: int) -> None:
+        extra = rows - len(self.values)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, self.vectors.shape[1]), dtype=np.float32)])
+        self.expires = np.concatenate([self.expires, np.zeros(extra)])
+        self.used = np.concatenate([self.used, np.zeros(extra)])
+        self.values.extend([None] * extra)
+    
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.expires.nbytes + self.used.nbytes
+
+
+def build_scope_key(
+    agent: Agent,
+    settings: Optional[ModelSettingsSchema] = None,
+    user_context: Optional[Dict[str, Any]] = None
+) -> str:
+    """Key of everything except the prompt that influences an agent's output (one index each)."""
+    raw = json.dumps(scope_payload(agent, settings, user_context), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class SemanticCache:
+    """
+    Per-scope semantic indexes with hit/miss accounting.
+    
+    Scopes (agent, model settings, user context) are kept in LRU order and
+    bounded by `max_indexes`, each index by `max_entries`, so memory stays
+    below max_indexes * max_entries * dim * 4 bytes plus the cached texts.
+    Prompts longer than `max_prompt_chars` bypass the tier: in long inputs a
+    one-word edit barely moves the vector but changes the correct answer.
+    """
+    
+    def __init__(
+        self,
+        dim: int,
+        max_entries: int,
+        max_indexes: int,
+        ttl: float,
+        max_prompt_chars: int,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.dim = dim
+        self.max_entries = max_entries
+        self.max_indexes = max_indexes
+        self.ttl = ttl
+        self.max_prompt_chars = max_prompt_chars
+        self._indexes: "OrderedDict[str, SemanticIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+    
+    def applies(self, prompt: str) -> bool:
+        if len(prompt) > self.max_prompt_chars:
+            self.skipped += 1
+            return False
+        return True
+    
+    def get(self, scope: str, prompt: str, threshold: float) -> Optional[Tuple[CachedResponse, float]]:
+        """
+        Cached response of the most similar earlier prompt in `scope`.
+        
+        Returns:
+            (response, similarity) when the similarity reaches `threshold`, else None
+        """
+        index = self._indexes.get(scope)
+        if index is None:
+            self.misses += 1
+            return None
+        self._indexes.move_to_end(scope)
+        now = time.monotonic()
+        slot, score = index.search(embed(prompt, self.dim), now)
+        if slot < 0 or score < threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return index.get(slot, now), score
+    
+    def set(self, scope: str, prompt: str, value: CachedResponse) -> None:
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = SemanticIndex(self.dim, self.max_entries, self.ttl)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(scope)
+        now = time.monotonic()
+        vector = embed(prompt, self.dim)
+        # A near-identical prompt refreshes its entry instead of taking a second slot
+        slot, score = index.search(vector, now)
+        index.add(vector, value, now, replace=slot if score >= 0.999 else -1)
+    
+    def clear(self) -> None:
+        self._indexes.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "indexes": len(self._indexes),
+            "entries": sum(index.size for index in self._indexes.values()),
+            "bytes": sum(index.nbytes for index in self._indexes.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCache(
+    dim=app_settings.SEMANTIC_CACHE_DIM,
+    max_entries=app_settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT,
+    max_indexes=app_settings.SEMANTIC_CACHE_MAX_INDEXES,
+    ttl=app_settings.SEMANTIC_CACHE_TTL_SECONDS,
+    max_prompt_chars=app_settings.SEMANTIC_CACHE_MAX_PROMPT_CHARS,
+    enabled=app_settings.SEMANTIC_CACHE_ENABLED
+)
@@ -0,0 +1,172 @@
+"""
+Tool Executor Service
+Runs deterministic tools inline for small inputs and on a thread or process
+pool for large ones, so CPU-heavy tools never stall the event loop.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterator
+
+from app.core.config import settings as app_settings, ToolPolicySettings
+
+
+POOLS = ("thread", "process")
+
+
+class ToolExecutorBusyError(Exception):
+    """Raised when too many tool calls are already waiting for a worker."""
+    
+    def __init__(self, max_pending: int):
+        self.message = f"Tool workers are busy ({max_pending} calls pending), please retry shortly"
+        super().__init__(self.message)
+
+
+class ToolExecutor:
+    """
+    Size-based router for deterministic tool calls.
+    
+    Inputs up to a tool's `inline_max_chars` run directly on the event loop,
+    where a pool hand-off would cost more than the call itself. Larger inputs
+    go to the tool's pool. Thread pools suit tools that release the GIL or
+    do I/O; process pools suit pure-Python CPU work (the tool function must
+    be importable at module level). At most `max_pending` offloaded calls
+    may be queued or running; further calls are rejected.
+    """
+    
+    def __init__(
+        self,
+        thread_workers: int,
+        process_workers: int,
+        max_pending: int,
+        inline_max_chars: int,
+        policies: Dict[str, ToolPolicySettings]
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_pending = max_pending
+        self.inline_max_chars = inline_max_chars
+        self.policies = policies
+        self._pools: Dict[str, Executor] = {}
+        self.pending = 0
+        self.calls = {"inline": 0, "thread": 0, "process": 0}
+        self.rejected = 0
+    
+    async def run(
+        self,
+        slug: str,
+        fn: Callable[[str], Any],
+        input_data: str,
+        default_policy: Optional[ToolPolicySettings] = None
+    ) -> Any:
+        """
+        Run a tool with the execution mode chosen for its input size.
+        
+        Args:
+            slug: Tool identifier, used to look up its policy
+            fn: The tool function
+            input_data: Tool input
+            default_policy: The tool's own policy (from its registry
+                metadata), used when TOOL_POLICIES has no entry for it
+        
+        Raises:
+            ToolExecutorBusyError: If the offload queue is full
+        """
+        mode = self.mode_for(slug, input_data, default_policy)
+        if mode == "inline":
+            self.calls["inline"] += 1
+            return fn(input_data)
+        
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ToolExecutorBusyError(self.max_pending)
+        self.pending += 1
+        self.calls[mode] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(mode), fn, input_data)
+        finally:
+            self.pending -= 1
+    
+    async def stream(
+        self,
+        slug: str,
+        streamer: Callable[[str], Iterator[str]],
+        input_data: str,
+        default_policy: Optional[ToolPolicySettings] = None
+    ) -> AsyncIterator[str]:
+        """
+        Drive a tool's chunk iterator, yielding chunks as they are ready.
+        
+        Large inputs advance the iterator on the thread pool (an iterator
+        cannot cross a process boundary), holding one `max_pending` slot for
+        the whole stream.
+        
+        Raises:
+            ToolExecutorBusyError: If the offload queue is full
+        """
+        if self.mode_for(slug, input_data, default_policy) == "inline":
+            self.calls["inline"] += 1
+            for chunk in streamer(input_data):
+                yield chunk
+            return
+        
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ToolExecutorBusyError(self.max_pending)
+        self.pending += 1
+        self.calls["thread"] += 1
+        loop = asyncio.get_running_loop()
+        pool = self._pool("thread")
+        try:
+            chunks = await loop.run_in_executor(pool, streamer, input_data)
+            while (chunk := await loop.run_in_executor(pool, next, chunks, None)) is not None:
+                yield chunk
+        finally:
+            self.pending -= 1
+    
+    def mode_for(self, slug: str, input_data: str, default_policy: Optional[ToolPolicySettings] = None) -> str:
+        """Return "inline", "thread" or "process" for this call."""
+        policy = self.policies.get(slug, default_policy)
+        pool = policy.pool if policy and policy.pool in POOLS else "thread"
+        threshold = self.inline_max_chars
+        if policy and policy.inline_max_chars is not None:
+            threshold = policy.inline_max_chars
+        return "inline" if len(input_data) <= threshold else pool
+    
+    def shutdown(self) -> None:
+        """Stop the worker pools; running calls finish, queued ones are cancelled."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = {}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "calls": dict(self.calls),
+            "rejected": self.rejected,
+        }
+    
+    def _pool(self, mode: str) -> Executor:
+        pool = self._pools.get(mode)
+        if pool is None:
+            if mode == "process":
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="tool")
+            self._pools[mode] = pool
+        return pool
+
+
+# Global tool executor
+tool_executor = ToolExecutor(
+    thread_workers=app_settings.TOOL_THREAD_WORKERS,
+    process_workers=app_settings.TOOL_PROCESS_WORKERS,
+    max_pending=app_settings.TOOL_MAX_PENDING,
+    inline_max_chars=app_settings.TOOL_INLINE_MAX_CHARS,
+    policies=app_settings.TOOL_POLICIES
+)
@@ -0,0 +1,182 @@
+"""
+Tool Registry Service
+Plugin registry for deterministic tools. Tools register with the `tool`
+decorator in a plugin module or through the `webtool_platform.tools` entry
+point group; modules are imported on first lookup and heavy engines (indexes,
+formatters) are only initialized on first use or by `warmup()`.
+"""
+import logging
+import threading
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Optional, Dict, Any, List, Callable, Iterator
+
+from app.core.config import settings as app_settings, ToolPolicySettings
+
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "webtool_platform.tools"
+LANES = ("thread", "process")
+
+
+class ToolSpec:
+    """
+    A registered tool and its execution metadata.
+    
+    Attributes:
+        slug: URL identifier
+        fn: The tool, fn(input_data) -> str; must be a module-level function
+            for the process lane
+        description: One-line summary for listings
+        cpu_bound: CPU-heavy tools are offloaded above the inline threshold;
+            other tools always run on the event loop
+        cacheable: Results may be served from the response cache
+        max_input_chars: Input limit (defaults to TOOL_INPUT_MAX_CHARS)
+        lane: Worker pool for offloaded calls, "thread" or "process"
+        streamer: Optional chunked variant, fn(input_data) -> Iterator[str]
+        warmup: Optional callable that initializes the tool's engine
+    """
+    
+    __slots__ = ("slug", "fn", "description", "cpu_bound", "cacheable", "max_input_chars", "lane", "streamer", "warmup")
+    
+    def __init__(
+        self,
+        slug: str,
+        fn: Callable[[str], str],
+        description: str = "",
+        cpu_bound: bool = True,
+        cacheable: bool = False,
+        max_input_chars: Optional[int] = None,
+        lane: str = "thread",
+        warmup: Optional[Callable[[], Any]] = None
+    ):
+        if lane not in LANES:
+            raise ValueError(f"Unknown executor lane '{lane}' for tool '{slug}', use one of {LANES}")
+        self.slug = slug
+        self.fn = fn
+        self.description = description
+        self.cpu_bound = cpu_bound
+        self.cacheable = cacheable
+        self.max_input_chars = max_input_chars or app_settings.TOOL_INPUT_MAX_CHARS
+        self.lane = lane
+        self.streamer: Optional[Callable[[str], Iterator[str]]] = None
+        self.warmup = warmup
+    
+    def policy(self) -> ToolPolicySettings:
+        """Default executor policy; TOOL_POLICIES entries take precedence."""
+        if not self.cpu_bound:
+            return ToolPolicySettings(pool=self.lane, inline_max_chars=self.max_input_chars)
+        return ToolPolicySettings(pool=self.lane)
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "slug": self.slug,
+            "description": self.description,
+            "cpu_bound": self.cpu_bound,
+            "cacheable": self.cacheable,
+            "max_input_chars": self.max_input_chars,
+            "lane": self.lane,
+            "streaming": self.streamer is not None,
+        }
+
+
+class ToolRegistry:
+    """
+    Slug -> ToolSpec registry, filled lazily.
+    
+    Plugin modules (`modules`, then entry points) are imported the first
+    time a tool is looked up or listed. An entry point may name a module,
+    which registers its tools on import, or a callable taking the registry.
+    """
+    
+    def __init__(self, modules: List[str], entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        self.modules = list(modules)
+        self.entry_point_group = entry_point_group
+        self._tools: Dict[str, ToolSpec] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.warmed: Dict[str, bool] = {}
+    
+    def tool(self, slug: str, **metadata: Any) -> Callable[[Callable[[str], str]], Callable[[str], str]]:
+        """
+        Decorator registering a tool function under `slug`.
+        
+        Args:
+            slug: URL identifier
+            **metadata: ToolSpec fields (description, cpu_bound, cacheable,
+                max_input_chars, lane, warmup)
+        
+        Returns:
+            The decorator; the function itself is returned unchanged
+        """
+        def register(fn: Callable[[str], str]) -> Callable[[str], str]:
+            if slug in self._tools and self._tools[slug].fn is not fn:
+                raise ValueError(f"Tool '{slug}' is already registered")
+            self._tools[slug] = ToolSpec(slug, fn, **metadata)
+            return fn
+        return register
+    
+    def streamer(self, slug: str) -> Callable[[Callable[[str], Iterator[str]]], Callable[[str], Iterator[str]]]:
+        """Decorator attaching a chunked variant to an already registered tool."""
+        def register(fn: Callable[[str], Iterator[str]]) -> Callable[[str], Iterator[str]]:
+            self._tools[slug].streamer = fn
+            return fn
+        return register
+    
+    def load(self) -> None:
+        """Import plugin modules and entry points (once)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for module in self.modules:
+                import_module(module)
+            if self.entry_point_group:
+                for entry_point in entry_points(group=self.entry_point_group):
+                    try:
+                        plugin = entry_point.load()
+                        if callable(plugin):
+                            plugin(self)
+                    except Exception:
+                        logger.exception("Failed to load tool plugin %s", entry_point.name)
+            self._loaded = True
+    
+    def get(self, slug: str) -> Optional[ToolSpec]:
+        self.load()
+        return self._tools.get(slug)
+    
+    def slugs(self) -> List[str]:
+        self.load()
+        return list(self._tools)
+    
+    def specs(self) -> List[ToolSpec]:
+        self.load()
+        return list(self._tools.values())
+    
+    def warmup(self, slugs: Optional[List[str]] = None) -> Dict[str, bool]:
+        """
+        Initialize tool engines ahead of the first request.
+        
+        Args:
+            slugs: Tools to warm (default: all with a warmup hook)
+        
+        Returns:
+            Slug -> whether its warmup succeeded
+        """
+        for spec in self.specs():
+            if spec.warmup is None or (slugs is not None and spec.slug not in slugs):
+                continue
+            try:
+                spec.warmup()
+                self.warmed[spec.slug] = True
+            except Exception:
+                logger.exception("Warmup of tool %s failed", spec.slug)
+                self.warmed[spec.slug] = False
+        return dict(self.warmed)
+
+
+# Global tool registry: built-in tools plus TOOL_PLUGIN_MODULES
+tool_registry = ToolRegistry(["app.services.builtin_tools", *app_settings.TOOL_PLUGIN_MODULES])
+tool = tool_registry.tool
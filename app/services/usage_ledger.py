@@ -0,0 +1,341 @@
+"""
+Usage Ledger Service
+Per-client token accounting with rolling minute/hour/day windows, quota
+enforcement before upstream calls, and batched persistence to SQLite.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.core.config import settings as app_settings, UsageQuotaSettings, resolve_workers
+from app.schemas import UsageInfo
+
+
+# Rolling windows and their length in seconds
+WINDOWS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# (client_id, slug, minute) -> [requests, prompt_tokens, completion_tokens]
+PendingRows = Dict[Tuple[str, str, int], List[int]]
+
+
+class QuotaExceededError(Exception):
+    """Raised when a client has used up its token quota for a window."""
+    
+    def __init__(self, window: str, limit: int, retry_after: float):
+        self.window = window
+        self.limit = limit
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.message = f"Token quota exceeded ({limit} tokens per {window}), retry in {self.retry_after}s"
+        super().__init__(self.message)
+
+
+class SlidingWindowCounter:
+    """
+    Rolling-window total in O(1) memory: the previous fixed window is weighted
+    by how much of it still overlaps the rolling window.
+    """
+    
+    __slots__ = ("period", "index", "current", "previous")
+    
+    def __init__(self, period: int):
+        self.period = period
+        self.index = 0
+        self.current = 0
+        self.previous = 0
+    
+    def _roll(self, now: float) -> None:
+        index = int(now // self.period)
+        if index != self.index:
+            self.previous = self.current if index == self.index + 1 else 0
+            self.current = 0
+            self.index = index
+    
+    def add(self, amount: int, now: float) -> None:
+        self._roll(now)
+        self.current += amount
+    
+    def total(self, now: float) -> float:
+        self._roll(now)
+        elapsed = (now % self.period) / self.period
+        return self.previous * (1 - elapsed) + self.current
+    
+    def seconds_to_reset(self, now: float) -> float:
+        return self.period - now % self.period
+
+
+class ClientUsage:
+    """Rolling token windows and lifetime totals for one client."""
+    
+    __slots__ = ("windows", "requests", "prompt_tokens", "completion_tokens", "reserved", "last_seen")
+    
+    def __init__(self):
+        self.windows = {name: SlidingWindowCounter(period) for name, period in WINDOWS.items()}
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reserved = 0  # Estimated tokens of requests still running
+        self.last_seen = 0.0
+
+
+class SQLiteUsageStore:
+    """Per-minute usage aggregates in a SQLite file; blocking I/O runs in a thread."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection of the current process: SQLite handles must not be shared across a fork."""
+        if self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "client_id TEXT NOT NULL, slug TEXT NOT NULL, minute INTEGER NOT NULL, "
+            "requests INTEGER NOT NULL, prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+            "PRIMARY KEY (client_id, slug, minute))"
+        )
+        conn.commit()
+        return conn
+    
+    async def write(self, rows: PendingRows) -> None:
+        await asyncio.to_thread(self._write, rows)
+    
+    def _write(self, rows: PendingRows) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO usage (client_id, slug, minute, requests, prompt_tokens, completion_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (client_id, slug, minute) DO UPDATE SET "
+                "requests = requests + excluded.requests, "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens",
+                [(client, slug, minute, *counts) for (client, slug, minute), counts in rows.items()]
+            )
+            self._conn.commit()
+
+
+class UsageLedger:
+    """
+    In-memory usage ledger. Quota checks and recording are dict lookups on
+    the event loop; aggregates are flushed to the store by a background task
+    every `flush_interval` seconds instead of once per request.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[SQLiteUsageStore],
+        flush_interval: float,
+        default_quota: UsageQuotaSettings,
+        client_quotas: Dict[str, UsageQuotaSettings],
+        enabled: bool = True
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.default_quota = default_quota
+        self.client_quotas = client_quotas
+        self.enabled = enabled
+        self._clients: Dict[str, ClientUsage] = {}
+        self._pending: PendingRows = {}
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self.rejected = 0
+        self.flushes = 0
+        self.flush_errors = 0
+    
+    def check(self, client_id: str, estimated_tokens: int = 0) -> int:
+        """
+        Verify the client is within every configured window quota and reserve
+        the request's estimated tokens until it is settled by `record` (or
+        `release` on failure), so concurrent requests, batches and queued
+        jobs count against the quota before their usage is known.
+        
+        Returns:
+            Tokens reserved, to pass to `record` or `release`
+        
+        Raises:
+            QuotaExceededError: If a window's token total plus the tokens
+                reserved by running requests has reached its limit
+        """
+        if not self.enabled:
+            return 0
+        limits = self._limits(client_id)
+        if not limits:
+            return 0
+        client = self._client(client_id)
+        now = time.time()
+        for window, limit in limits.items():
+            counter = client.windows[window]
+            if counter.total(now) + client.reserved >= limit:
+                self.rejected += 1
+                raise QuotaExceededError(window, limit, counter.seconds_to_reset(now))
+        client.reserved += estimated_tokens
+        client.last_seen = now
+        return estimated_tokens
+    
+    def release(self, client_id: str, reserved: int) -> None:
+        """Drop the reservation of a request that failed before reporting usage."""
+        client = self._clients.get(client_id)
+        if client is not None and reserved:
+            client.reserved = max(0, client.reserved - reserved)
+    
+    def record(self, client_id: str, slug: str, usage: Optional[UsageInfo], reserved: int = 0) -> None:
+        """Account one completed agent request (usage is None for cache hits), settling its reservation."""
+        if not self.enabled:
+            return
+        self.release(client_id, reserved)
+        now = time.time()
+        prompt_tokens = (usage.prompt_tokens or 0) if usage else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage else 0
+        
+        client = self._client(client_id)
+        client.requests += 1
+        client.prompt_tokens += prompt_tokens
+        client.completion_tokens += completion_tokens
+        client.last_seen = now
+        for counter in client.windows.values():
+            counter.add(prompt_tokens + completion_tokens, now)
+        
+        if self.store is not None:
+            key = (client_id, slug, int(now // 60) * 60)
+            row = self._pending.get(key)
+            if row is None:
+                self._pending[key] = [1, prompt_tokens, completion_tokens]
+            else:
+                row[0] += 1
+                row[1] += prompt_tokens
+                row[2] += completion_tokens
+        self._ensure_flusher()
+    
+    def usage(self, client_id: str) -> Dict[str, Any]:
+        """Rolling window totals and limits for one client."""
+        client = self._clients.get(client_id) or ClientUsage()
+        limits = self._limits(client_id)
+        now = time.time()
+        return {
+            "client_id": client_id,
+            "requests": client.requests,
+            "prompt_tokens": client.prompt_tokens,
+            "completion_tokens": client.completion_tokens,
+            "reserved_tokens": client.reserved,
+            "windows": {
+                window: {"tokens": int(counter.total(now)), "limit": limits.get(window)}
+                for window, counter in client.windows.items()
+            },
+        }
+    
+    async def flush(self) -> int:
+        """Write pending aggregates to the store. Returns the number of rows written."""
+        if self.store is None or not self._pending:
+            return 0
+        rows, self._pending = self._pending, {}
+        try:
+            await self.store.write(rows)
+        except Exception:
+            # Keep the aggregates for the next flush
+            self.flush_errors += 1
+            for key, counts in rows.items():
+                row = self._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(counts):
+                    row[i] += value
+            raise
+        self.flushes += 1
+        return len(rows)
+    
+    async def shutdown(self) -> None:
+        """Stop the background flusher and write what is still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "clients": len(self._clients),
+            "pending_rows": len(self._pending),
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
+    
+    def _client(self, client_id: str) -> ClientUsage:
+        client = self._clients.get(client_id)
+        if client is None:
+            client = self._clients[client_id] = ClientUsage()
+        return client
+    
+    def _limits(self, client_id: str) -> Dict[str, int]:
+        quota = self.client_quotas.get(client_id, self.default_quota)
+        limits = {
+            "minute": quota.tokens_per_minute,
+            "hour": quota.tokens_per_hour,
+            "day": quota.tokens_per_day,
+        }
+        return {window: limit for window, limit in limits.items() if limit}
+    
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_periodically())
+    
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+            self._evict_idle()
+    
+    def _evict_idle(self) -> None:
+        """Forget clients with no activity for longer than the largest window."""
+        cutoff = time.time() - 2 * max(WINDOWS.values())
+        idle = [
+            client_id for client_id, client in self._clients.items()
+            if client.last_seen < cutoff and not client.reserved
+        ]
+        for client_id in idle:
+            del self._clients[client_id]
+
+
+def _worker_share(quota: UsageQuotaSettings) -> UsageQuotaSettings:
+    """
+    Per-worker share of a quota. Each server worker tracks usage in memory
+    and sees about 1/N of a client's requests, so it enforces 1/N of the limit.
+    """
+    workers = resolve_workers(app_settings.SERVER_WORKERS)
+    return UsageQuotaSettings(**{
+        window: max(1, limit // workers) if limit else 0
+        for window, limit in quota.model_dump().items()
+    })
+
+
+def _create_ledger() -> UsageLedger:
+    store = SQLiteUsageStore(app_settings.USAGE_STORE_PATH) if app_settings.USAGE_STORE == "sqlite" else None
+    return UsageLedger(
+        store=store,
+        flush_interval=app_settings.USAGE_FLUSH_INTERVAL_SECONDS,
+        default_quota=_worker_share(UsageQuotaSettings(
+            tokens_per_minute=app_settings.USAGE_QUOTA_TOKENS_PER_MINUTE,
+            tokens_per_hour=app_settings.USAGE_QUOTA_TOKENS_PER_HOUR,
+            tokens_per_day=app_settings.USAGE_QUOTA_TOKENS_PER_DAY
+        )),
+        client_quotas={client: _worker_share(quota) for client, quota in app_settings.USAGE_CLIENT_QUOTAS.items()},
+        enabled=app_settings.USAGE_LEDGER_ENABLED
+    )
+
+
+# Global usage ledger
+usage_ledger = _create_ledger()
@@ -0,0 +1,189 @@
+"""
+Warmup Service
+Moves cold-start work off the request path: opens upstream connections,
+preloads agents, agent variants and tool engines at startup, and backs the
+liveness/readiness probes.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+import httpx
+
+from app.core.config import settings as app_settings
+from app.services.provider_pool import Provider, provider_pool
+
+
+logger = logging.getLogger(__name__)
+
+STEPS = ("agents", "variants", "tools", "http_pool")
+
+
+class Warmup:
+    """
+    Startup warmup with per-step status, plus cached upstream probes.
+    
+    Steps run in order; a failing step is logged and recorded but does not
+    stop the others, since every step only front-loads work that would
+    otherwise happen lazily on the first request.
+    """
+    
+    def __init__(self):
+        self.steps: Dict[str, str] = {step: "pending" for step in STEPS}
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._probes: List[Dict[str, Any]] = []
+        self._probed_at = 0.0
+        self._probe_lock = asyncio.Lock()
+    
+    @property
+    def done(self) -> bool:
+        return all(status in ("ok", "failed", "skipped") for status in self.steps.values())
+    
+    def start(self) -> None:
+        """Run the warmup in the background so the liveness probe answers at once."""
+        if not app_settings.WARMUP_ENABLED:
+            self.steps = {step: "skipped" for step in STEPS}
+            return
+        self._task = asyncio.create_task(self.run())
+    
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+    
+    async def run(self) -> None:
+        self.started_at = time.monotonic()
+        for step, coroutine in (
+            ("agents", self._warm_agents),
+            ("variants", self._warm_variants),
+            ("tools", self._warm_tools),
+            ("http_pool", self._warm_http_pool),
+        ):
+            self.steps[step] = "running"
+            try:
+                await coroutine()
+                self.steps[step] = "ok"
+            except Exception:
+                logger.exception("Warmup step %s failed", step)
+                self.steps[step] = "failed"
+        self.duration = time.monotonic() - self.started_at
+        logger.info("Warmup finished in %.2fs: %s", self.duration, self.steps)
+    
+    async def _warm_agents(self) -> None:
+        """Import the agent definitions (and the shared model client)."""
+        from app.api.v1.agents.registry import get_all_agent_descriptors
+        await asyncio.to_thread(get_all_agent_descriptors)
+    
+    async def _warm_variants(self) -> None:
+        """Pre-build agent clones for the WARMUP_AGENT_VARIANTS settings overrides."""
+        from app.api.v1.agents.registry import get_all_agent_descriptors
+        from app.schemas import ModelSettingsSchema
+        from app.services.agent_variants import agent_variants
+        
+        overrides = [ModelSettingsSchema(**variant) for variant in app_settings.WARMUP_AGENT_VARIANTS]
+        for descriptor in get_all_agent_descriptors():
+            for variant in overrides:
+                agent_variants.resolve(descriptor.agent, variant)
+    
+    async def _warm_tools(self) -> None:
+        """Load tool engines and indexes (mmap'd indexes, formatter, NumPy)."""
+        from app.services.tool_registry import tool_registry
+        await asyncio.to_thread(tool_registry.warmup)
+    
+    async def _warm_http_pool(self) -> None:
+        """Open WARMUP_HTTP_CONNECTIONS keep-alive connections to every provider."""
+        for provider in provider_pool.providers:
+            probes = await asyncio.gather(*(
+                self._probe(provider) for _ in range(app_settings.WARMUP_HTTP_CONNECTIONS)
+            ))
+            if not any(probe["reachable"] for probe in probes):
+                raise ConnectionError(f"Provider {provider.name} is unreachable: {probes[0]['error']}")
+            self._store_probes([probes[0]])
+    
+    async def _probe(self, provider: Provider) -> Dict[str, Any]:
+        """
+        One unauthenticated request to the provider's base URL through its own
+        HTTP pool. Any HTTP response, even 4xx, proves the endpoint is reachable.
+        """
+        started = time.perf_counter()
+        try:
+            response = await provider.http_client.get(
+                str(provider.client.base_url),
+                timeout=app_settings.READINESS_UPSTREAM_TIMEOUT_SECONDS
+            )
+            return {
+                "provider": provider.name,
+                "reachable": True,
+                "status_code": response.status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        except httpx.HTTPError as e:
+            return {"provider": provider.name, "reachable": False, "error": type(e).__name__}
+    
+    def _store_probes(self, probes: List[Dict[str, Any]]) -> None:
+        self._probes = probes
+        self._probed_at = time.monotonic()
+    
+    async def upstream(self) -> List[Dict[str, Any]]:
+        """Reachability of every provider, re-probed at most every READINESS_CACHE_SECONDS."""
+        async with self._probe_lock:
+            if time.monotonic() - self._probed_at >= app_settings.READINESS_CACHE_SECONDS \
+                    or len(self._probes) != len(provider_pool.providers):
+                self._store_probes(list(await asyncio.gather(*map(self._probe, provider_pool.providers))))
+            return self._probes
+    
+    async def readiness(self) -> Dict[str, Any]:
+        """
+        Readiness report: ready once warmup has finished and (with
+        READINESS_CHECK_UPSTREAM) at least one provider is reachable. The
+        size of the plagiarism reference index is reported once the tools
+        are loaded; an empty index does not affect readiness.
+        """
+        report: Dict[str, Any] = {
+            "warmup": {
+                "steps": dict(self.steps),
+                "seconds": round(self.duration, 3) if self.duration is not None else None,
+            },
+        }
+        if self.steps["tools"] == "ok":
+            from app.services.plagiarism import index_status
+            report["plagiarism_index"] = index_status()
+        ready = self.done
+        if app_settings.READINESS_CHECK_UPSTREAM:
+            report["upstream"] = await self.upstream()
+            ready = ready and any(probe["reachable"] for probe in report["upstream"])
+        report["status"] = "ready" if ready else ("unavailable" if self.done else "warming")
+        return report
+
+
+# Global warmup state
+warmup = Warmup()
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncIterator[None]:
+    """
+    Application lifespan: start the warmup and cross-worker metrics sync,
+    and on shutdown persist pending usage aggregates and stop tool worker
+    pools.
+    """
+    from app.services.usage_ledger import usage_ledger
+    from app.services.tool_executor import tool_executor
+    from app.services.metrics import multiprocess_metrics
+    
+    warmup.start()
+    multiprocess_metrics.start()
+    try:
+        yield
+    finally:
+        await warmup.stop()
+        await usage_ledger.shutdown()
+        tool_executor.shutdown()
+        await multiprocess_metrics.stop()
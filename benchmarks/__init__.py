@@ -0,0 +1,10 @@
+"""
+Performance Benchmarks
+Reproducible load tests and micro-benchmarks against a local mock of the
+Gemini OpenAI-compatible API, reporting machine-readable JSON.
+
+    python -m benchmarks.mock_server              # stand-alone mock upstream
+    python -m benchmarks.load --scenario all      # load scenarios (spawns mock + app)
+    python -m benchmarks.micro                    # AgentExecutor.execute overhead
+    python -m benchmarks.report compare a.json b.json
+"""
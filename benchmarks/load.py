@@ -0,0 +1,378 @@
+"""
+Load Scenarios
+Closed- and open-loop load against /api/v1/agents/process/{slug} with mixed
+agents and deterministic tools. Reports throughput, latency and (for
+streaming) time-to-first-event percentiles as JSON.
+
+    python -m benchmarks.load --scenario all --output results.json
+    python -m benchmarks.load --scenario agents-open --rate 200 --duration 30 --workers 4
+    python -m benchmarks.load --target http://127.0.0.1:8000 --scenario tools-closed
+
+Without --target, a mock Gemini server and the app (python -m app.server) are
+started as subprocesses, the app pointed at the mock.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, asdict, replace
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+from benchmarks.mock_server import add_config_arguments, config_from_args
+from benchmarks.report import summarize, metadata, write_report
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESS_PATH = "/api/v1/agents/process/{slug}"
+
+AGENT_MIX = {"story-generator": 2, "slogan-generator": 1, "grammar-checker": 2, "email-writer": 1, "faq-generator": 1}
+TOOL_MIX = {"hex-to-rgb": 3, "color-converter": 1, "code-beautifier": 1}
+
+# Inputs for slugs that need a specific format; agents get a generic prompt
+TOOL_INPUTS = {
+    "hex-to-rgb": "#1e90ff, #ff8800, #33aa55",
+    "color-converter": "#1e90ff",
+    "code-beautifier": "def f(a,b):\n  if a>b:\n        return a\n  return b\n" * 5,
+    "domain-checker": "acme, brightpath",
+    "plagiarism-checker": "The quick brown fox jumps over the lazy dog. " * 10,
+}
+AGENT_PROMPT = "Write a short piece about a lighthouse keeper"
+
+
+@dataclass
+class Scenario:
+    """
+    One load pattern.
+    
+    Attributes:
+        mode: "closed" (fixed number of users sending back to back) or
+            "open" (Poisson arrivals at `rate`, independent of responses)
+        slugs: Slug -> relative weight of the request mix
+        concurrency: Users of a closed-loop scenario
+        rate: Arrivals per second of an open-loop scenario
+        duration: Measured seconds
+        warmup: Seconds of load before measuring starts
+        stream: Use the SSE endpoint and record time to first event
+        unique_prompts: Make every prompt distinct so caches never hit
+    """
+    name: str
+    mode: str
+    slugs: Dict[str, float]
+    concurrency: int = 32
+    rate: float = 50.0
+    duration: float = 20.0
+    warmup: float = 3.0
+    stream: bool = False
+    unique_prompts: bool = True
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("agents-closed", "closed", AGENT_MIX, concurrency=32),
+        Scenario("agents-open", "open", AGENT_MIX, rate=50.0),
+        Scenario("agents-stream", "closed", AGENT_MIX, concurrency=16, stream=True),
+        Scenario("agents-cached", "closed", {"grammar-checker": 1, "spell-checker": 1}, concurrency=32, unique_prompts=False),
+        Scenario("tools-closed", "closed", TOOL_MIX, concurrency=32),
+        Scenario("mixed-open", "open", {**AGENT_MIX, **TOOL_MIX}, rate=100.0),
+    )
+}
+
+
+@dataclass
+class Sample:
+    slug: str
+    started: float
+    latency: float
+    status: int
+    ttft: Optional[float] = None
+
+
+@dataclass
+class Recorder:
+    """Samples of requests started inside the measured window."""
+    measure_from: float
+    samples: List[Sample] = field(default_factory=list)
+    
+    def add(self, sample: Sample) -> None:
+        if sample.started >= self.measure_from:
+            self.samples.append(sample)
+
+
+def _prompt(slug: str, number: int, unique: bool) -> str:
+    text = TOOL_INPUTS.get(slug, AGENT_PROMPT)
+    if unique and slug not in TOOL_INPUTS:
+        return f"{text} (#{number})"
+    return text
+
+
+async def _request(client: httpx.AsyncClient, slug: str, prompt: str, stream: bool, scheduled: float) -> Sample:
+    """
+    One request. Latency is measured from `scheduled`, so for open-loop load
+    time spent waiting for a client connection counts (no coordinated omission).
+    """
+    path = PROCESS_PATH.format(slug=slug) + ("/stream" if stream else "")
+    ttft = None
+    try:
+        if not stream:
+            response = await client.post(path, json={"prompt": prompt})
+            status = response.status_code
+        else:
+            async with client.stream("POST", path, json={"prompt": prompt}) as response:
+                status = response.status_code
+                async for line in response.aiter_lines():
+                    if not line.startswith("event:"):
+                        continue
+                    if ttft is None:
+                        ttft = time.perf_counter() - scheduled
+                    if line == "event: error":
+                        status = 599
+    except httpx.HTTPError:
+        status = 0
+    return Sample(slug, scheduled, time.perf_counter() - scheduled, status, ttft)
+
+
+def _slug_picker(slugs: Dict[str, float], seed: int):
+    rng = random.Random(seed)
+    names, weights = list(slugs), list(slugs.values())
+    return lambda: rng.choices(names, weights)[0]
+
+
+async def run_closed(client: httpx.AsyncClient, scenario: Scenario, recorder: Recorder, end: float) -> None:
+    counter = itertools.count()
+    
+    async def user(number: int) -> None:
+        pick = _slug_picker(scenario.slugs, number)
+        while time.perf_counter() < end:
+            slug = pick()
+            recorder.add(await _request(
+                client, slug, _prompt(slug, next(counter), scenario.unique_prompts), scenario.stream, time.perf_counter()
+            ))
+    
+    await asyncio.gather(*(user(number) for number in range(scenario.concurrency)))
+
+
+async def run_open(client: httpx.AsyncClient, scenario: Scenario, recorder: Recorder, end: float) -> None:
+    rng = random.Random(0)
+    pick = _slug_picker(scenario.slugs, 0)
+    pending = set()
+    scheduled = time.perf_counter()
+    for number in itertools.count():
+        scheduled += rng.expovariate(scenario.rate)
+        if scheduled >= end:
+            break
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        slug = pick()
+        task = asyncio.ensure_future(
+            _request(client, slug, _prompt(slug, number, scenario.unique_prompts), scenario.stream, scheduled)
+        )
+        task.add_done_callback(lambda t: recorder.add(t.result()))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+
+
+def _summary(samples: List[Sample], seconds: float) -> Dict[str, Any]:
+    ok = [sample for sample in samples if sample.status == 200]
+    ttfts = [sample.ttft for sample in ok if sample.ttft is not None]
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": dict(Counter(str(sample.status) for sample in samples if sample.status != 200)),
+        "throughput_rps": round(len(ok) / seconds, 3) if seconds else 0.0,
+        "latency": summarize(sample.latency for sample in ok),
+        "ttft": summarize(ttfts) if ttfts else None,
+    }
+
+
+async def run_scenario(base_url: str, scenario: Scenario) -> Dict[str, Any]:
+    """Run one scenario and summarize it overall and per slug."""
+    connections = scenario.concurrency if scenario.mode == "closed" else max(64, int(scenario.rate * 4))
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(180.0)) as client:
+        start = time.perf_counter()
+        recorder = Recorder(measure_from=start + scenario.warmup)
+        end = recorder.measure_from + scenario.duration
+        runner = run_closed if scenario.mode == "closed" else run_open
+        await runner(client, scenario, recorder, end)
+        # Closed-loop users may finish their last request after `end`
+        measured = max(end, time.perf_counter()) - recorder.measure_from if scenario.mode == "closed" else scenario.duration
+    
+    by_slug: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in recorder.samples:
+        by_slug[sample.slug].append(sample)
+    return {
+        "scenario": asdict(scenario),
+        **_summary(recorder.samples, measured),
+        "by_slug": {slug: _summary(samples, measured) for slug, samples in sorted(by_slug.items())},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+class Stack:
+    """Mock Gemini server plus the app under test, as subprocesses."""
+    
+    def __init__(self, mock_args: List[str], workers: int, app_env: Dict[str, str]):
+        self.mock_port = _free_port()
+        self.app_port = _free_port()
+        self.mock_args = mock_args
+        self.workers = workers
+        self.app_env = app_env
+        self.workdir = tempfile.TemporaryDirectory(prefix="webtool-bench-")
+        self.processes: List[subprocess.Popen] = []
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.app_port}"
+    
+    @property
+    def mock_url(self) -> str:
+        return f"http://127.0.0.1:{self.mock_port}"
+    
+    def __enter__(self) -> "Stack":
+        env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+        mock = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_server", "--port", str(self.mock_port), *self.mock_args],
+            env=env, cwd=self.workdir.name
+        )
+        self.processes.append(mock)
+        _wait_ready(f"{self.mock_url}/stats", 30, mock)
+        
+        app_env = {
+            **env,
+            "DEBUG": "false",
+            "GEMINI_API_KEY": "mock-key",
+            "GEMINI_BASE_URL": f"{self.mock_url}/v1beta/openai/",
+            "GEMINI_PROVIDERS": "[]",
+            "USAGE_STORE": "memory",
+            "JOB_STORE": "memory",
+            # The production budgets model the real upstream quota; the mock has none
+            "ADMISSION_REQUESTS_PER_MINUTE": "1000000",
+            "ADMISSION_TOKENS_PER_MINUTE": "1000000000",
+            **self.app_env,
+        }
+        # Run from a scratch directory so SQLite files and indexes of the checkout are not touched
+        app = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--app", "main:app", "--port", str(self.app_port), "--workers", str(self.workers)],
+            env=app_env, cwd=self.workdir.name, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.processes.append(app)
+        _wait_ready(f"{self.base_url}/health/ready", 120, app)
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=40)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.workdir.cleanup()
+
+
+def _mock_counts(stack: Optional[Stack]) -> Optional[Dict[str, int]]:
+    if stack is None:
+        return None
+    return httpx.get(f"{stack.mock_url}/stats", timeout=5).json()["counts"]
+
+
+def _apply_overrides(scenario: Scenario, args: argparse.Namespace) -> Scenario:
+    overrides = {
+        name: getattr(args, name)
+        for name in ("concurrency", "rate", "duration", "warmup")
+        if getattr(args, name) is not None
+    }
+    if args.slugs:
+        overrides["slugs"] = {slug: 1.0 for slug in args.slugs.split(",")}
+    if args.stream:
+        overrides["stream"] = True
+    return replace(scenario, **overrides)
+
+
+async def _run_all(base_url: str, scenarios: List[Scenario], stack: Optional[Stack]) -> List[Dict[str, Any]]:
+    results = []
+    for scenario in scenarios:
+        before = _mock_counts(stack)
+        result = await run_scenario(base_url, scenario)
+        after = _mock_counts(stack)
+        if before is not None:
+            result["upstream"] = {key: after[key] - before.get(key, 0) for key in after}
+        print(
+            f"{scenario.name}: {result['throughput_rps']} req/s, p50 {result['latency']['p50_ms']} ms, "
+            f"p99 {result['latency']['p99_ms']} ms, errors {result['errors']}",
+            file=sys.stderr
+        )
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run load scenarios against the API")
+    parser.add_argument("--scenario", default="all", help=f"Comma-separated names or 'all': {', '.join(SCENARIOS)}")
+    parser.add_argument("--target", help="Base URL of a running server (default: start mock + app)")
+    parser.add_argument("--workers", type=int, default=1, help="App workers when starting the app")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting")
+    parser.add_argument("--output", "-o", help="JSON report path (default: stdout)")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--rate", type=float)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--warmup", type=float)
+    parser.add_argument("--slugs", help="Comma-separated slugs replacing the scenario mix")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming endpoint")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    names = list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    scenarios = [_apply_overrides(SCENARIOS[name], args) for name in names]
+    mock_config = config_from_args(args)
+    
+    report: Dict[str, Any] = {"meta": metadata(), "benchmark": "load"}
+    if args.target:
+        report["target"] = args.target
+        report["scenarios"] = asyncio.run(_run_all(args.target, scenarios, None))
+    else:
+        mock_args = list(itertools.chain.from_iterable(
+            (f"--{name.replace('_', '-')}", str(value)) for name, value in asdict(mock_config).items() if value is not None
+        ))
+        app_env = dict(item.split("=", 1) for item in args.app_env)
+        with Stack(mock_args, args.workers, app_env) as stack:
+            report["mock"] = asdict(mock_config)
+            report["app"] = {"workers": args.workers, "env": app_env}
+            report["scenarios"] = asyncio.run(_run_all(stack.base_url, scenarios, stack))
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Executor Micro-benchmarks
+Per-call overhead of AgentExecutor.execute against a zero-latency mock
+upstream, separated from the HTTP transport and the Agents SDK:
+
+    raw_completion   chat completion through the shared Gemini client
+    runner           Runner.run (Agents SDK on top of the client)
+    execute          AgentExecutor.execute, unique prompts (full path)
+    execute_cached   AgentExecutor.execute, response cache hit
+    build_cache_key, resolve_variant, build_prompt   synchronous helpers
+
+    python -m benchmarks.micro --iterations 500 --output micro.json
+"""
+import argparse
+import asyncio
+import os
+import time
+import timeit
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from benchmarks.mock_server import MockConfig, MockServer
+from benchmarks.report import summarize, metadata, write_report
+
+
+SLUG = "grammar-checker"
+PROMPT = "Their going too the park tomorow"
+
+
+async def _measure(call: Callable[[int], Awaitable[Any]], iterations: int, warmup: int) -> Dict[str, Any]:
+    for number in range(warmup):
+        await call(-1 - number)
+    samples = []
+    started = time.perf_counter()
+    for number in range(iterations):
+        begin = time.perf_counter()
+        await call(number)
+        samples.append(time.perf_counter() - begin)
+    return {**summarize(samples), "ops_per_second": round(iterations / (time.perf_counter() - started), 1)}
+
+
+def _measure_sync(call: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    seconds = min(timeit.repeat(call, number=iterations, repeat=5)) / iterations
+    return {"mean_us": round(seconds * 1e6, 3), "ops_per_second": round(1 / seconds, 1)}
+
+
+async def run(iterations: int, warmup: int) -> Dict[str, Any]:
+    # Imported after the environment points the app at the mock server
+    from agents import Runner
+    from app.api.v1.agents.registry import get_agent
+    from app.core.config import get_gemini_client, get_run_config, settings
+    from app.schemas import ModelSettingsSchema
+    from app.services.agent_executor import AgentExecutor
+    from app.services.agent_variants import agent_variants
+    from app.services.response_cache import build_cache_key
+    
+    agent = get_agent(SLUG)
+    client = get_gemini_client()
+    run_config = get_run_config()
+    variant = ModelSettingsSchema(temperature=0.3)
+    
+    async def raw_completion(number: int) -> None:
+        await client.chat.completions.create(
+            model=settings.GEMINI_MODEL,
+            messages=[{"role": "system", "content": agent.instructions}, {"role": "user", "content": f"{PROMPT} {number}"}]
+        )
+    
+    async def runner(number: int) -> None:
+        await Runner.run(agent, f"{PROMPT} {number}", run_config=run_config)
+    
+    async def execute(number: int) -> None:
+        await AgentExecutor.execute(agent, f"{PROMPT} {number}")
+    
+    async def execute_cached(number: int) -> None:
+        await AgentExecutor.execute(agent, PROMPT, cacheable=True)
+    
+    results: Dict[str, Any] = {}
+    for name, call in (
+        ("raw_completion", raw_completion),
+        ("runner", runner),
+        ("execute", execute),
+        ("execute_cached", execute_cached),
+    ):
+        results[name] = await _measure(call, iterations, warmup)
+    
+    results["build_cache_key"] = _measure_sync(lambda: build_cache_key(agent, PROMPT, variant, {"tone": "formal"}), 2000)
+    results["resolve_variant"] = _measure_sync(lambda: agent_variants.resolve(agent, variant), 2000)
+    results["build_prompt"] = _measure_sync(lambda: AgentExecutor._build_prompt(PROMPT, {"tone": "formal"}), 2000)
+    
+    # What the executor adds on top of the SDK run (admission, retries, metrics, response building)
+    results["overhead"] = {
+        "sdk_over_http_p50_ms": round(results["runner"]["p50_ms"] - results["raw_completion"]["p50_ms"], 3),
+        "executor_over_sdk_p50_ms": round(results["execute"]["p50_ms"] - results["runner"]["p50_ms"], 3),
+    }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark AgentExecutor.execute overhead")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", "-o", help="JSON report path (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    config = MockConfig(latency_ms=0.0, latency="fixed", tokens_per_second=0.0, output_tokens=20)
+    with MockServer(config) as mock:
+        os.environ.update({
+            "GEMINI_API_KEY": "mock-key",
+            "GEMINI_BASE_URL": mock.base_url,
+            "GEMINI_PROVIDERS": "[]",
+            # Budgets and quotas would throttle the tight loop, not measure it
+            "ADMISSION_REQUESTS_PER_MINUTE": "1000000000",
+            "ADMISSION_TOKENS_PER_MINUTE": "1000000000",
+            "USAGE_STORE": "memory",
+        })
+        results = asyncio.run(run(args.iterations, args.warmup))
+        upstream = mock.counts
+    
+    write_report({
+        "meta": metadata(),
+        "benchmark": "micro",
+        "iterations": args.iterations,
+        "mock": {"latency_ms": config.latency_ms, "output_tokens": config.output_tokens},
+        "upstream": upstream,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Mock Gemini Server
+Local stand-in for the Gemini OpenAI-compatible chat completions API with a
+configurable latency distribution, token streaming rate and injected 429/5xx
+errors, so load tests measure this service rather than the network.
+
+    python -m benchmarks.mock_server --port 8090 --latency-ms 300 --latency lognormal \
+        --tokens-per-second 80 --rate-limit-rate 0.02 --server-error-rate 0.01
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta/openai/
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+API_PREFIX = "/v1beta/openai"
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+_WORDS = (
+    "the quick brown fox jumps over a lazy dog while bright ideas flow into "
+    "clear simple words that readers enjoy and remember for many days"
+).split()
+
+
+@dataclass
+class MockConfig:
+    """
+    Behaviour of the mock upstream.
+    
+    Attributes:
+        latency_ms: Median time to first token
+        latency: Distribution of the time to first token (fixed, uniform
+            over 0..2x, exponential or lognormal)
+        latency_sigma: Shape of the lognormal distribution
+        tokens_per_second: Generation rate after the first token (0 = instant)
+        output_tokens: Completion length in tokens (words)
+        rate_limit_rate: Fraction of requests answered with 429
+        retry_after: Retry-After seconds sent with 429 responses
+        server_error_rate: Fraction of requests answered with 500/503
+        seed: Random seed for reproducible runs
+    """
+    latency_ms: float = 200.0
+    latency: str = "lognormal"
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 100.0
+    output_tokens: int = 60
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    server_error_rate: float = 0.0
+    seed: Optional[int] = 1234
+    
+    def __post_init__(self):
+        if self.latency not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{self.latency}', use one of {DISTRIBUTIONS}")
+
+
+class MockUpstream:
+    """Request handling and counters of the mock server."""
+    
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.counts: Dict[str, int] = {"requests": 0, "streams": 0, "rate_limited": 0, "server_errors": 0}
+    
+    def first_token_delay(self) -> float:
+        median = self.config.latency_ms / 1000.0
+        kind = self.config.latency
+        if kind == "fixed":
+            return median
+        if kind == "uniform":
+            return self.random.uniform(0.0, 2 * median)
+        if kind == "exponential":
+            return self.random.expovariate(1.0 / median) if median > 0 else 0.0
+        return self.random.lognormvariate(0.0, self.config.latency_sigma) * median
+    
+    def token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1.0 / rate if rate > 0 else 0.0
+    
+    def injected_error(self) -> Optional[JSONResponse]:
+        """A 429 or 5xx response for this request, drawn from the configured rates."""
+        draw = self.random.random()
+        if draw < self.config.rate_limit_rate:
+            self.counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                headers={"Retry-After": str(self.config.retry_after)}
+            )
+        if draw < self.config.rate_limit_rate + self.config.server_error_rate:
+            self.counts["server_errors"] += 1
+            status = self.random.choice((500, 503))
+            return JSONResponse(status_code=status, content={"error": {"code": status, "message": "Injected failure"}})
+        return None
+    
+    def completion_tokens(self, body: Dict[str, Any]) -> List[str]:
+        """Completion text as tokens; structured-output requests get a JSON document matching the schema."""
+        response_format = body.get("response_format") or {}
+        schema = (response_format.get("json_schema") or {}).get("schema")
+        if schema is not None:
+            return [json.dumps(_sample(schema, self.random))]
+        limit = body.get("max_tokens") or body.get("max_completion_tokens") or self.config.output_tokens
+        count = max(1, min(self.config.output_tokens, int(limit)))
+        return [self.random.choice(_WORDS) + " " for _ in range(count)]
+
+
+def _sample(schema: Dict[str, Any], rng: random.Random) -> Any:
+    """A small instance of a JSON schema (enough for the agents' output types)."""
+    if "anyOf" in schema:
+        return _sample(schema["anyOf"][0], rng)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {name: _sample(prop, rng) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_sample(schema.get("items", {"type": "string"}), rng) for _ in range(3)]
+    if kind in ("integer", "number"):
+        return rng.randint(1, 100)
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return " ".join(rng.choice(_WORDS) for _ in range(2)).title()
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    chars = sum(len(str(message.get("content") or "")) for message in body.get("messages", []))
+    return max(1, chars // 4)
+
+
+def create_mock_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Build the mock server app; counters are served at GET /stats."""
+    upstream = MockUpstream(config or MockConfig())
+    app = FastAPI(title="Mock Gemini API", docs_url=None, redoc_url=None)
+    app.state.upstream = upstream
+    
+    @app.get(API_PREFIX + "/")
+    async def root():
+        # Reachability probe target (warmup / readiness)
+        return {"status": "ok"}
+    
+    @app.get("/stats")
+    async def stats():
+        return {"config": asdict(upstream.config), "counts": upstream.counts}
+    
+    @app.post(API_PREFIX + "/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        upstream.counts["requests"] += 1
+        error = upstream.injected_error()
+        if error is not None:
+            return error
+        
+        tokens = upstream.completion_tokens(body)
+        usage = {
+            "prompt_tokens": _prompt_tokens(body),
+            "completion_tokens": len(tokens),
+            "total_tokens": _prompt_tokens(body) + len(tokens),
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "gemini-mock")
+        created = int(time.time())
+        
+        if not body.get("stream"):
+            await asyncio.sleep(upstream.first_token_delay() + upstream.token_delay() * (len(tokens) - 1))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+        
+        upstream.counts["streams"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra: Any) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+        
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(upstream.first_token_delay())
+            for number, token in enumerate(tokens):
+                if number:
+                    await asyncio.sleep(upstream.token_delay())
+                yield chunk({"role": "assistant", "content": token} if number == 0 else {"content": token})
+            yield chunk({}, "stop")
+            if include_usage:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    return app
+
+
+class MockServer:
+    """
+    The mock server on a background thread, for benchmarks running in-process.
+        
+        with MockServer(MockConfig(latency_ms=0)) as mock:
+            os.environ["GEMINI_BASE_URL"] = mock.base_url
+    """
+    
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.app = create_mock_app(config)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self.host = host
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}{API_PREFIX}/"
+    
+    @property
+    def counts(self) -> Dict[str, int]:
+        return dict(self.app.state.upstream.counts)
+    
+    def start(self) -> "MockServer":
+        # Signal handlers can only be installed on the main thread
+        self.server.install_signal_handlers = lambda: None
+        self._thread = threading.Thread(target=self.server.run, name="mock-gemini", daemon=True)
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Mock server failed to start")
+            time.sleep(0.01)
+        return self
+    
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+    
+    def __enter__(self) -> "MockServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Command-line flags for every MockConfig field (shared with the load runner)."""
+    defaults = MockConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Median time to first token")
+    parser.add_argument("--latency", choices=DISTRIBUTIONS, default=defaults.latency)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="Fraction answered with 429")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--server-error-rate", type=float, default=defaults.server_error_rate, help="Fraction answered with 500/503")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(**{name: getattr(args, name) for name in MockConfig.__dataclass_fields__})
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a mock Gemini OpenAI-compatible API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    uvicorn.run(create_mock_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark Reports
+Latency summaries, run metadata and JSON reports, plus a comparison of two
+reports for spotting regressions between commits.
+
+    python -m benchmarks.report compare baseline.json current.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+
+SCHEMA_VERSION = 1
+PERCENTILES = (50, 95, 99)
+
+# Metrics where a larger value is an improvement; all other numbers are "lower is better"
+HIGHER_IS_BETTER = ("throughput_rps", "ops_per_second")
+
+
+def summarize(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    """Count, mean and p50/p95/p99 (in milliseconds) of latency samples in seconds."""
+    values = np.fromiter(samples, dtype=np.float64) * 1000.0
+    if not values.size:
+        return {"count": 0, "mean_ms": None, **{f"p{p}_ms": None for p in PERCENTILES}}
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        **{f"p{p}_ms": round(float(value), 3) for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+    }
+
+
+def metadata() -> Dict[str, Any]:
+    """Where and on what a report was produced: commit, Python, platform, cores."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True, timeout=5
+        ).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+    return {
+        "schema": SCHEMA_VERSION,
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report: Dict[str, Any], path: Optional[str]) -> None:
+    """Write a report as JSON to `path`, or to stdout when path is None or "-"."""
+    text = json.dumps(report, indent=2, sort_keys=False)
+    if not path or path == "-":
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat: Dict[str, float] = {}
+        for key, item in value.items():
+            if key == "meta":
+                continue
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def _is_tracked(key: str) -> bool:
+    name = key.rsplit(".", 1)[-1]
+    return name.endswith("_ms") or name.endswith("_us") or name in HIGHER_IS_BETTER
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Relative change of every latency/throughput number present in both reports.
+    
+    Args:
+        baseline: Earlier report
+        current: Report to check
+        threshold: Relative worsening that counts as a regression
+    
+    Returns:
+        One row per metric: key, baseline, current, change (fraction) and regression flag
+    """
+    before, after = _flatten(baseline), _flatten(current)
+    rows = []
+    for key in sorted(before.keys() & after.keys()):
+        if not _is_tracked(key) or not before[key]:
+            continue
+        change = (after[key] - before[key]) / before[key]
+        worse = -change if key.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        rows.append({
+            "key": key,
+            "baseline": before[key],
+            "current": after[key],
+            "change": round(change, 4),
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subcommands.add_parser("compare", help="Relative change per metric; exit 1 on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative worsening counted as a regression")
+    compare_parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    args = parser.parse_args(argv)
+    
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"baseline {baseline.get('meta', {}).get('commit')} -> current {current.get('meta', {}).get('commit')}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['key']:<70} {row['baseline']:>12.3f} {row['current']:>12.3f} {row['change']:>+8.1%}{flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,13 @@ FastAPI application with unified agent/tool processing.
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 
 from app.core import settings
 from app.api.v1.router import router as api_v1_router
+from app.services.metrics import MetricsMiddleware, registry as metrics_registry, multiprocess_metrics
+from app.services.warmup import warmup, lifespan
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -16,7 +18,8 @@ app = FastAPI(
     description="AI-powered tools and content generation platform",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS Setup
@@ -28,6 +31,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request timing and in-flight tracking for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include API routers
 app.include_router(api_v1_router)
 
@@ -45,11 +51,27 @@ async def root():
 
 
 @app.get("/health", tags=["Health"])
+@app.get("/health/live", tags=["Health"])
 async def health_check():
-    """Health check endpoint."""
+    """Liveness probe: the process is up and serving requests."""
     return {"status": "healthy"}
 
 
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: warmup finished and the upstream API is reachable (503 otherwise)."""
+    report = await warmup.readiness()
+    return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics, merged across server workers."""
+    if not metrics_registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(multiprocess_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -1,6 +1,7 @@
 """
 Run Script for Web Tool Platform Backend
-Launch the FastAPI application with uvicorn.
+Launch the FastAPI application with uvicorn: the auto-reloading development
+server with DEBUG, the multi-worker production launcher otherwise.
 """
 import uvicorn
 
@@ -8,10 +9,17 @@ if __name__ == "__main__":
     # Import settings here to ensure .env is loaded
     from app.core import settings
     
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info"
-    )
+    if settings.DEBUG:
+        # One reloading process: size per-worker limits and the job store for it
+        from app.server import prepare_shared_state
+        prepare_shared_state(1)
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        from app.server import main
+        main()
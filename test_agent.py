@@ -103,12 +103,46 @@ async def test_list_tools():
     return True
 
 
+async def test_chunk_failure():
+    print("\n" + "=" * 50)
+    print("Testing Chunked Execution With a Failing Chunk")
+    print("=" * 50)
+    
+    from app.schemas import AgentResponse
+    from app.services import AgentExecutionError, ChunkedExecutor
+    
+    # Fail the second chunk without calling the model
+    async def fake_execute(agent, prompt, **kwargs):
+        if prompt.startswith("Second"):
+            raise AgentExecutionError("Upstream failed", "chunk-test", status_code=502)
+        await asyncio.sleep(0.01)
+        return AgentResponse(status="success", content=prompt)
+    
+    executor = ChunkedExecutor(min_chars=10, max_chunk_chars=40, overlap_chars=0, concurrency=2)
+    prompt = "\n\n".join(f"{word} paragraph of a long input text." for word in ("First", "Second", "Third", "Fourth"))
+    original = AgentExecutor.execute
+    AgentExecutor.execute = fake_execute
+    try:
+        await asyncio.wait_for(executor.execute(agent=get_agent("grammar-checker"), prompt=prompt), timeout=5)
+        print("❌ No error raised!")
+        return False
+    except AgentExecutionError as e:
+        print(f"✅ Raised: {e.message} ({e.status_code})")
+        return True
+    except asyncio.TimeoutError:
+        print("❌ Chunked request hung!")
+        return False
+    finally:
+        AgentExecutor.execute = original
+
+
 async def run_all_tests():
     print("\n🚀 Starting Backend Tests\n")
     
     results = {
         "Tool Registry": await test_list_tools(),
         "Hex to RGB": await test_hex_to_rgb(),
+        "Chunk Failure": await test_chunk_failure(),
         "Story Generator": await test_story_generator(),
     }
     